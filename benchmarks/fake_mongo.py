@@ -0,0 +1,393 @@
+"""
+Stand-in em memória do Motor (AsyncIOMotorClient) para benchmarks: cobre só o
+que o app usa — find_one, find_one_and_update/delete, insert_one/many,
+update_one, count_documents, find().sort().explain(), updates em pipeline
+(só `$set` com `$cond`/`$eq`/`$add` e referências "$campo"), índices (create_index,
+drop_index, index_information, unicidade) e `admin.command("ping")`.
+
+Como o BSON, datetimes com fuso são gravados como UTC "naive". `rtt_ms` soma
+uma latência de rede por operação (0 = só cede o loop uma vez).
+
+    client = FakeMotorClient(rtt_ms=0.5)
+    db = client["lego_user_reg"]
+"""
+import asyncio
+import copy
+import itertools
+
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+DUPLICATE_KEY = 11000
+_MISSING = object()
+
+
+def _to_bson(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, dict):
+        return {k: _to_bson(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_bson(v) for v in value]
+    return value
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(op: str, value, arg) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+    except TypeError:
+        return False
+    raise ValueError(f"operador não suportado: {op}")
+
+
+def _match_field(value, cond) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        for op, arg in cond.items():
+            if op == "$ne":
+                ok = (None if value is _MISSING else value) != arg
+            elif op == "$in":
+                ok = (None if value is _MISSING else value) in arg
+            elif op == "$nin":
+                ok = (None if value is _MISSING else value) not in arg
+            elif op == "$exists":
+                ok = (value is not _MISSING) == bool(arg)
+            else:
+                ok = _compare(op, value, arg)
+            if not ok:
+                return False
+        return True
+    return (None if value is _MISSING else value) == cond
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif not _match_field(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = {k for k, v in projection.items() if v and k != "_id"}
+    if fields:
+        out = {k: v for k, v in doc.items() if k in fields}
+        if include_id and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    excluded = {k for k, v in projection.items() if not v}
+    return {k: v for k, v in doc.items() if k not in excluded}
+
+
+def _eval(doc: dict, expr):
+    """Expressão de agregação (subconjunto) avaliada sobre `doc`."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict) and len(expr) == 1 and next(iter(expr)).startswith("$"):
+        op, args = next(iter(expr.items()))
+        args = [_eval(doc, a) for a in args]
+        if op == "$cond":
+            return args[1] if args[0] else args[2]
+        if op == "$eq":
+            return args[0] == args[1]
+        if op == "$add":
+            return sum(args)
+        raise ValueError(f"expressão não suportada: {op}")
+    return _to_bson(expr)
+
+
+def _apply_update(doc: dict, update, inserting: bool = False):
+    if isinstance(update, list):  # pipeline: cada estágio lê o documento antes dele
+        for stage in update:
+            for op, fields in stage.items():
+                if op != "$set":
+                    raise ValueError(f"estágio não suportado: {op}")
+                doc.update({k: _eval(doc, v) for k, v in fields.items()})
+        return
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            doc.update(_to_bson(fields))
+        elif op == "$inc":
+            for k, v in fields.items():
+                doc[k] = doc.get(k, 0) + v
+        elif op == "$unset":
+            for k in fields:
+                doc.pop(k, None)
+        elif op != "$setOnInsert":
+            raise ValueError(f"update não suportado: {op}")
+
+
+class _Cursor:
+    def __init__(self, coll: "FakeCollection", query: dict, projection: Optional[dict]):
+        self.coll = coll
+        self.query = query
+        self.projection = projection
+        self._sort = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    async def explain(self) -> dict:
+        index = self.coll._index_for(self.query, self._sort)
+        stage = {"stage": "IXSCAN", "indexName": index} if index else {"stage": "COLLSCAN"}
+        return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": stage}}}
+
+    async def to_list(self, length: Optional[int] = None) -> list[dict]:
+        await self.coll._round_trip()
+        docs = self.coll._select(self.query, self._sort)
+        return [_project(d, self.projection) for d in docs[:length]]
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeDatabase", name: str):
+        self.database = db
+        self.name = name
+        self._docs: dict[Any, dict] = {}
+        self._indexes: dict[str, dict] = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        self._unique: dict[str, dict[tuple, Any]] = {}  # índice único -> chave -> _id
+        self.ops = 0
+
+    async def _round_trip(self):
+        self.ops += 1
+        await asyncio.sleep(self.database.client.rtt)
+
+    # ---------- índices ----------
+
+    async def create_index(self, keys, name: Optional[str] = None, unique: bool = False, **options) -> str:
+        await self._round_trip()
+        keys = [(keys, 1)] if isinstance(keys, str) else [tuple(k) for k in keys]
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        info = {"key": keys, "v": 2}
+        if unique:
+            info["unique"] = True
+            owners: dict[tuple, Any] = {}
+            for d in self._docs.values():
+                if owners.setdefault(self._key(d, info), d["_id"]) != d["_id"]:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}",
+                                            DUPLICATE_KEY)
+            self._unique[name] = owners
+        if "expireAfterSeconds" in options:
+            info["expireAfterSeconds"] = options["expireAfterSeconds"]
+        self._indexes[name] = info
+        return name
+
+    async def drop_index(self, name: str):
+        await self._round_trip()
+        self._indexes.pop(name)
+        self._unique.pop(name, None)
+
+    async def index_information(self) -> dict:
+        await self._round_trip()
+        return copy.deepcopy(self._indexes)
+
+    def _index_for(self, query: dict, sort) -> Optional[str]:
+        fields = set(query) | {k for k, _ in sort or ()}
+        for name, info in self._indexes.items():
+            if info["key"][0][0] in fields:
+                return name
+        return None
+
+    @staticmethod
+    def _key(doc: dict, info: dict) -> tuple:
+        return tuple(_get(doc, k) for k, _ in info["key"])
+
+    def _check_unique(self, doc: dict, ignore_id=_MISSING):
+        if doc.get("_id") in self._docs and doc.get("_id") != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_",
+                                    DUPLICATE_KEY)
+        for name, keys in self._unique.items():
+            owner = keys.get(self._key(doc, self._indexes[name]), _MISSING)
+            if owner is not _MISSING and owner != ignore_id and owner != doc.get("_id"):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}",
+                                        DUPLICATE_KEY)
+
+    def _store(self, doc: dict):
+        old = self._docs.get(doc["_id"])
+        if old is not None:
+            self._remove(old["_id"])
+        self._docs[doc["_id"]] = doc
+        for name, keys in self._unique.items():
+            keys[self._key(doc, self._indexes[name])] = doc["_id"]
+
+    def _remove(self, _id) -> dict:
+        doc = self._docs.pop(_id)
+        for name, keys in self._unique.items():
+            keys.pop(self._key(doc, self._indexes[name]), None)
+        return doc
+
+    # ---------- leitura ----------
+
+    def _candidates(self, query: dict):
+        """Igualdade em _id ou num índice único de um campo: no máximo um documento."""
+        if "_id" in query and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc is not None else []
+        for name, keys in self._unique.items():
+            fields = [k for k, _ in self._indexes[name]["key"]]
+            if len(fields) == 1 and fields[0] in query and not isinstance(query[fields[0]], dict):
+                _id = keys.get((query[fields[0]],), _MISSING)
+                return [self._docs[_id]] if _id is not _MISSING else []
+        return self._docs.values()
+
+    def _select(self, query: dict, sort=None) -> list[dict]:
+        docs = [d for d in self._candidates(query) if matches(d, query)]
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda d: (_get(d, key) is _MISSING, _get(d, key)), reverse=direction < 0)
+        return docs
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> _Cursor:
+        return _Cursor(self, _to_bson(filter or {}), projection)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        await self._round_trip()
+        docs = self._select(_to_bson(filter or {}), kwargs.get("sort"))
+        return _project(docs[0], projection) if docs else None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        await self._round_trip()
+        return len(self._select(_to_bson(filter)))
+
+    # ---------- escrita ----------
+
+    async def insert_one(self, document: dict, **kwargs):
+        await self._round_trip()
+        doc = _to_bson(document)
+        self._check_unique(doc)
+        self._store(doc)
+        return type("InsertOneResult", (), {"inserted_id": doc["_id"]})()
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True, **kwargs):
+        await self._round_trip()
+        errors, inserted = [], []
+        for i, document in enumerate(documents):
+            doc = _to_bson(document)
+            try:
+                self._check_unique(doc)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": DUPLICATE_KEY, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+                continue
+            self._store(doc)
+            inserted.append(doc["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return type("InsertManyResult", (), {"inserted_ids": inserted})()
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs):
+        await self._round_trip()
+        docs = self._select(_to_bson(filter))
+        if docs:
+            updated = copy.deepcopy(docs[0])
+            _apply_update(updated, update)
+            self._check_unique(updated, ignore_id=updated["_id"])
+            self._store(updated)
+        elif upsert:
+            self._upsert(filter, update)
+        return type("UpdateResult", (), {"matched_count": len(docs[:1]), "modified_count": len(docs[:1])})()
+
+    def _upsert(self, filter: dict, update: dict) -> dict:
+        doc = {k: v for k, v in _to_bson(filter).items() if not k.startswith("$") and not isinstance(v, dict)}
+        _apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", next(self.database.client._ids))
+        self._check_unique(doc)
+        self._store(doc)
+        return doc
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  sort=None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs):
+        await self._round_trip()
+        docs = self._select(_to_bson(filter), sort)
+        if not docs:
+            if not upsert:
+                return None
+            doc = self._upsert(filter, update)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        before = docs[0]
+        updated = copy.deepcopy(before)
+        _apply_update(updated, update)
+        self._check_unique(updated, ignore_id=updated["_id"])
+        self._store(updated)
+        return _project(updated if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs):
+        await self._round_trip()
+        docs = self._select(_to_bson(filter), sort)
+        if not docs:
+            return None
+        return _project(self._remove(docs[0]["_id"]), projection)
+
+
+class FakeDatabase:
+    def __init__(self, client: "FakeMotorClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command, *args, **kwargs) -> dict:
+        await asyncio.sleep(self.client.rtt)
+        return {"ok": 1.0}
+
+
+class FakeMotorClient:
+    def __init__(self, rtt_ms: float = 0.0):
+        self.rtt = rtt_ms / 1000
+        self._databases: dict[str, FakeDatabase] = {}
+        self._ids = itertools.count(1)
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        if name not in self._databases:
+            self._databases[name] = FakeDatabase(self, name)
+        return self._databases[name]
+
+    @property
+    def admin(self) -> FakeDatabase:
+        return self["admin"]
+
+    def close(self):
+        pass
+
+    def ops(self) -> dict[str, int]:
+        return {f"{db}.{name}": coll.ops for db, d in self._databases.items() for name, coll in d._collections.items()}
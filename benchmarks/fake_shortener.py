@@ -0,0 +1,48 @@
+"""
+Encurtador falso como transport do httpx: responde /auth/login e /admin/shorten
+com a latência configurada, sem rede. Injetado no cliente compartilhado com
+`await shotener_client.start_client(transport=FakeShortener(latency_ms=40).transport())`.
+"""
+import asyncio
+import itertools
+import random
+
+from urllib.parse import parse_qs
+
+import httpx
+
+
+class FakeShortener:
+    def __init__(self, latency_ms: float = 40.0, jitter_ms: float = 10.0, base_url: str = "https://go.example.com",
+                 seed: int | None = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.base_url = base_url.rstrip("/")
+        self.rng = random.Random(seed)
+        self.logins = 0
+        self.created = 0
+        self._slugs = itertools.count(1)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if request.url.path == "/auth/login":
+            self.logins += 1
+            return httpx.Response(200, json={"accessToken": "bench-token", "expiresIn": 3600})
+        if request.url.path == "/admin/shorten":
+            if request.headers.get("authorization") != "Bearer bench-token":
+                return httpx.Response(401, json={"detail": "unauthorized"})
+            form = parse_qs((await request.aread()).decode())
+            slug = form.get("slug", [f"b{next(self._slugs):06d}"])[0]
+            self.created += 1
+            return httpx.Response(200, json={
+                "slug": slug,
+                "qr_png": f"{self.base_url}/qr/{slug}.png",
+                "qr_svg": f"{self.base_url}/qr/{slug}.svg",
+            })
+        return httpx.Response(404, json={"detail": "not found"})
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def stats(self) -> dict:
+        return {"logins": self.logins, "created": self.created}
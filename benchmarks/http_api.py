@@ -0,0 +1,296 @@
+"""
+Benchmark HTTP dos endpoints quentes sobre o app de `create_app()` (via ASGI,
+sem socket), com Mongo em memória (fake_mongo), encurtador falso
+(fake_shortener), LogCenter stub e hardware simulado (simulator).
+
+Cenários: qrcode_init (POST /api/lego/qrcode/init), form (GET /api/lego/form,
+uma sessão nova por request), session_get (GET /api/lego/session/{sid}) e
+users_create (POST /api/users/). Carga em malha aberta: chegadas Poisson a
+`--rate` req/s, até `--concurrency` em voo; a latência conta a partir do
+instante agendado, então fila no cliente aparece como latência (sem
+"coordinated omission"). Por cenário: histograma e percentis de latência,
+vazão, status HTTP e atraso do event loop (lag) medido durante o cenário.
+
+    PYTHONPATH=src python benchmarks/http_api.py --requests 2000 --rate 400 --save benchmarks/baselines/http_api.json
+    PYTHONPATH=src python benchmarks/http_api.py --requests 2000 --rate 400 --compare benchmarks/baselines/http_api.json
+
+Com --compare, sai com código 1 se algum cenário piorar além de --tolerance
+(p50/p99 maiores ou vazão menor, em %).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from fake_mongo import FakeMotorClient  # noqa: E402
+from fake_shortener import FakeShortener  # noqa: E402
+from logcenter_stub import serve as serve_logcenter  # noqa: E402
+
+SCENARIOS = ("qrcode_init", "form", "session_get", "users_create")
+# limites dos buckets do histograma (ms); o último bucket é +Inf
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+METRICS = (("p50_ms", "latency"), ("p99_ms", "latency"), ("throughput_rps", "throughput"))
+
+
+def summarize(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    s = sorted(samples)
+    pick = lambda q: round(s[min(len(s) - 1, int(len(s) * q))] * 1000, 3)  # noqa: E731
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99),
+            "max_ms": round(s[-1] * 1000, 3), "mean_ms": round(sum(s) / len(s) * 1000, 3)}
+
+
+def histogram(samples: list[float]) -> dict[str, int]:
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for x in samples:
+        ms = x * 1000
+        i = next((i for i, bound in enumerate(BUCKETS_MS) if ms <= bound), len(BUCKETS_MS))
+        counts[i] += 1
+    return {f"le_{b}": c for b, c in zip((*BUCKETS_MS, "inf"), counts)}
+
+
+class LoopLagMonitor:
+    """Mede quanto o loop atrasa um sleep curto: CPU síncrona nos handlers aparece aqui."""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - t0 - self.interval))
+
+    def __enter__(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+# ---------- ambiente do app ----------
+
+async def start_environment(args) -> dict:
+    """Sobe os fakes e configura o app antes de importá-lo (settings leem o env no import)."""
+    env = {}
+    logcenter, _ = serve_logcenter(0)
+    env["LOGCENTER_BASE_URL"] = f"http://127.0.0.1:{logcenter.server_address[1]}"
+
+    hardware = None
+    if os.name == "posix":
+        from simulator import DispenserProfile, FakeDispenser, FakeDisplay, Latency
+        link = os.path.join(tempfile.mkdtemp(prefix="bench-"), "dispenser")
+        dispenser = await FakeDispenser(DispenserProfile(drop=Latency("fixed", 0.05)), link=link).start()
+        display = await FakeDisplay(port=0).start()
+        env["SERIAL_PORT"], env["UDP_PORT"] = link, str(display.port)
+        hardware = (dispenser, display)
+
+    templates = os.path.join(ROOT_DIR, "src", "frontend", "static", "templates")
+    defaults = {
+        "SECRET_KEY": "bench",
+        "SHORTENER_USER": "bench",
+        "SHORTENER_PASSWORD": "bench",
+        "LOGCENTER_API_KEY": "bench",
+        "LOGCENTER_PROJECT_ID": "bench",
+        "CADASTRO_BASE_URL": "https://cadastro.example.com",
+        "RATE_LIMIT_ENABLED": "false",   # toda a carga vem de um IP só
+        "STARTUP_RETRY_SECONDS": "3600",
+        "TEMPLATE_SET": "lego" if os.path.isdir(os.path.join(templates, "lego")) else "skyn",
+    }
+    for key, value in {**defaults, **env}.items():
+        os.environ.setdefault(key, value)
+
+    import core.database as database
+    from core.config import settings
+    database.client = FakeMotorClient(rtt_ms=args.mongo_rtt_ms)
+    database.db = database.client[settings.MONGO_DB]
+
+    import main
+    from utils import shotener_client
+    shortener = FakeShortener(latency_ms=args.shortener_ms, seed=args.seed)
+    await shotener_client.start_client(transport=shortener.transport())
+    return {"main": main, "client": database.client, "shortener": shortener,
+            "hardware": hardware, "logcenter": logcenter}
+
+
+# ---------- cenários ----------
+
+async def new_session(client: httpx.AsyncClient) -> str:
+    r = await client.post("/api/lego/qrcode/init")
+    r.raise_for_status()
+    return r.json()["session_id"]
+
+
+async def prepare(name: str, client: httpx.AsyncClient, n: int):
+    """Estado que o cenário consome (fora da medição); retorna um gerador de requests."""
+    if name == "qrcode_init":
+        return lambda i: ("POST", "/api/lego/qrcode/init", {})
+    if name == "form":
+        sids = [await new_session(client) for _ in range(n)]
+        return lambda i: ("GET", "/api/lego/form", {"params": {"sid": sids[i]}})
+    if name == "session_get":
+        sids = [await new_session(client) for _ in range(50)]
+        return lambda i: ("GET", f"/api/lego/session/{sids[i % len(sids)]}", {})
+    if name == "users_create":
+        run = uuid.uuid4().hex[:8]
+        return lambda i: ("POST", "/api/users/", {"json": {
+            "name": f"Bench {i}", "email": f"bench{i}.{run}@example.com", "code": "BENCH"}})
+    raise ValueError(name)
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, args, rng: random.Random) -> dict:
+    total = args.warmup + args.requests
+    make_request = await prepare(name, client, total)
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def one(i: int, scheduled: float):
+        async with sem:
+            method, url, kwargs = make_request(i)
+            try:
+                r = await client.request(method, url, **kwargs)
+                status = r.status_code
+            except Exception as e:
+                status = type(e).__name__
+        if i >= args.warmup:
+            latencies.append(time.perf_counter() - scheduled)
+            statuses[str(status)] += 1
+
+    tasks = []
+    with LoopLagMonitor() as lag:
+        start = time.perf_counter()
+        next_at = start
+        for i in range(total):
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if i == args.warmup:
+                measured_from = time.perf_counter()
+            tasks.append(asyncio.create_task(one(i, next_at)))
+            next_at += rng.expovariate(args.rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - (measured_from if args.requests else start)
+
+    return {
+        "requests": args.requests,
+        "status": dict(statuses),
+        "throughput_rps": round(args.requests / elapsed, 1) if elapsed else 0.0,
+        **summarize(latencies),
+        "histogram": histogram(latencies),
+        "loop_lag": summarize(lag.samples),
+    }
+
+
+# ---------- baseline ----------
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """Linhas de regressão (vazio = ok): p50/p99 subiram ou vazão caiu mais que `tolerance` %."""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        for metric, kind in METRICS:
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = 100 * (new - old) / old
+            worse = change > tolerance if kind == "latency" else change < -tolerance
+            print({"scenario": name, "metric": metric, "baseline": old, "current": new,
+                   "change_pct": round(change, 1), "regression": worse})
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1f}%)")
+    return regressions
+
+
+async def main(args) -> int:
+    env = await start_environment(args)
+    app = env["main"].create_app()
+    rng = random.Random(args.seed)
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            ready = (await client.get("/ready")).json()
+            print({"ready": ready["status"], "components": {k: v["status"] for k, v in ready["components"].items()}})
+            for name in args.scenarios:
+                results[name] = await run_scenario(name, client, args, rng)
+                print({"scenario": name, **{k: v for k, v in results[name].items() if k != "histogram"}})
+
+    print({"mongo_ops": env["client"].ops(), "shortener": env["shortener"].stats()})
+    if env["hardware"]:
+        dispenser, display = env["hardware"]
+        display.close()
+        await dispenser.close()
+    env["logcenter"].shutdown()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        },
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline salvo em {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print("REGRESSÕES:\n  " + "\n  ".join(regressions))
+            return 1
+        print("sem regressões além da tolerância")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="requests medidos por cenário")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=300.0, help="chegadas por segundo (Poisson)")
+    parser.add_argument("--concurrency", type=int, default=64, help="máximo de requests em voo")
+    parser.add_argument("--mongo-rtt-ms", type=float, default=0.5)
+    parser.add_argument("--shortener-ms", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="grava resultados + metadados (JSON) como baseline")
+    parser.add_argument("--compare", help="baseline JSON para comparar")
+    parser.add_argument("--tolerance", type=float, default=15.0, help="piora máxima aceita, em %%")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,147 @@
+"""
+Fluxo completo de um visitante contra o app rodando, com o hardware simulado:
+POST /qrcode/init -> GET /form -> POST /session/complete -> GET /dispense/{job_id}?wait=
+(até o drop terminar). Chegadas Poisson a `--rate` visitantes por minuto.
+
+Relata p50/p95/p99 por etapa e ponta a ponta, resultados por dispenser e drops por minuto.
+Com --simulate, sobe no mesmo processo o(s) dispenser(s) (pty) e o display (UDP) falsos
+(mesmas opções de `python -m simulator`); o app precisa estar com
+SERIAL_PORT=<--link> (ou SERIAL_PORTS=<--link>-1,...,<--link>-N com --dispensers N)
+e UDP_PORT=<--udp-port>, e com rate limit folgado para um IP só:
+
+    PYTHONPATH=src python -m simulator --link /tmp/lego-dispenser --udp-port 5004 &
+    SERIAL_PORT=/tmp/lego-dispenser UDP_PORT=5004 RATE_LIMIT_ENABLED=false \\
+        uvicorn main:create_app --factory --app-dir src --port 5005 &
+    PYTHONPATH=src python benchmarks/kiosk_flow.py --base-url http://127.0.0.1:5005 --visitors 120 --rate 30
+
+    # ou, com o simulador no mesmo processo do driver:
+    PYTHONPATH=src python benchmarks/kiosk_flow.py --simulate --visitors 120 --rate 30 --hand-timeout-rate 0.05
+
+    # dois dispensers (app com SERIAL_PORTS=/tmp/lego-dispenser-1,/tmp/lego-dispenser-2)
+    PYTHONPATH=src python benchmarks/kiosk_flow.py --simulate --dispensers 2 --visitors 240 --rate 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from simulator.__main__ import add_arguments, start_hardware  # noqa: E402
+
+STEPS = ("init", "form", "complete", "dispense", "total")
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+    pick = lambda q: round(s[min(len(s) - 1, int(len(s) * q))] * 1000, 1)  # noqa: E731
+    return {"n": len(s), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+class Run:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {step: [] for step in STEPS}
+        self.outcomes: Counter = Counter()
+        self.devices: Counter = Counter()
+        self.http_errors: Counter = Counter()
+
+
+async def visitor(client: httpx.AsyncClient, run: Run, max_wait: float):
+    t0 = time.perf_counter()
+
+    async def step(name: str, method: str, url: str, **kwargs):
+        t = time.perf_counter()
+        r = await client.request(method, url, **kwargs)
+        run.latencies[name].append(time.perf_counter() - t)
+        if r.status_code >= 400:
+            run.http_errors[f"{name}:{r.status_code}"] += 1
+            return None
+        return r
+
+    try:
+        r = await step("init", "POST", "/api/lego/qrcode/init")
+        if r is None:
+            return run.outcomes.update(["init_error"])
+        session = r.json()
+        sid, slug = session["session_id"], session["slug"]
+        if await step("form", "GET", "/api/lego/form", params={"sid": sid}) is None:
+            return run.outcomes.update(["form_error"])
+        r = await step("complete", "POST", "/api/lego/session/complete", json={"session_id": sid, "slug": slug})
+        if r is None:
+            return run.outcomes.update(["complete_error"])
+        job_id = r.json()["job_id"]
+
+        t = time.perf_counter()
+        deadline = t + max_wait
+        job = {}
+        while time.perf_counter() < deadline:
+            r = await client.get(f"/api/lego/dispense/{job_id}", params={"wait": 25})
+            if r.status_code != 200:
+                run.http_errors[f"dispense:{r.status_code}"] += 1
+                break
+            job = r.json()
+            if job["status"] in ("completed", "failed", "cancelled"):
+                break
+        run.latencies["dispense"].append(time.perf_counter() - t)
+        run.devices[job.get("device") or "none"] += 1
+        run.latencies["total"].append(time.perf_counter() - t0)
+        if job.get("status") == "cancelled":
+            run.outcomes["cancelled"] += 1
+        else:
+            run.outcomes[job.get("result") or job.get("status") or "unknown"] += 1
+    except httpx.HTTPError as e:
+        run.outcomes[f"http:{type(e).__name__}"] += 1
+
+
+async def main(args):
+    hardware = await start_hardware(args) if args.simulate else None
+    run = Run()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    rng = random.Random(args.seed)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        tasks = []
+        for _ in range(args.visitors):
+            tasks.append(asyncio.create_task(visitor(client, run, args.max_wait)))
+            await asyncio.sleep(rng.expovariate(args.rate / 60))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    print({
+        "visitors": args.visitors,
+        "offered_per_min": args.rate,
+        "elapsed_s": round(elapsed, 1),
+        "drops_per_min": round(run.outcomes["dropped"] / (elapsed / 60), 2),
+        "outcomes": dict(run.outcomes),
+        "http_errors": dict(run.http_errors),
+        "per_device": dict(run.devices),
+    })
+    for name in STEPS:
+        print({"step": name, **percentiles(run.latencies[name])})
+    if hardware:
+        dispensers, display = hardware
+        print({"dispensers": [d.stats() for d in dispensers], "display": display.stats()})
+        display.close()
+        for dispenser in dispensers:
+            await dispenser.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5005")
+    parser.add_argument("--visitors", type=int, default=60)
+    parser.add_argument("--rate", type=float, default=30.0, help="chegadas por minuto (Poisson)")
+    parser.add_argument("--concurrency", type=int, default=100, help="conexões HTTP simultâneas")
+    parser.add_argument("--max-wait", type=float, default=120.0, help="espera máxima pelo fim do drop (s)")
+    parser.add_argument("--simulate", action="store_true", help="sobe dispenser/display falsos neste processo")
+    add_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
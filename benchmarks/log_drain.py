@@ -0,0 +1,78 @@
+"""
+Mede a vazão de drenagem do LogUploader contra o stub local do LogCenter.
+
+Gera um backlog de N registros no journal (como após uma queda de rede) e
+cronometra até o uploader zerar a fila.
+
+    PYTHONPATH=src python benchmarks/log_drain.py --records 20000 --bulk
+    PYTHONPATH=src python benchmarks/log_drain.py --records 2000 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from logcenter_stub import serve  # noqa: E402
+from utils.log_journal import LogJournal  # noqa: E402
+from utils.log_uploader import LogUploader  # noqa: E402
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="log-drain-")
+    journal = LogJournal(os.path.join(workdir, "journal"), max_buffered=args.records + 1)
+    futures = [
+        journal.append({"status": "bench", "project": "bench", "additional": str(i), "timePlayed": "2025-01-01T00:00:00Z"})
+        for i in range(args.records)
+    ]
+    for f in futures:
+        f.result()
+    journal.rotate()
+    await asyncio.sleep(0.1)
+
+    server, stats = serve(args.port, args.latency_ms, args.error_rate)
+    uploader = LogUploader(
+        journal,
+        f"http://127.0.0.1:{args.port}",
+        os.path.join(workdir, "backup.csv"),
+        bulk_path="/datalog/upload/bulk" if args.bulk else None,
+        batch_size=args.batch,
+        max_in_flight=args.in_flight,
+        use_gzip=not args.no_gzip,
+        idle_delay=0.05,
+        backoff_base=0.05,
+        backoff_cap=1.0,
+    )
+    start = time.perf_counter()
+    uploader.start()
+    while uploader.sent < args.records:
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    await uploader.stop()
+    journal.close()
+    server.shutdown()
+    return {
+        "mode": "bulk" if args.bulk else "per-row",
+        "records": args.records,
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(args.records / elapsed, 1),
+        "server_requests": stats.requests,
+        "server_errors": stats.errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8090)
+    print(asyncio.run(run(parser.parse_args())))
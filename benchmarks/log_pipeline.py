@@ -0,0 +1,123 @@
+"""
+Custo por chamada de log no thread que loga (o event loop, na app), antes e depois
+de core.logging_setup:
+
+- stdlib_json: configuração antiga (JSONRenderer + LoggerFactory da stdlib) com um
+  StreamHandler síncrono no root, ou seja, a linha é gravada no próprio request;
+- stdlib_json_no_handler: a mesma, sem handler/nível configurado (o que a app fazia
+  em produção: renderiza e a stdlib descarta o info);
+- queue_orjson / queue_json: setup_logging() (fila + thread de escrita) com orjson
+  e com o fallback da stdlib;
+- sampled: evento com regra de amostragem que descarta (LOG_SAMPLING);
+- filtered_debug: debug abaixo de LOG_LEVEL.
+
+"total_us" inclui esperar a thread gravar tudo (flush), para mostrar que o custo
+não some, só sai do caminho do request.
+
+    PYTHONPATH=src python benchmarks/log_pipeline.py --calls 50000
+    PYTHONPATH=src python benchmarks/log_pipeline.py --calls 50000 --output /tmp/bench.log
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import structlog
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core import logging_setup  # noqa: E402
+
+SCENARIOS = ("stdlib_json", "stdlib_json_no_handler", "queue_orjson", "queue_json", "sampled", "filtered_debug")
+FIELDS = {"status": "dropped", "project": "bench-project", "timePlayed": "2025-01-01T00:00:00Z"}
+
+
+def configure_stdlib(stream, with_handler: bool):
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(logging.INFO if with_handler else logging.WARNING)
+    if with_handler:
+        root.addHandler(logging.StreamHandler(stream))
+    structlog.configure(
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(),
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+
+def run(name: str, calls: int, output: str) -> dict:
+    structlog.reset_defaults()
+    logging.getLogger().handlers.clear()
+    text = open(output, "w")
+    binary = open(output, "ab")
+    writer = None
+    method = "debug" if name == "filtered_debug" else "info"
+    saved_orjson = logging_setup.orjson
+
+    try:
+        if name.startswith("stdlib_json"):
+            configure_stdlib(text, with_handler=name == "stdlib_json")
+        else:
+            if name == "queue_json":
+                logging_setup.orjson = None
+            sampling = "log_appended=1000000/0" if name == "sampled" else ""
+            writer = logging_setup.setup_logging("info", sampling=sampling, max_pending=calls + 1, stream=binary)
+
+        call = getattr(structlog.get_logger(), method)
+        call("log_appended", **FIELDS)  # aquece o cache do bound logger
+        if writer:
+            writer.flush()
+
+        start = time.perf_counter()
+        for i in range(calls):
+            call("log_appended", seq=i, **FIELDS)
+        per_call = time.perf_counter() - start
+        if writer:
+            writer.flush(timeout=60)
+        else:
+            text.flush()
+        total = time.perf_counter() - start
+    finally:
+        logging_setup.orjson = saved_orjson
+
+    result = {
+        "scenario": name,
+        "calls": calls,
+        "per_call_us": round(per_call / calls * 1e6, 2),
+        "total_us": round(total / calls * 1e6, 2),
+    }
+    if writer:
+        result.update(written=writer.written, dropped=writer.dropped)
+        writer.stop()
+        writer.written = writer.dropped = 0
+    text.close()
+    binary.close()
+    return result
+
+
+def main(args):
+    if "queue_orjson" in args.scenarios and logging_setup.orjson is None:
+        print("orjson não instalado: queue_orjson usa o fallback json")
+    results = [run(name, args.calls, args.output) for name in args.scenarios]
+    base = next((r for r in results if r["scenario"] == "stdlib_json"), None)
+    for r in results:
+        if base and r is not base:
+            r["speedup_vs_stdlib_json"] = round(base["per_call_us"] / r["per_call_us"], 1)
+        print(r)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", default=os.devnull, help="arquivo que recebe as linhas")
+    main(parser.parse_args())
@@ -0,0 +1,107 @@
+"""
+Stand-in local do LogCenter para testar a vazão do LogUploader.
+
+Aceita POST /datalog/upload (form, uma linha) e POST /datalog/upload/bulk
+(JSON, opcionalmente gzip). Latência e taxa de erro configuráveis.
+
+    python benchmarks/logcenter_stub.py --port 8090 --latency-ms 20 --error-rate 0.05
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = 0
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            elapsed = time.time() - self.started
+            return {
+                "records": self.records,
+                "requests": self.requests,
+                "errors": self.errors,
+                "elapsed_s": round(elapsed, 3),
+                "records_per_s": round(self.records / elapsed, 1) if elapsed else 0.0,
+            }
+
+
+def make_handler(stats: Stats, latency_ms: float, error_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como um LogCenter real atrás de proxy
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, code: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                return self._reply(200, stats.snapshot())
+            self._reply(404, {"detail": "not found"})
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            with stats.lock:
+                stats.requests += 1
+            if random.random() < error_rate:
+                with stats.lock:
+                    stats.errors += 1
+                return self._reply(503, {"detail": "injected failure"})
+
+            if self.path == "/datalog/upload/bulk":
+                if self.headers.get("Content-Encoding") == "gzip":
+                    raw = gzip.decompress(raw)
+                n = len(json.loads(raw))
+            elif self.path == "/datalog/upload":
+                parse_qs(raw.decode())
+                n = 1
+            else:
+                return self._reply(404, {"detail": "not found"})
+            with stats.lock:
+                stats.records += n
+            self._reply(200, {"accepted": n})
+
+    return Handler
+
+
+def serve(port: int = 8090, latency_ms: float = 0.0, error_rate: float = 0.0) -> tuple[ThreadingHTTPServer, Stats]:
+    """Sobe o stub numa thread e retorna (server, stats)."""
+    stats = Stats()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stats, latency_ms, error_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, stats = serve(args.port, args.latency_ms, args.error_rate)
+    print(f"logcenter stub em http://127.0.0.1:{args.port} (GET /stats)")
+    try:
+        while True:
+            time.sleep(5)
+            print(stats.snapshot())
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,68 @@
+"""
+Latência por página: TemplateResponse a cada hit vs. PageCache (pré-renderizada
+e pré-comprimida), mais os bytes enviados em cada encoding.
+
+Chama os dois caminhos direto (sem socket), com um Request falso.
+
+    PYTHONPATH=src python benchmarks/page_cache.py --iterations 2000
+    PYTHONPATH=src python benchmarks/page_cache.py --templates src/frontend/static/templates/lego/html
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from starlette.requests import Request  # noqa: E402
+from starlette.templating import Jinja2Templates  # noqa: E402
+
+from utils.page_cache import PageCache  # noqa: E402
+
+DEFAULT_TEMPLATES = os.path.join(os.path.dirname(__file__), "..", "src", "frontend", "static", "templates", "skyn", "html")
+
+
+def make_request(accept_encoding: str) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
+
+
+def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+    samples.sort()
+    return samples
+
+
+def main(args):
+    templates = Jinja2Templates(directory=args.templates)
+    pages = tuple(sorted(f for f in os.listdir(args.templates) if f.endswith(".html")))
+    cache = PageCache(templates, pages)
+    sizes = cache.warm()
+
+    for name in pages:
+        request = make_request(args.accept_encoding)
+        # TemplateResponse renderiza no construtor, como no handler original
+        render = timed(lambda: templates.TemplateResponse(request, name), args.iterations)
+        cached = timed(lambda: cache.response(name, request), args.iterations)
+        sent = cache.response(name, request)
+        print({
+            "page": name,
+            "render_p50_us": round(render[len(render) // 2], 1),
+            "cached_p50_us": round(cached[len(cached) // 2], 1),
+            "speedup": round(statistics.median(render) / statistics.median(cached), 1),
+            "bytes": sizes.get(name, {}),
+            "sent_encoding": sent.headers.get("content-encoding", "identity"),
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--accept-encoding", default="gzip, deflate, br")
+    main(parser.parse_args())
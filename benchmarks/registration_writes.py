@@ -0,0 +1,151 @@
+"""
+Compara insert_one por request com o CoalescingWriter (insert_many unordered)
+num pico de cadastros concorrentes.
+
+Sem --mongo-uri usa uma coleção falsa: latência de rede por round-trip, pool de
+conexões limitado (maxPoolSize do driver) e um servidor com poucos núcleos que
+paga um custo fixo por operação mais um custo por documento.
+Uma fração dos e-mails é repetida para exercitar o caminho de duplicata.
+
+    PYTHONPATH=src python benchmarks/registration_writes.py --requests 5000 --concurrency 500
+    PYTHONPATH=src python benchmarks/registration_writes.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError  # noqa: E402
+
+from utils.registration_writer import CoalescingWriter  # noqa: E402
+
+
+class FakeCollection:
+    """Coleção em memória com índice único em `email` e custo de rede simulado."""
+    def __init__(self, rtt_ms: float, per_op_us: float, per_doc_us: float, pool_size: int, server_cores: int):
+        self.rtt = rtt_ms / 1000
+        self.per_op = per_op_us / 1_000_000
+        self.per_doc = per_doc_us / 1_000_000
+        self._pool = asyncio.Semaphore(pool_size)
+        self._cores = asyncio.Semaphore(server_cores)
+        self._emails: set[str] = set()
+        self.round_trips = 0
+
+    async def _round_trip(self, n: int):
+        async with self._pool:
+            self.round_trips += 1
+            await asyncio.sleep(self.rtt / 2)
+            async with self._cores:
+                await asyncio.sleep(self.per_op + self.per_doc * n)
+            await asyncio.sleep(self.rtt / 2)
+
+    async def insert_one(self, doc: dict):
+        await self._round_trip(1)
+        if doc["email"] in self._emails:
+            raise DuplicateKeyError("E11000 duplicate key", 11000)
+        self._emails.add(doc["email"])
+
+    async def insert_many(self, docs: list[dict], ordered: bool = True):
+        await self._round_trip(len(docs))
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc["email"] in self._emails:
+                errors.append({"index": i, "code": 11000, "errmsg": "E11000 duplicate key"})
+            else:
+                self._emails.add(doc["email"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+    async def drop(self):
+        self._emails.clear()
+
+
+def make_docs(n: int, dup_ratio: float) -> list[dict]:
+    docs = []
+    for i in range(n):
+        if dup_ratio and docs and i % int(1 / dup_ratio) == 0:
+            email = docs[-1]["email"]
+        else:
+            email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+        docs.append({"_id": str(uuid.uuid4()), "email": email, "name": "bench", "status": "registered"})
+    return docs
+
+
+async def drive(insert, docs: list[dict], concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies, ok, dup = [], 0, 0
+
+    async def one(doc):
+        nonlocal ok, dup
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await insert(doc)
+                ok += 1
+            except DuplicateKeyError:
+                dup += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(d) for d in docs))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "inserted": ok,
+        "duplicates": dup,
+        "elapsed_s": round(elapsed, 3),
+        "inserts_per_s": round(len(docs) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)], 2),
+    }
+
+
+async def make_collection(args, name: str):
+    if not args.mongo_uri:
+        return FakeCollection(args.rtt_ms, args.per_op_us, args.per_doc_us, args.pool_size, args.server_cores)
+    from motor.motor_asyncio import AsyncIOMotorClient
+    coll = AsyncIOMotorClient(args.mongo_uri, maxPoolSize=args.pool_size)["bench"][f"{name}_{os.getpid()}"]
+    await coll.create_index("email", unique=True)
+    return coll
+
+
+async def main(args):
+    docs = make_docs(args.requests, args.dup_ratio)
+
+    coll = await make_collection(args, "insert_one")
+    one = await drive(coll.insert_one, [dict(d) for d in docs], args.concurrency)
+    one["round_trips"] = getattr(coll, "round_trips", args.requests)
+    await coll.drop()
+
+    coll = await make_collection(args, "coalesced")
+    writer = CoalescingWriter(coll, max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000)
+    many = await drive(writer.insert, [dict(d) for d in docs], args.concurrency)
+    await writer.stop()
+    many["round_trips"] = getattr(coll, "round_trips", writer.batches)
+    many["avg_batch"] = writer.stats()["avg_batch"]
+    await coll.drop()
+
+    print({"mode": "insert_one", **one})
+    print({"mode": "coalesced", **many})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500, help="cadastros simultâneos em voo")
+    parser.add_argument("--dup-ratio", type=float, default=0.02)
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="coleção falsa: latência por round-trip")
+    parser.add_argument("--per-op-us", type=float, default=250.0, help="coleção falsa: custo fixo por operação no servidor")
+    parser.add_argument("--per-doc-us", type=float, default=15.0, help="coleção falsa: custo por documento no servidor")
+    parser.add_argument("--server-cores", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--mongo-uri", default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""
+Overhead por request do ReplayGuardMiddleware para cada backend.
+
+Chama o middleware direto via ASGI (sem socket) em volta de um app vazio e
+compara com o app sem middleware. O backend "mongo" só roda com --mongo-uri.
+
+    PYTHONPATH=src python benchmarks/replay_guard_backends.py --requests 20000
+    PYTHONPATH=src python benchmarks/replay_guard_backends.py --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from middlewares.replay_guard import ReplayGuardMiddleware  # noqa: E402
+from middlewares.replay_store import (  # noqa: E402
+    LocalReplayStore,
+    MongoReplayStore,
+    SharedMemoryReplayStore,
+)
+
+PATH = "/api/lego/session/complete"
+
+
+async def empty_app(scope, receive, send):
+    while (await receive()).get("more_body"):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def make_scope(body: bytes) -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": PATH,
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("10.0.0.1", 1234),
+    }
+
+
+async def drive(app, n: int, repeat_ratio: float) -> list[float]:
+    samples = []
+    repeat_every = int(1 / repeat_ratio) if repeat_ratio else 0
+    last_body = b"{}"
+
+    async def send(message):
+        pass
+
+    for i in range(n):
+        if repeat_every and i % repeat_every == 0:
+            body = last_body  # replay
+        else:
+            body = json.dumps({"session_id": str(uuid.uuid4()), "slug": "abc"}).encode()
+            last_body = body
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {"type": "http.disconnect"}
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        t0 = time.perf_counter_ns()
+        await app(make_scope(body), receive, send)
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+    return samples
+
+
+def summarize(name: str, samples: list[float], baseline: float | None) -> dict:
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "backend": name,
+        "mean_us": round(mean, 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p99_us": round(samples[int(len(samples) * 0.99)], 2),
+        "overhead_us": round(mean - baseline, 2) if baseline is not None else 0.0,
+    }
+
+
+async def main(args):
+    results = []
+    base = summarize("none", await drive(empty_app, args.requests, args.repeat_ratio), None)
+    results.append(base)
+
+    stores = {
+        "local": LocalReplayStore(4),
+        "shm": SharedMemoryReplayStore(4, name=f"bench_replay_{os.getpid()}"),
+    }
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        coll = AsyncIOMotorClient(args.mongo_uri)["bench"][f"replay_{os.getpid()}"]
+        stores["mongo"] = MongoReplayStore(coll, 4)
+
+    for name, store in stores.items():
+        app = ReplayGuardMiddleware(empty_app, ttl_seconds=4, store=store)
+        n = args.requests if name != "mongo" else min(args.requests, 2000)
+        results.append(summarize(name, await drive(app, n, args.repeat_ratio), base["mean_us"]))
+
+    stores["shm"].unlink()
+    if "mongo" in stores:
+        await stores["mongo"].coll.drop()
+    for r in results:
+        print(r)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat-ratio", type=float, default=0.1, help="fração de requests que são replays")
+    parser.add_argument("--mongo-uri", default=None)
+    asyncio.run(main(parser.parse_args()))
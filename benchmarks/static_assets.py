@@ -0,0 +1,101 @@
+"""
+Vazão de assets: StaticFiles (mount atual) vs. StaticAssets, chamando os apps
+direto via ASGI (sem socket), sobre todos os arquivos de uma pasta.
+
+Cenários: GET frio de cada arquivo, GET repetido (visitante que volta sem cache
+local), revalidação com If-None-Match e GET com Accept-Encoding br quando há
+irmãos pré-comprimidos (rode antes tools/build_assets.py na pasta).
+
+    PYTHONPATH=src python benchmarks/static_assets.py --rounds 20
+    PYTHONPATH=src python benchmarks/static_assets.py --directory /tmp/skyn --prefix /templates/skyn
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from starlette.staticfiles import StaticFiles  # noqa: E402
+
+from utils.static_assets import StaticAssets  # noqa: E402
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "frontend", "static", "templates", "skyn")
+
+
+def list_files(directory: str) -> list[str]:
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith((".br", ".gz")):
+                files.append(os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/"))
+    return sorted(files)
+
+
+async def call(app, prefix: str, rel: str, headers: list[tuple[bytes, bytes]]) -> tuple[int, dict, int]:
+    scope = {
+        "type": "http", "method": "GET", "path": f"{prefix}/{rel}", "root_path": prefix,
+        "raw_path": f"{prefix}/{rel}".encode(), "query_string": b"", "headers": headers,
+        "http_version": "1.1", "scheme": "http", "server": ("127.0.0.1", 80),
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+    }
+    status, response_headers, size = 0, {}, 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, response_headers, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, size
+
+
+async def scenario(app, prefix: str, files: list[str], rounds: int, make_headers) -> dict:
+    etags = {}
+    for rel in files:
+        _, h, _ = await call(app, prefix, rel, [])
+        etags[rel] = h.get("etag", "")
+    requests, sent, statuses = 0, 0, {}
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for rel in files:
+            status, _, size = await call(app, prefix, rel, make_headers(etags[rel]))
+            requests += 1
+            sent += size
+            statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.perf_counter() - t0
+    return {"req_per_s": round(requests / elapsed, 1), "mb_sent": round(sent / 1e6, 2), "status": statuses}
+
+
+async def main(args):
+    files = list_files(args.directory)
+    apps = {
+        "StaticFiles": StaticFiles(directory=args.directory),
+        "StaticAssets": StaticAssets(directory=args.directory),
+    }
+    apps["StaticAssets"].preload()
+    cases = {
+        "get": lambda etag: [],
+        "if-none-match": lambda etag: [(b"if-none-match", etag.encode())],
+        "accept-br": lambda etag: [(b"accept-encoding", b"gzip, br")],
+    }
+    print(f"{len(files)} arquivos em {args.directory}")
+    for case, make_headers in cases.items():
+        for name, app in apps.items():
+            result = await scenario(app, args.prefix, files, args.rounds, make_headers)
+            print({"case": case, "app": name, **result})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=DEFAULT_DIR)
+    parser.add_argument("--prefix", default="/templates/skyn")
+    parser.add_argument("--rounds", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,11 @@
+"""
+Simulador do hardware do kiosk, para benchmarks ponta a ponta sem o dispenser físico:
+- `FakeDispenser`: porta serial falsa (pty) com latências e falhas configuráveis;
+- `FakeDisplay`: listener UDP no lugar do app do display.
+
+    PYTHONPATH=src python -m simulator --link /tmp/lego-dispenser --udp-port 5004
+"""
+from simulator.dispenser import DispenserProfile, FakeDispenser, Latency
+from simulator.display import FakeDisplay
+
+__all__ = ["DispenserProfile", "FakeDispenser", "FakeDisplay", "Latency"]
@@ -0,0 +1,78 @@
+"""
+Sobe o dispenser (pty) e o display (UDP) falsos até Ctrl+C, imprimindo contadores.
+
+    PYTHONPATH=src python -m simulator --link /tmp/lego-dispenser --udp-port 5004 \
+        --drop-latency lognormal:1.5,0.25 --hand-timeout-rate 0.05
+
+e rode o app com SERIAL_PORT=/tmp/lego-dispenser UDP_PORT=5004. Com --dispensers N,
+sobe N dispensers (/tmp/lego-dispenser-1..N) para SERIAL_PORTS.
+"""
+import argparse
+import asyncio
+
+from simulator.dispenser import DispenserProfile, FakeDispenser, Latency
+from simulator.display import FakeDisplay
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--link", default="/tmp/lego-dispenser", help="symlink estável para o pty (SERIAL_PORT)")
+    parser.add_argument("--dispensers", type=int, default=1, help="quantos dispensers (links <link>-1..N)")
+    parser.add_argument("--udp-port", type=int, default=5004, help="porta do display (UDP_PORT)")
+    parser.add_argument("--start-latency", type=Latency.parse, default=Latency("uniform", 0.5, 1.5))
+    parser.add_argument("--drop-latency", type=Latency.parse, default=Latency("lognormal", 1.5, 0.25))
+    parser.add_argument("--hand-timeout-latency", type=Latency.parse, default=Latency("fixed", 8.0))
+    parser.add_argument("--hand-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--silence-rate", type=float, default=0.0)
+    parser.add_argument("--stock", type=int, default=None)
+    parser.add_argument("--display-drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def dispenser_links(args) -> list[str]:
+    if args.dispensers <= 1:
+        return [args.link]
+    return [f"{args.link}-{i}" for i in range(1, args.dispensers + 1)]
+
+
+async def start_hardware(args) -> tuple[list[FakeDispenser], FakeDisplay]:
+    profile = DispenserProfile(
+        start=args.start_latency,
+        drop=args.drop_latency,
+        hand_timeout=args.hand_timeout_latency,
+        hand_timeout_rate=args.hand_timeout_rate,
+        silence_rate=args.silence_rate,
+        stock=args.stock,
+    )
+    dispensers = [
+        await FakeDispenser(profile, link=link, seed=None if args.seed is None else args.seed + i).start()
+        for i, link in enumerate(dispenser_links(args))
+    ]
+    display = await FakeDisplay(port=args.udp_port, drop_rate=args.display_drop_rate).start()
+    return dispensers, display
+
+
+async def main(args):
+    dispensers, display = await start_hardware(args)
+    links = dispenser_links(args)
+    for dispenser, link in zip(dispensers, links):
+        print(f"dispenser: {dispenser.port} ({link})")
+    print(f"SERIAL_PORTS={','.join(links)}" if len(links) > 1 else f"SERIAL_PORT={links[0]}")
+    print(f"display: udp {display.host}:{display.port} (UDP_PORT={display.port})")
+    try:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            print({"dispensers": [d.stats() for d in dispensers], "display": display.stats()})
+    finally:
+        display.close()
+        for dispenser in dispensers:
+            await dispenser.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--stats-interval", type=float, default=10.0)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,169 @@
+"""
+Dispenser falso atrás de um pseudo-terminal: o app abre o lado "slave" como se
+fosse a porta serial real (SERIAL_PORT=<path>), e o simulador responde pelo "master".
+
+Protocolo (o mesmo do firmware): comandos sem terminador ("on", "drop", "hand",
+"reset", "off"); respostas em linha ("start", "dropped", "hand_timeout", "out_of_stock").
+Como o firmware, atende um comando por vez.
+"""
+import asyncio
+import math
+import os
+import random
+import tty
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+COMMANDS = ("on", "off", "drop", "hand", "reset")
+
+
+@dataclass
+class Latency:
+    """
+    Distribuição de latência em segundos, a partir de "tipo:parâmetros":
+    fixed:0.5 | uniform:0.8,1.6 | normal:1.2,0.2 | lognormal:<mediana>,<sigma>
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v] or [0.0]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"distribuição desconhecida: {kind}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        else:
+            value = self.a
+        return max(0.0, value)
+
+
+@dataclass
+class DispenserProfile:
+    start: Latency = field(default_factory=lambda: Latency("uniform", 0.5, 1.5))     # on -> start
+    drop: Latency = field(default_factory=lambda: Latency("lognormal", 1.5, 0.25))   # drop -> dropped
+    hand_timeout: Latency = field(default_factory=lambda: Latency("fixed", 8.0))     # drop -> hand_timeout
+    hand_timeout_rate: float = 0.0   # visitante não pega o brinde
+    silence_rate: float = 0.0        # comando sem resposta (o app cai no timeout)
+    stock: Optional[int] = None      # None = infinito; 0 -> out_of_stock até um "reset"
+
+
+class FakeDispenser:
+    """
+        dispenser = FakeDispenser(DispenserProfile(hand_timeout_rate=0.05), link="/tmp/lego-dispenser")
+        await dispenser.start()   # SERIAL_PORT=/tmp/lego-dispenser (ou dispenser.port)
+    """
+    def __init__(self, profile: Optional[DispenserProfile] = None, link: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.profile = profile or DispenserProfile()
+        self.link = link
+        self.rng = random.Random(seed)
+        self.stock = self.profile.stock
+        self.port: Optional[str] = None
+        self.commands: Counter = Counter()
+        self.replies: Counter = Counter()
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._buffer = b""
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> "FakeDispenser":
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # sem eco/canonical: bytes passam como numa serial
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        if self.link:
+            if os.path.islink(self.link):
+                os.unlink(self.link)
+            os.symlink(self.port, self.link)
+        asyncio.get_running_loop().add_reader(self._master, self._on_readable)
+        self._worker = asyncio.create_task(self._work(), name="fake-dispenser")
+        return self
+
+    async def close(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        if self._master is not None:
+            asyncio.get_running_loop().remove_reader(self._master)
+            os.close(self._master)
+            os.close(self._slave)
+            self._master = self._slave = None
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._master, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:  # EIO: lado slave fechado (app reiniciou); continua ouvindo
+            return
+        self._buffer += data
+        self._parse()
+
+    def _parse(self):
+        """Comandos chegam sem separador: consome palavras conhecidas do início do buffer."""
+        while self._buffer:
+            self._buffer = self._buffer.lstrip(b"\r\n \t")
+            for cmd in COMMANDS:
+                if self._buffer.startswith(cmd.encode()):
+                    self._buffer = self._buffer[len(cmd):]
+                    self.commands[cmd] += 1
+                    self._queue.put_nowait(cmd)
+                    break
+            else:
+                if any(cmd.encode().startswith(self._buffer) for cmd in COMMANDS):
+                    return  # comando incompleto: espera o resto
+                self._buffer = self._buffer[1:]  # lixo na linha
+
+    def _reply(self, line: str):
+        self.replies[line] += 1
+        if self._master is not None:
+            os.write(self._master, line.encode() + b"\r\n")
+
+    async def _work(self):
+        p = self.profile
+        while True:
+            cmd = await self._queue.get()
+            if p.silence_rate and self.rng.random() < p.silence_rate:
+                self.replies["silence"] += 1
+                continue
+            if cmd == "on":
+                await asyncio.sleep(p.start.sample(self.rng))
+                self._reply("start")
+            elif cmd == "drop":
+                if self.stock is not None and self.stock <= 0:
+                    self._reply("out_of_stock")
+                elif p.hand_timeout_rate and self.rng.random() < p.hand_timeout_rate:
+                    await asyncio.sleep(p.hand_timeout.sample(self.rng))
+                    self._reply("hand_timeout")
+                else:
+                    await asyncio.sleep(p.drop.sample(self.rng))
+                    if self.stock is not None:
+                        self.stock -= 1
+                    self._reply("dropped")
+            elif cmd == "hand" and self.stock is not None:
+                self.stock = max(0, self.stock - 1)
+            elif cmd == "reset":
+                self.stock = p.stock
+
+    def stats(self) -> dict:
+        return {"port": self.port, "commands": dict(self.commands), "replies": dict(self.replies),
+                "stock": self.stock}
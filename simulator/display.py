@@ -0,0 +1,27 @@
+"""
+Display falso: escuta o UDP que o app manda ao app do kiosk ("cta", "calor",
+"retire"), confirma mensagens numeradas (UDP_ACK_ENABLED) e conta o que chegou.
+"""
+import time
+
+from collections import Counter
+
+from utils.udp_sender import DisplayEchoListener
+
+
+class FakeDisplay(DisplayEchoListener):
+    def __init__(self, host: str = "127.0.0.1", port: int = 5004, drop_rate: float = 0.0):
+        super().__init__(host=host, port=port, drop_rate=drop_rate)
+        self.counts: Counter = Counter()
+        self.last: dict[str, float] = {}
+
+    def _on_datagram(self, data: bytes, addr):
+        before = len(self.received)
+        super()._on_datagram(data, addr)
+        for _, msg in self.received[before:]:
+            self.counts[msg] += 1
+            self.last[msg] = time.time()
+
+    def stats(self) -> dict:
+        return {"port": self.port, "messages": dict(self.counts), "duplicates": self.duplicates,
+                "dropped": self.dropped}
@@ -8,19 +8,72 @@ class Settings(BaseSettings):
     HOST: str = Field("0.0.0.0", env="HOST")
     PORT: int = Field(5005, env="PORT")
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
+    MONGO_URI: str = Field("mongodb://localhost:27017", env="MONGO_URI")
+    MONGO_DB: str = Field("lego_user_reg", env="MONGO_DB")
+    MONGO_EXPLAIN_CHECK: bool = Field(False, env="MONGO_EXPLAIN_CHECK")  # modo teste: avisa COLLSCAN
+    # migração explícita: torna único (collMod, Mongo 6+) um índice existente sem `unique`
+    MONGO_INDEX_MAKE_UNIQUE: bool = Field(False, env="MONGO_INDEX_MAKE_UNIQUE")
     SHORTENER_BASE_URL: str = Field("https://go.dbpe.com.br", env="SHORTENER_BASE_URL")
     SHORTENER_USER: str = Field(...,env="SHORTENER_USER")
     SHORTENER_PASSWORD: str = Field(...,env="SHORTENER_PASSWORD")
+    SHORTENER_MAX_CONNECTIONS: int = Field(20, env="SHORTENER_MAX_CONNECTIONS")
+    SHORTENER_MAX_KEEPALIVE: int = Field(10, env="SHORTENER_MAX_KEEPALIVE")
+    SHORTENER_KEEPALIVE_EXPIRY: float = Field(60.0, env="SHORTENER_KEEPALIVE_EXPIRY")
+    SHORTENER_HTTP2: bool = Field(False, env="SHORTENER_HTTP2")
+    SHORTENER_TIMEOUT: float = Field(15.0, env="SHORTENER_TIMEOUT")
+    SHORTENER_CONNECT_TIMEOUT: float = Field(5.0, env="SHORTENER_CONNECT_TIMEOUT")
+    SHORTENER_RETRIES: int = Field(2, env="SHORTENER_RETRIES")
+    SHORTENER_BACKOFF_BASE: float = Field(0.2, env="SHORTENER_BACKOFF_BASE")
     LOGCENTER_SDK_ENABLED: bool = Field(False, env="LOGCENTER_SDK_ENABLED")
     LOGCENTER_BASE_URL: str = Field(..., env="LOGCENTER_BASE_URL")
     LOGCENTER_API_KEY: str = Field(..., env="LOGCENTER_API_KEY")
     LOGCENTER_PROJECT_ID: str = Field(..., env="LOGCENTER_PROJECT_ID")
     LOGCENTER_MIN_LEVEL: str = Field("INFO", env="LOGCENTER_MIN_LEVEL")
+    LOGCENTER_BULK_PATH: Optional[str] = Field(None, env="LOGCENTER_BULK_PATH")
+    LOGCENTER_UPLOAD_BATCH: int = Field(200, env="LOGCENTER_UPLOAD_BATCH")
+    LOGCENTER_UPLOAD_CONCURRENCY: int = Field(4, env="LOGCENTER_UPLOAD_CONCURRENCY")
+    LOGCENTER_UPLOAD_GZIP: bool = Field(True, env="LOGCENTER_UPLOAD_GZIP")
     CADASTRO_BASE_URL: str = Field(..., env="CADASTRO_BASE_URL")
     UDP_PORT: int = Field(5004, env="UDP_PORT")
+    UDP_ACK_ENABLED: bool = Field(False, env="UDP_ACK_ENABLED")  # display responde "ack:<seq>" (utils.udp_sender)
+    UDP_ACK_TIMEOUT_SECONDS: float = Field(0.3, env="UDP_ACK_TIMEOUT_SECONDS")  # 1ª retransmissão; dobra a cada tentativa
+    UDP_MAX_ATTEMPTS: int = Field(3, env="UDP_MAX_ATTEMPTS")
     SERIAL_PORT: str = Field("COM3", env="SERIAL_PORT")
     SERIAL_BAUDRATE: int = Field(9600, env="SERIAL_BAUDRATE")
+    # vários dispensers: "p1,p2" ou "esq=/dev/ttyUSB0,dir=/dev/ttyUSB1"; vazio = só SERIAL_PORT
+    SERIAL_PORTS: str = Field("", env="SERIAL_PORTS")
+    DISPENSER_MAX_FAILURES: int = Field(3, env="DISPENSER_MAX_FAILURES")  # timeouts seguidos até tirar da escala
+    DISPENSER_COOLDOWN_SECONDS: float = Field(30.0, env="DISPENSER_COOLDOWN_SECONDS")
+    STARTUP_TIMEOUT_SECONDS: float = Field(5.0, env="STARTUP_TIMEOUT_SECONDS")  # por recurso (serial, UDP, encurtador...)
+    MONGO_STARTUP_TIMEOUT_SECONDS: float = Field(10.0, env="MONGO_STARTUP_TIMEOUT_SECONDS")  # ping + ensure_indexes
+    STARTUP_RETRY_SECONDS: float = Field(15.0, env="STARTUP_RETRY_SECONDS")  # nova tentativa do que subiu degradado
+    LOG_LEVEL: str = Field("info", env="LOG_LEVEL")  # structlog: abaixo disso a chamada é no-op
+    # amostragem por evento "evento=N/R": 1 a cada N, no máximo R/s (0 = sem teto); só debug/info
+    LOG_SAMPLING: str = Field("log_appended=1/20,udp-message-sent=1/10,udp-message-acked=1/10", env="LOG_SAMPLING")
+    LOG_QUEUE_MAX: int = Field(10_000, env="LOG_QUEUE_MAX")  # linhas aguardando a thread de escrita; acima disso descarta
+    METRICS_ENABLED: bool = Field(True, env="METRICS_ENABLED")  # GET /metrics (Prometheus, utils.metrics)
     MALL_ID: int = Field(84, env="MALL_ID")
+    REPLAY_GUARD_BACKEND: str = Field("local", env="REPLAY_GUARD_BACKEND")  # local | shm | mongo
+    DISPENSE_JOB_TTL_SECONDS: int = Field(60, env="DISPENSE_JOB_TTL_SECONDS")
+    PICKUP_MAX_PER_DAY: int = Field(1, env="PICKUP_MAX_PER_DAY")
+    RATE_LIMIT_ENABLED: bool = Field(True, env="RATE_LIMIT_ENABLED")
+    RATE_LIMIT_BACKEND: str = Field("local", env="RATE_LIMIT_BACKEND")  # local | redis | memory
+    RATE_LIMIT_PER_DAY: int = Field(5, env="RATE_LIMIT_PER_DAY")  # cadastros por e-mail por dia
+    RATE_LIMIT_IP_PER_MINUTE: int = Field(30, env="RATE_LIMIT_IP_PER_MINUTE")
+    TRUSTED_PROXIES: str = Field("", env="TRUSTED_PROXIES")  # IPs/CIDRs cujo X-Forwarded-For vale para o rate limit
+    REDIS_URL: Optional[str] = Field(None, env="REDIS_URL")
+    SESSION_POOL_ENABLED: bool = Field(True, env="SESSION_POOL_ENABLED")
+    SESSION_POOL_LOW: int = Field(5, env="SESSION_POOL_LOW")
+    SESSION_POOL_HIGH: int = Field(20, env="SESSION_POOL_HIGH")
+    SESSION_POOL_TTL_SECONDS: int = Field(6 * 3600, env="SESSION_POOL_TTL_SECONDS")
+    TEMPLATE_SET: str = Field("lego", env="TEMPLATE_SET")  # pasta em frontend/static/templates/, montada em /templates/<set>
+    ASSET_BUILD_ENABLED: bool = Field(True, env="ASSET_BUILD_ENABLED")  # usa templates/<set>/dist/html se existir
+    PAGE_CACHE_CHECK_MTIME: bool = Field(False, env="PAGE_CACHE_CHECK_MTIME")  # dev: re-renderiza templates/reindexa assets que mudarem
+    STATIC_PRELOAD: bool = Field(True, env="STATIC_PRELOAD")  # indexa/carrega os assets estáticos no startup
+    SESSION_CACHE_TTL_SECONDS: float = Field(5.0, env="SESSION_CACHE_TTL_SECONDS")
+    SESSION_CACHE_MAX_ENTRIES: int = Field(10_000, env="SESSION_CACHE_MAX_ENTRIES")
+    SESSION_EVENTS_HEARTBEAT_SECONDS: float = Field(15.0, env="SESSION_EVENTS_HEARTBEAT_SECONDS")
+    SESSION_EVENTS_MAX_PENDING: int = Field(32, env="SESSION_EVENTS_MAX_PENDING")
 
 
     class Config:
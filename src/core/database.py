@@ -0,0 +1,6 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from core.config import settings
+
+# O Motor conecta de forma preguiçosa: criar o client aqui não faz I/O
+client = AsyncIOMotorClient(settings.MONGO_URI)
+db = client[settings.MONGO_DB]
@@ -0,0 +1,151 @@
+import asyncio
+import structlog
+from dataclasses import dataclass
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from core.config import settings
+
+
+log = structlog.get_logger()
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    keys: tuple[tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    # (filtro, sort) de exemplo da query que o índice atende; explicado no modo teste
+    probe: Optional[tuple[dict, Optional[list]]] = None
+
+    def options(self) -> dict:
+        opts = {"name": self.name}
+        if self.unique:
+            opts["unique"] = True
+        if self.expire_after_seconds is not None:
+            opts["expireAfterSeconds"] = self.expire_after_seconds
+        return opts
+
+
+# Índices declarados por coleção; criados/verificados no startup
+INDEXES: dict[str, list[IndexSpec]] = {
+    "lego_sessions": [
+        IndexSpec((("status", ASCENDING), ("created_at", DESCENDING)), "status_1_created_at_-1",
+                  probe=({"status": "processing"}, [("created_at", DESCENDING)])),
+        IndexSpec((("slug", ASCENDING),), "slug_1", probe=({"slug": ""}, None)),
+    ],
+    "lego_session_pool": [
+        IndexSpec((("expires_at", ASCENDING),), "ttl_expires_at", expire_after_seconds=0),
+        IndexSpec((("minted_at", ASCENDING),), "minted_at_1"),
+    ],
+    "registrations": [
+        # email é gravado sempre em minúsculas: único = único sem diferenciar caixa
+        IndexSpec((("email", ASCENDING),), "email_1", unique=True, probe=({"email": ""}, None)),
+        IndexSpec((("status", ASCENDING), ("canPickFrom", ASCENDING)), "status_1_canPickFrom_1",
+                  probe=({"status": "registered"}, [("canPickFrom", ASCENDING)])),
+    ],
+}
+
+
+def _same_keys(spec: IndexSpec, info: dict) -> bool:
+    return tuple((k, int(d)) for k, d in info["key"]) == spec.keys
+
+
+def _matches(spec: IndexSpec, info: dict) -> bool:
+    return (
+        _same_keys(spec, info)
+        and bool(info.get("unique", False)) == spec.unique
+        and info.get("expireAfterSeconds") == spec.expire_after_seconds
+    )
+
+
+async def _make_unique(coll, spec: IndexSpec, info: dict) -> bool:
+    """
+    Índice existente sem o `unique` declarado (ex.: email_1 de antes da restrição).
+    Só converte com MONGO_INDEX_MAKE_UNIQUE ligado (migração explícita, uma vez):
+    collMod `prepareUnique` + `unique` no próprio índice, sem drop/create, então não
+    há janela sem o índice nem corrida entre workers. Se já houver duplicatas, o
+    `prepareUnique` fica (bloqueia novas) e o startup do Mongo falha.
+    """
+    if not settings.MONGO_INDEX_MAKE_UNIQUE:
+        log.error("mongo-index-not-unique", collection=coll.name, index=spec.name,
+                  hint="rode uma vez com MONGO_INDEX_MAKE_UNIQUE=true")
+        return False
+    try:
+        for option in ("prepareUnique", "unique"):
+            await coll.database.command("collMod", coll.name, index={"name": spec.name, option: True})
+    except OperationFailure as e:
+        log.error("mongo-index-unique-conflict", collection=coll.name, index=spec.name, error=str(e))
+        raise RuntimeError(
+            f"{coll.name}.{spec.name}: há documentos duplicados; remova-os para tornar o índice único"
+        ) from e
+    log.warning("mongo-index-made-unique", collection=coll.name, index=spec.name, found=info)
+    return True
+
+
+async def _ensure_collection(db, coll_name: str, specs: list[IndexSpec]) -> dict:
+    coll = db[coll_name]
+    existing = await coll.index_information()
+    report = {"created": [], "ok": [], "made_unique": [], "mismatch": []}
+    for spec in specs:
+        info = existing.get(spec.name)
+        if info is None:
+            await coll.create_index(list(spec.keys), **spec.options())
+            report["created"].append(spec.name)
+        elif _matches(spec, info):
+            report["ok"].append(spec.name)
+        elif spec.unique and not info.get("unique") and _same_keys(spec, info):
+            made = await _make_unique(coll, spec, info)
+            report["made_unique" if made else "mismatch"].append(spec.name)
+        else:
+            # não derruba índice em produção automaticamente; só avisa
+            log.warning("mongo-index-mismatch", collection=coll_name, index=spec.name,
+                        expected=spec.options() | {"key": spec.keys}, found=info)
+            report["mismatch"].append(spec.name)
+    return report
+
+
+async def ensure_indexes(db, indexes: dict[str, list[IndexSpec]] = INDEXES) -> dict:
+    """Cria os índices ausentes e verifica os existentes (coleções em paralelo)."""
+    names = list(indexes)
+    reports = await asyncio.gather(*(_ensure_collection(db, n, indexes[n]) for n in names))
+    result = dict(zip(names, reports))
+    log.info("mongo-indexes-ensured", **{n: {k: v for k, v in r.items() if v} for n, r in result.items()})
+    for name in names:
+        for spec in indexes[name]:
+            if spec.probe:
+                await check_plan(db[name], f"index:{spec.name}", spec.probe[0], sort=spec.probe[1])
+    return result
+
+
+# ----------------------------
+# Checagem de plano (modo teste)
+# ----------------------------
+
+_explained: set[str] = set()
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        yield from _stages(child)
+
+
+async def check_plan(coll, query_name: str, filter: dict, projection: Optional[dict] = None, sort=None):
+    """
+    Com MONGO_EXPLAIN_CHECK ligado, roda explain() uma vez por query nomeada e
+    avisa se o plano vencedor usa COLLSCAN. Desligado, não faz nada.
+    """
+    if not settings.MONGO_EXPLAIN_CHECK or query_name in _explained:
+        return
+    _explained.add(query_name)
+    cursor = coll.find(filter, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    plan = (await cursor.explain()).get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # formato do SBE (Mongo 7+)
+    if "COLLSCAN" in set(_stages(plan)):
+        log.warning("mongo-collscan", collection=coll.name, query=query_name, filter=list(filter))
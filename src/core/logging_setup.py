@@ -0,0 +1,254 @@
+"""
+Pipeline do structlog fora do event loop.
+
+- Níveis abaixo de LOG_LEVEL viram no-op no próprio bound logger (nada é processado).
+- `EventSampler` (primeiro processor) amostra/limita eventos ruidosos antes de
+  qualquer trabalho: 1 a cada N e no máximo R por segundo por evento. O próximo
+  evento mantido leva `suppressed=<descartados>` para a contagem poder ser refeita.
+- `IsoTimestamper` gera o mesmo timestamp do TimeStamper(fmt="iso") sem
+  formatar a data inteira a cada evento.
+- `render_json` serializa com orjson quando instalado (json da stdlib senão) e já
+  devolve bytes.
+- `QueueLogger` só enfileira a linha pronta; a thread `log-writer` (`LogWriter`)
+  grava em lote e faz um flush por lote. Fila cheia descarta e conta (`dropped`),
+  em vez de segurar o request.
+"""
+import atexit
+import io
+import json
+import queue
+import sys
+import threading
+import time
+import structlog
+
+from typing import Optional
+
+try:
+    import orjson  # opcional: sem ele, json da stdlib (~10x mais lento para renderizar)
+except ImportError:
+    orjson = None
+
+
+_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
+
+def render_json(_, __, event_dict: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event_dict, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(event_dict, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class IsoTimestamper:
+    """
+    Mesmo formato do TimeStamper(fmt="iso") ("2025-01-01T12:00:00.123456Z"), mas o
+    prefixo até o segundo fica em cache: só os microssegundos são formatados por evento.
+    """
+    __slots__ = ("_second", "_prefix")
+
+    def __init__(self):
+        self._second = -1
+        self._prefix = ""
+
+    def __call__(self, _, __, event_dict: dict) -> dict:
+        now = time.time()
+        second = int(now)
+        if second != self._second:
+            self._prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second = second
+        event_dict["timestamp"] = f"{self._prefix}.{int((now - second) * 1_000_000):06d}Z"
+        return event_dict
+
+
+class _Rule:
+    __slots__ = ("every", "rate", "tokens", "updated", "seen", "dropped")
+
+    def __init__(self, every: int, rate: float):
+        self.every = max(1, every)
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.seen = 0
+        self.dropped = 0
+
+    def keep(self) -> bool:
+        self.seen += 1
+        if self.every > 1 and self.seen % self.every:
+            return False
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        # token bucket: rajada de até `rate` eventos, repõe `rate` por segundo
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class EventSampler:
+    """
+    Processor de amostragem por nome de evento. Só atua em debug/info:
+    warnings e erros passam sempre.
+
+        EventSampler.parse("log_appended=10/50,udp-message-sent=1/20")
+        # log_appended: 1 a cada 10, no máximo 50/s; udp-message-sent: todos, até 20/s
+    """
+    def __init__(self, rules: dict[str, tuple[int, float]]):
+        self.rules = {event: _Rule(every, rate) for event, (every, rate) in rules.items()}
+
+    @classmethod
+    def parse(cls, spec: str) -> "EventSampler":
+        rules = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            event, _, params = item.partition("=")
+            every, _, rate = params.partition("/")
+            rules[event.strip()] = (int(every or 1), float(rate or 0))
+        return cls(rules)
+
+    def __call__(self, _, method_name: str, event_dict: dict) -> dict:
+        rule = self.rules.get(event_dict.get("event"))
+        if rule is None or method_name not in ("debug", "info"):
+            return event_dict
+        if not rule.keep():
+            rule.dropped += 1
+            raise structlog.DropEvent
+        if rule.dropped:
+            event_dict["suppressed"] = rule.dropped
+            rule.dropped = 0
+        return event_dict
+
+    def stats(self) -> dict:
+        return {event: {"seen": r.seen, "pending_suppressed": r.dropped} for event, r in self.rules.items()}
+
+
+class LogWriter:
+    """Fila de linhas prontas + thread que grava em lote no stream (stderr por padrão)."""
+    def __init__(self, stream=None, max_pending: int = 10_000, batch: int = 512):
+        self.stream = stream
+        self.max_pending = max_pending
+        self.batch = batch
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LogWriter":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            atexit.unregister(self.stop)
+            atexit.register(self.stop)
+        return self
+
+    def put(self, line: bytes):
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put(line)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a thread gravar tudo o que foi enfileirado até aqui."""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _write(self, lines: list[bytes]):
+        stream = self.stream or sys.stderr
+        data = b"\n".join(lines) + b"\n"
+        try:
+            if isinstance(stream, io.TextIOBase):
+                out = getattr(stream, "buffer", None)
+                if out is None:  # ex.: StringIO
+                    stream.write(data.decode(errors="replace"))
+                else:
+                    stream.flush()  # texto ainda no buffer do TextIOWrapper sai antes
+                    out.write(data)
+                    out.flush()
+            else:
+                stream.write(data)
+                stream.flush()
+            self.written += len(lines)
+        except (OSError, ValueError):
+            self.dropped += len(lines)  # stream fechado: não derruba a thread
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            lines, markers, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    lines.append(item)
+                if len(lines) >= self.batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if lines:
+                self._write(lines)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+
+class QueueLogger:
+    """Logger final do structlog: a linha (bytes) já vem renderizada, só é enfileirada."""
+    def __init__(self, writer: LogWriter):
+        self._put = writer.put
+
+    def msg(self, message: bytes):
+        self._put(message)
+
+    log = debug = info = warn = warning = msg
+    err = error = critical = fatal = exception = failure = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, writer: LogWriter):
+        self._logger = QueueLogger(writer)
+
+    def __call__(self, *args) -> QueueLogger:
+        return self._logger
+
+
+writer = LogWriter()
+sampler = EventSampler({})
+
+
+def setup_logging(level: str = "info", sampling: str = "", max_pending: int = 10_000, stream=None) -> LogWriter:
+    """Configura o structlog (idempotente; o último chamado vale) e inicia a thread de escrita."""
+    global sampler
+    sampler = EventSampler.parse(sampling)
+    writer.max_pending = max_pending
+    if stream is not None:
+        writer.stream = stream
+    structlog.configure(
+        processors=[
+            sampler,
+            IsoTimestamper(),
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            render_json,
+        ],
+        context_class=dict,
+        logger_factory=QueueLoggerFactory(writer),
+        wrapper_class=structlog.make_filtering_bound_logger(_LEVELS.get(level.lower(), 20)),
+        cache_logger_on_first_use=True,
+    )
+    return writer.start()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import structlog
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+
+log = structlog.get_logger()
+
+Starter = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class Component:
+    name: str
+    start: Starter
+    stop: Optional[Starter] = None
+    timeout: float = 5.0
+    check: Optional[Callable[[], bool]] = None  # saúde ao vivo (ex.: serial ainda aberta)
+    status: str = "pending"                      # pending | ready | failed
+    duration_ms: Optional[float] = None          # última tentativa de start
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        if self.status != "ready":
+            return False
+        try:
+            return self.check is None or bool(self.check())
+        except Exception:
+            return False
+
+    def state(self) -> dict:
+        status = self.status
+        if status == "ready" and not self.healthy:
+            status = "degraded"
+        return {"status": status, "duration_ms": self.duration_ms, "attempts": self.attempts, "error": self.error}
+
+
+class ResourceManager:
+    """
+    Recursos externos da app (Mongo, serial, UDP, encurtador, uploader de logs),
+    iniciados em paralelo pelo lifespan, cada um com seu timeout.
+    - `start()` nunca espera mais que o maior timeout: o que falhar/estourar fica
+      "failed" e a app sobe degradada, em vez de travar no import/startup.
+    - Uma task tenta de novo, a cada `retry_interval`, o que não estiver saudável
+      (inclusive o que caiu depois, via `check`).
+    - `snapshot()` alimenta o /ready: duração de start, tentativas e erro por componente.
+    - `stop()` encerra na ordem inversa do registro.
+    """
+    def __init__(self, retry_interval: float = 15.0):
+        self.retry_interval = retry_interval
+        self._components: dict[str, Component] = {}
+        self._retry_task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, start: Starter, stop: Optional[Starter] = None,
+            timeout: float = 5.0, check: Optional[Callable[[], bool]] = None) -> Component:
+        component = self._components[name] = Component(name, start, stop, timeout, check)
+        return component
+
+    @property
+    def ready(self) -> bool:
+        return all(c.healthy for c in self._components.values())
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "degraded",
+            "components": {name: c.state() for name, c in self._components.items()},
+        }
+
+    async def _start_one(self, component: Component) -> bool:
+        component.attempts += 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(component.start(), timeout=component.timeout)
+            component.status, component.error = "ready", None
+        except asyncio.TimeoutError:
+            component.status, component.error = "failed", f"timeout após {component.timeout}s"
+        except Exception as e:
+            component.status, component.error = "failed", str(e) or type(e).__name__
+        component.duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+        if component.status == "ready":
+            log.info("resource-ready", resource=component.name,
+                     duration_ms=component.duration_ms, attempt=component.attempts)
+        else:
+            log.warning("resource-start-failed", resource=component.name, error=component.error,
+                        duration_ms=component.duration_ms, attempt=component.attempts)
+        return component.status == "ready"
+
+    async def start(self) -> dict:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(self._start_one(c) for c in self._components.values()))
+        snapshot = self.snapshot()
+        log.info("resources-started", status=snapshot["status"],
+                 duration_ms=round((time.perf_counter() - t0) * 1000, 1),
+                 components={name: c.duration_ms for name, c in self._components.items()})
+        if self._retry_task is None or self._retry_task.done():
+            self._retry_task = asyncio.create_task(self._retry_loop(), name="resource-retry")
+        return snapshot
+
+    async def _retry_loop(self):
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            pending = [c for c in self._components.values() if not c.healthy]
+            if pending:
+                await asyncio.gather(*(self._start_one(c) for c in pending))
+
+    async def stop(self):
+        if self._retry_task:
+            self._retry_task.cancel()
+            try:
+                await self._retry_task
+            except asyncio.CancelledError:
+                pass
+            self._retry_task = None
+        for component in reversed(list(self._components.values())):
+            if component.stop is None:
+                continue
+            try:
+                await asyncio.wait_for(component.stop(), timeout=component.timeout)
+            except Exception as e:
+                log.warning("resource-stop-failed", resource=component.name, error=str(e) or type(e).__name__)
+            component.status = "pending"
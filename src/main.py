@@ -1,41 +1,110 @@
+import asyncio
 import structlog
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from core.config import settings
+from core.database import client, db
+from core.indexes import ensure_indexes
+from core.logging_setup import setup_logging
+from core.resources import ResourceManager
 
 from routes.api import router as api_router
-from routes.registrations import router as reg_router
-from routes.lego import router as lego_router
+from routes.registrations import router as reg_router, registration_writer
+from routes.lego import router as lego_router, session_pool, page_cache, dispensers, udp_sender, inventory_store
 
 from middlewares.replay_guard import ReplayGuardMiddleware
+from middlewares.rate_limit import RateLimitMiddleware, RateLimitRule
+from utils import metrics, shotener_client
+from utils.log_sender import LogSender
+from utils.static_assets import StaticAssets
 
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "frontend" / "static"
 
+
+async def _start_mongo():
+    await client.admin.command("ping")
+    await ensure_indexes(db)
+
+
+async def _close_mongo():
+    client.close()
+
+
+async def _start_udp():
+    await udp_sender.open()
+
+
+async def _close_udp():
+    udp_sender.close()
+
+
+async def _start_log_uploader():
+    LogSender().uploader.start()
+
+
+async def _stop_log_uploader():
+    await LogSender().uploader.stop()
+    # a thread do journal é daemon: sem isso, um lote em gravação morre com o processo
+    await asyncio.to_thread(LogSender().close)
+
+
+# recursos externos: sobem em paralelo no lifespan; o que falhar deixa a app degradada (/ready 503)
+resources = ResourceManager(retry_interval=settings.STARTUP_RETRY_SECONDS)
+resources.add("mongo", _start_mongo, stop=_close_mongo, timeout=settings.MONGO_STARTUP_TIMEOUT_SECONDS)
+# pronto com pelo menos um dispenser saudável e aberto; porta que cair depois é reaberta pelo retry
+resources.add("serial", dispensers.open, stop=dispensers.close,
+              timeout=settings.STARTUP_TIMEOUT_SECONDS, check=lambda: dispensers.ready_count > 0)
+resources.add("udp", _start_udp, stop=_close_udp,
+              timeout=settings.STARTUP_TIMEOUT_SECONDS, check=lambda: udp_sender.is_open)
+# Cliente do encurtador compartilhado: pool/keep-alive reaproveitado entre requests
+resources.add("shortener", shotener_client.start_client, stop=shotener_client.close_client,
+              timeout=settings.STARTUP_TIMEOUT_SECONDS)
+resources.add("log_uploader", _start_log_uploader, stop=_stop_log_uploader, timeout=settings.STARTUP_TIMEOUT_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    page_cache.warm()
+    await resources.start()
+    if settings.SESSION_POOL_ENABLED:
+        session_pool.start()
+    try:
+        yield
+    finally:
+        await session_pool.stop()
+        await registration_writer.stop()
+        await inventory_store.close()  # grava as operações ainda no lote antes de sair
+        await resources.stop()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title=settings.APP_NAME, version="0.1.5.6-dev", lifespan=lifespan)
-    # Structlog setup
-    structlog.configure(
-        processors=[
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.add_log_level,
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer(),
-        ],
-        context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
-        cache_logger_on_first_use=True,
-    )
+    # Structlog setup: render rápido + escrita numa thread (core.logging_setup)
+    setup_logging(settings.LOG_LEVEL, sampling=settings.LOG_SAMPLING, max_pending=settings.LOG_QUEUE_MAX)
     log = structlog.get_logger()
 
-    app = FastAPI()
+    if settings.RATE_LIMIT_ENABLED:
+        # adicionado antes do CORS = roda dentro dele: o 429 leva os headers de CORS
+        per_minute = settings.RATE_LIMIT_IP_PER_MINUTE
+        app.add_middleware(
+            RateLimitMiddleware,
+            rules=(
+                RateLimitRule("users-email", "/api/users/", settings.RATE_LIMIT_PER_DAY, 86400, key="email"),
+                RateLimitRule("users-ip", "/api/users/", per_minute, 60),
+                RateLimitRule("qrcode-ip", "/api/lego/qrcode/init", per_minute, 60),
+            ),
+            backend=settings.RATE_LIMIT_BACKEND,
+            redis_url=settings.REDIS_URL,
+            trusted_proxies=settings.TRUSTED_PROXIES,
+        )
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -44,11 +113,22 @@ def create_app() -> FastAPI:
         allow_headers=["*"]
     )
 
-    app.add_middleware(ReplayGuardMiddleware, ttl_seconds=4)
+    app.add_middleware(ReplayGuardMiddleware, ttl_seconds=4, backend=settings.REPLAY_GUARD_BACKEND)
 
 
-    app.mount("/design", StaticFiles(directory=STATIC_DIR / "design"), name="design")
-    app.mount("/templates/lego", StaticFiles(directory=STATIC_DIR / "templates" / "lego"), name="templates_lego")
+    # assets em memória/mmap, com immutable para nomes com hash (tools/build_assets.py)
+    template_set = settings.TEMPLATE_SET
+    for prefix, directory, name in (
+        ("/design", STATIC_DIR / "design", "design"),
+        (f"/templates/{template_set}", STATIC_DIR / "templates" / template_set, f"templates_{template_set}"),
+    ):
+        if not directory.is_dir():
+            log.warning("static-dir-missing", prefix=prefix, directory=str(directory))
+            continue
+        assets = StaticAssets(directory=directory, check_mtime=settings.PAGE_CACHE_CHECK_MTIME)
+        if settings.STATIC_PRELOAD:
+            assets.preload()
+        app.mount(prefix, assets, name=name)
 
 
     app.include_router(api_router)
@@ -59,4 +139,19 @@ def create_app() -> FastAPI:
     async def alive():
         return {"status": "ok", "env": settings.ENV}
 
+    @app.get("/ready")
+    async def ready():
+        # 503 enquanto algum recurso (ex.: serial do dispenser) não estiver pronto
+        snapshot = resources.snapshot()
+        return JSONResponse(snapshot, status_code=200 if resources.ready else 503)
+
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics():
+            return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    @app.get("/alive/shortener", include_in_schema=False)
+    async def shortener_pool():
+        return shotener_client.pool_stats()
+
     return app
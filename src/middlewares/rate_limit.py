@@ -0,0 +1,194 @@
+# src/middlewares/rate_limit.py
+import ipaddress
+import json
+import math
+import time
+import structlog
+from dataclasses import dataclass
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.responses import JSONResponse
+
+from middlewares.rate_limit_store import build_rate_limit_store
+from middlewares.replay_guard import _header
+
+log = structlog.get_logger()
+
+MAX_BUFFERED_BODY = 16 * 1024  # só bodies pequenos (JSON de cadastro) são lidos para achar o e-mail
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """`limit` requisições por `period` segundos, por chave ("ip" ou "email" do body JSON)."""
+    name: str
+    path: str
+    limit: int
+    period: float
+    key: str = "ip"
+    methods: frozenset[str] = frozenset({"POST"})
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+    def policy(self) -> str:
+        return f"{self.limit};w={int(self.period)}"
+
+
+@dataclass
+class RateLimitResult:
+    rule: RateLimitRule
+    allowed: bool
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        headers = [
+            (b"ratelimit-limit", str(self.rule.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(self.reset_after)).encode()),
+            (b"ratelimit-policy", self.rule.policy().encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(math.ceil(self.retry_after)).encode()))
+        return headers
+
+
+def parse_trusted_proxies(spec: str) -> tuple:
+    """"10.0.0.1,172.16.0.0/12" -> redes (IPs soltos viram /32 ou /128)."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+def _is_trusted(address: str, trusted: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_ip(scope: Scope, trusted: tuple = ()) -> str:
+    """
+    IP do cliente para as chaves do rate limit. X-Forwarded-For/X-Real-IP só valem
+    quando a conexão vem de um proxy confiável; no XFF vale o último salto que não
+    é proxy confiável (os anteriores podem ter sido forjados pelo cliente).
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not trusted or not _is_trusted(peer, trusted):
+        return peer
+    hops = [hop.strip() for hop in _header(scope, b"x-forwarded-for").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    return (hops[0] if hops else "") or _header(scope, b"x-real-ip") or peer
+
+
+def _email_from_body(body: bytes) -> str:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return ""
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) else ""
+
+
+class RateLimitMiddleware:
+    """
+    Rate limit por IP ou por e-mail nas rotas configuradas, com GCRA sobre um store
+    plugável: "local" (memória do processo), "redis" (compartilhado) ou "memory" (fake).
+    ASGI puro e antes de qualquer rota: o excesso volta 429 sem tocar Mongo/encurtador.
+    Respostas das rotas limitadas levam os headers RateLimit-Limit/Remaining/Reset/Policy
+    (da regra mais apertada); o 429 inclui Retry-After.
+    Regras por e-mail leem o body (até MAX_BUFFERED_BODY) e o reentregam ao app;
+    sem e-mail no body, a chave cai para o IP.
+    Um request só consome das regras se todas permitirem: as já consumidas são
+    devolvidas quando uma regra seguinte recusa.
+    Headers de proxy só contam vindos de `trusted_proxies` (ver `client_ip`).
+    """
+    def __init__(self, app: ASGIApp, rules: tuple[RateLimitRule, ...] = (), backend: str = "local",
+                 redis_url: Optional[str] = None, store=None, trusted_proxies: str = ""):
+        self.app = app
+        self.trusted_proxies = parse_trusted_proxies(trusted_proxies)
+        self.store = store if store is not None else build_rate_limit_store(backend, redis_url)
+        self.rules: dict[str, list[RateLimitRule]] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.path, []).append(rule)
+
+    async def check(self, rule: RateLimitRule, ident: str, now: Optional[float] = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        allowed, tat = await self.store.gcra(f"{rule.name}:{ident}", now, rule.interval, rule.period)
+        ahead = tat - now  # quanto do período já está "consumido"
+        return RateLimitResult(
+            rule=rule,
+            allowed=allowed,
+            remaining=max(0, int((rule.period - ahead) // rule.interval)),
+            reset_after=max(0.0, ahead),
+            retry_after=max(0.0, ahead + rule.interval - rule.period),
+        )
+
+    async def refund(self, rule: RateLimitRule, ident: str):
+        """Devolve a unidade consumida por `check` (custo negativo recua o tat)."""
+        await self.store.gcra(f"{rule.name}:{ident}", time.time(), rule.interval, rule.period, cost=-1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        rules = self.rules.get(scope["path"]) if scope["type"] == "http" else None
+        if rules:
+            rules = [r for r in rules if scope["method"] in r.methods]
+        if not rules:
+            return await self.app(scope, receive, send)
+
+        ip = client_ip(scope, self.trusted_proxies)
+        buffered: Optional[list[Message]] = None
+        email = ""
+        if any(r.key == "email" for r in rules):
+            buffered, body = [], b""
+            while True:
+                message = await receive()
+                buffered.append(message)
+                if message["type"] != "http.request":
+                    break
+                body += message.get("body", b"")
+                if not message.get("more_body", False) or len(body) > MAX_BUFFERED_BODY:
+                    break
+            email = _email_from_body(body) if len(body) <= MAX_BUFFERED_BODY else ""
+
+        results, consumed = [], []
+        for rule in rules:
+            ident = email if rule.key == "email" and email else ip
+            result = await self.check(rule, ident)
+            results.append(result)
+            if not result.allowed:
+                for prev_rule, prev_ident in consumed:
+                    await self.refund(prev_rule, prev_ident)
+                log.warning("rate-limit-hit", rule=rule.name, ip=ip, path=scope["path"],
+                            retry_after=round(result.retry_after, 1))
+                response = JSONResponse(
+                    {"detail": "Muitas requisições. Tente novamente mais tarde."},
+                    status_code=429,
+                    headers={k.decode(): v.decode() for k, v in result.headers()},
+                )
+                return await response(scope, receive, send)
+            consumed.append((rule, ident))
+
+        tightest = min(results, key=lambda r: r.remaining)
+
+        if buffered:
+            pending = buffered
+
+            async def replay_receive() -> Message:
+                if pending:
+                    return pending.pop(0)
+                return await receive()
+            app_receive = replay_receive
+        else:
+            app_receive = receive
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *tightest.headers()]}
+            await send(message)
+
+        await self.app(scope, app_receive, send_with_headers)
@@ -0,0 +1,116 @@
+# src/middlewares/rate_limit_store.py
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+
+def gcra_step(stored_tat: Optional[float], now: float, interval: float, period: float, cost: int = 1) -> tuple[bool, float]:
+    """
+    Um passo do GCRA (generic cell rate algorithm). `tat` é o "theoretical arrival
+    time": cada unidade consumida empurra o tat em `interval` (= period / limit);
+    o pedido passa se o tat resultante não ficar mais de `period` à frente de agora.
+    Retorna (permitido, tat) — o tat novo se permitido, o atual se negado.
+    `cost` negativo devolve unidades (sempre permitido).
+    """
+    tat = max(stored_tat or now, now)
+    new_tat = tat + interval * cost
+    if new_tat - now > period:
+        return False, tat
+    return True, new_tat
+
+
+class LocalRateLimitStore:
+    """
+    Estado do GCRA em memória do processo: um float (tat) por chave.
+    Chaves cujo tat já passou equivalem a ausentes; `max_keys` limita a memória
+    descartando as menos usadas (LRU), o que só pode afrouxar o limite.
+    """
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tat: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    async def gcra(self, key: str, now: float, interval: float, period: float, cost: int = 1) -> tuple[bool, float]:
+        allowed, tat = gcra_step(self._tat.get(key), now, interval, period, cost)
+        if allowed:
+            self._tat[key] = tat
+            self._tat.move_to_end(key)
+            while len(self._tat) > self.max_keys:
+                self._tat.popitem(last=False)
+        return allowed, tat
+
+
+class MemoryRateLimitStore:
+    """
+    Fake em memória do store compartilhado, para testes e benchmarks: vários
+    limitadores (simulando workers) podem receber o mesmo `state` e o passo é
+    serializado por lock, como o script atômico no Redis. `latency` simula o round-trip.
+    """
+    def __init__(self, state: Optional[dict] = None, latency: float = 0.0):
+        self.state = state if state is not None else {}
+        self.latency = latency
+        self._lock = asyncio.Lock()
+
+    async def gcra(self, key: str, now: float, interval: float, period: float, cost: int = 1) -> tuple[bool, float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        async with self._lock:
+            allowed, tat = gcra_step(self.state.get(key), now, interval, period, cost)
+            if allowed:
+                self.state[key] = tat
+        return allowed, tat
+
+
+_GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+if new_tat - now > period then
+    return {0, tostring(tat)}
+end
+if new_tat <= now then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+end
+return {1, tostring(new_tat)}
+"""
+
+
+class RedisRateLimitStore:
+    """
+    Estado compartilhado entre workers/hosts no Redis (REDIS_URL). O passo do GCRA
+    roda num script Lua, atômico no servidor; a chave expira quando o tat passa.
+    Requer o pacote `redis` (importado só quando este backend é usado).
+    """
+    def __init__(self, url: str, prefix: str = "rl:"):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_GCRA_LUA)
+        self.prefix = prefix
+
+    async def gcra(self, key: str, now: float, interval: float, period: float, cost: int = 1) -> tuple[bool, float]:
+        allowed, tat = await self._script(keys=[self.prefix + key], args=[now, interval, period, cost])
+        return bool(int(allowed)), float(tat)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def build_rate_limit_store(backend: str, redis_url: Optional[str] = None, max_keys: int = 100_000):
+    """Cria o store do RateLimit: "local" | "redis" | "memory"."""
+    if backend == "local":
+        return LocalRateLimitStore(max_keys=max_keys)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("RATE_LIMIT_BACKEND=redis requer REDIS_URL")
+        return RedisRateLimitStore(redis_url)
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    raise ValueError(f"backend de rate limit desconhecido: {backend}")
@@ -1,79 +1,109 @@
 # src/middlewares/replay_guard.py
-import time
 import hashlib
 import structlog
-from typing import Callable, Awaitable
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.responses import JSONResponse
-from starlette.requests import Request
+
+from middlewares.replay_store import build_replay_store
+from utils.metrics import REPLAY_GUARD_HITS
 
 log = structlog.get_logger()
 
+
+def _header(scope: Scope, name: bytes) -> str:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v.decode("latin-1")
+    return ""
+
+
+def _client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return (
+        _header(scope, b"x-forwarded-for").split(",")[0].strip()
+        or _header(scope, b"x-real-ip")
+        or (client[0] if client else "unknown")
+    )
+
+
+def _has_body(scope: Scope) -> bool:
+    length = _header(scope, b"content-length")
+    return bool(_header(scope, b"transfer-encoding")) or (length.isdigit() and int(length) > 0)
+
+
 class ReplayGuardMiddleware:
     """
     Bloqueia replays rápidos do mesmo request (IP + path + query + body) por uma janela (TTL) em segundos.
-    Escopo: instância do processo (memória local).
+    Escopo conforme o backend: "local" (memória do processo), "shm" (memória
+    compartilhada entre workers do mesmo host) ou "mongo" (entre hosts).
+    ASGI puro: o body é hasheado em streaming enquanto é repassado ao app, sem bufferizar;
+    a checagem acontece no último chunk (ou antes do app, se não houver body).
     """
     def __init__(self, app: ASGIApp, ttl_seconds: int = 5, protected_paths: tuple[str, ...] = (
         "/api/lego/session/complete",
         "/api/lego/form",
-    )):
+    ), backend: str = "local", max_keys: int = 50_000, store=None):
         self.app = app
         self.ttl = ttl_seconds
-        self.protected_paths = protected_paths
-        self._seen: dict[str, float] = {}  # key -> last_seen_epoch
+        self.protected_paths = frozenset(protected_paths)
+        self.store = store if store is not None else build_replay_store(backend, ttl_seconds, max_keys=max_keys)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
-        if scope["type"] != "http":
+        # só protege paths específicos
+        if scope["type"] != "http" or scope["path"] not in self.protected_paths:
             return await self.app(scope, receive, send)
 
-        request = Request(scope, receive=receive)
+        client_ip = _client_ip(scope)
+        query = scope.get("query_string", b"").decode("latin-1")
+        key_base = f"{client_ip}|{scope['method']}|{scope['path']}|{query}"
 
-        # só protege paths específicos
-        if request.url.path not in self.protected_paths:
-            return await self.app(scope, receive, send)
+        async def is_replay(body_hash: str) -> bool:
+            since = await self.store.check_and_set(f"{key_base}|{body_hash}")
+            if since is None:
+                return False
+            REPLAY_GUARD_HITS.labels(scope["method"]).inc()  # path tem ids: cardinalidade sem limite
+            log.warning("replay-guard-hit", ip=client_ip, path=scope["path"], query=query, since=since)
+            return True
 
-        # extrai IP
-        client_ip = (
-            request.headers.get("x-forwarded-for", "")
-            .split(",")[0]
-            .strip()
-            or request.headers.get("x-real-ip", "")
-            or (request.client.host if request.client else "unknown")
-        )
-
-        # lê body de forma segura (vamos reinjetar depois)
-        raw_body = await request.body()
-
-        # monta chave única (IP + path + query + hash(body))
-        key_base = f"{client_ip}|{request.method}|{str(request.url.path)}|{request.url.query}"
-        body_hash = hashlib.sha256(raw_body).hexdigest() if raw_body else "-"
-        k = f"{key_base}|{body_hash}"
-
-        now = time.time()
-        # limpeza leve (best-effort)
-        if len(self._seen) > 2000:
-            expired = [kk for kk, ts in self._seen.items() if now - ts > self.ttl]
-            for kk in expired:
-                self._seen.pop(kk, None)
-
-        last = self._seen.get(k)
-        if last is not None and (now - last) < self.ttl:
-            log.warning("replay-guard-hit", ip=client_ip, path=str(request.url.path),
-                        query=request.url.query, since=now - last)
+        async def reject():
             response = JSONResponse(
                 {"detail": "Ação repetida muito rápido. Tente novamente em alguns segundos."},
                 status_code=429,
             )
             await response(scope, receive, send)
-            return
 
-        # registra primeira vez
-        self._seen[k] = now
+        if not _has_body(scope):
+            if await is_replay("-"):
+                return await reject()
+            return await self.app(scope, receive, send)
+
+        hasher = hashlib.sha256()
+        seen_bytes = False
+        rejected = False
+
+        async def hashing_receive() -> Message:
+            nonlocal seen_bytes, rejected
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            chunk = message.get("body", b"")
+            if chunk:
+                hasher.update(chunk)
+                seen_bytes = True
+            if not message.get("more_body", False):
+                if await is_replay(hasher.hexdigest() if seen_bytes else "-"):
+                    rejected = True
+                    await reject()
+                    # o app vê o cliente como desconectado e não processa o request
+                    return {"type": "http.disconnect"}
+            return message
 
-        # reinjeta o body para downstream
-        async def _receive() -> dict:
-            return {"type": "http.request", "body": raw_body, "more_body": False}
+        async def guarded_send(message: Message):
+            if not rejected:
+                await send(message)
 
-        # segue o fluxo
-        return await self.app(scope, _receive, send)
+        try:
+            await self.app(scope, hashing_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
@@ -0,0 +1,212 @@
+# src/middlewares/replay_store.py
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from multiprocessing import shared_memory
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+
+class LocalReplayStore:
+    """
+    Chaves com expiração em memória do processo, TTL fixo.
+    Como o TTL é constante, a ordem de inserção é também a ordem de expiração:
+    um deque (expira_em, chave) permite limpar só a cabeça (O(1) amortizado),
+    sem varrer o dict. `max_keys` é um teto rígido: acima dele a chave mais
+    antiga é descartada mesmo antes de expirar.
+    """
+    def __init__(self, ttl_seconds: float, max_keys: int = 50_000):
+        self.ttl = ttl_seconds
+        self.max_keys = max_keys
+        self._expiry: dict[str, float] = {}
+        self._order: deque[tuple[float, str]] = deque()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def _purge(self, now: float):
+        order, expiry = self._order, self._expiry
+        while order and order[0][0] <= now:
+            exp, key = order.popleft()
+            if expiry.get(key) == exp:
+                del expiry[key]
+
+    async def check_and_set(self, key: str) -> Optional[float]:
+        """
+        Registra `key` se ausente/expirada e retorna None; se ainda válida,
+        retorna há quantos segundos foi vista (replay).
+        """
+        now = time.monotonic()
+        self._purge(now)
+        exp = self._expiry.get(key)
+        if exp is not None:
+            return now - (exp - self.ttl)
+        if len(self._expiry) >= self.max_keys:
+            old_exp, old_key = self._order.popleft()
+            if self._expiry.get(old_key) == old_exp:
+                del self._expiry[old_key]
+                self.evicted += 1
+        exp = now + self.ttl
+        self._expiry[key] = exp
+        self._order.append((exp, key))
+        return None
+
+
+class MongoReplayStore:
+    """
+    Chaves compartilhadas entre workers/hosts via Mongo.
+    Insert-if-absent atômico: upsert que só casa com documento já expirado;
+    se a chave existe e ainda vale, o upsert colide no _id (DuplicateKeyError) => replay.
+    O índice TTL só faz a coleta de lixo (o monitor do Mongo roda a cada ~60 s).
+    """
+    def __init__(self, coll, ttl_seconds: float):
+        self.coll = coll
+        self.ttl = ttl_seconds
+        self._indexed = False
+
+    async def _ensure_index(self):
+        if not self._indexed:
+            await self.coll.create_index("expires_at", expireAfterSeconds=0, name="ttl_expires_at")
+            self._indexed = True
+
+    async def check_and_set(self, key: str) -> Optional[float]:
+        await self._ensure_index()
+        now = datetime.now(timezone.utc)
+        _id = hashlib.sha256(key.encode()).hexdigest()
+        try:
+            await self.coll.update_one(
+                {"_id": _id, "expires_at": {"$lte": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+            )
+            return None
+        except DuplicateKeyError:
+            doc = await self.coll.find_one({"_id": _id}, {"expires_at": 1})
+            if not doc:
+                return 0.0
+            expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+            return self.ttl - (expires_at - now).total_seconds()
+
+
+class _FileLock:
+    """Lock entre processos do mesmo host (fcntl no POSIX, msvcrt no Windows)."""
+    def __init__(self, path: str):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def __enter__(self):
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def _resource_tracker_call(action: str, shm: shared_memory.SharedMemory):
+    try:
+        from multiprocessing import resource_tracker
+        getattr(resource_tracker, action)(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SharedMemoryReplayStore:
+    """
+    Tabela hash de tamanho fixo em memória compartilhada, para vários workers
+    uvicorn no mesmo host. Cada slot guarda (hash64 da chave, expira_em epoch);
+    sondagem linear numa janela curta; sem slot livre, reaproveita o que expira
+    primeiro (teto de memória fixo = slots * 16 bytes). Escritas sob lock de arquivo.
+    O bloco sobrevive aos workers (nenhum o remove ao sair, nem o criador): worker
+    reciclado volta para a mesma tabela. `unlink()` o remove explicitamente.
+    Worker só anexa ou, se o bloco não existe, cria; nunca remove/recria (irmãos
+    ainda mapeiam o bloco). Bloco menor que `slots` (config antiga) é erro.
+    """
+    _SLOT = struct.Struct("<Qd")
+
+    def __init__(self, ttl_seconds: float, name: str = "lego_replay_guard", slots: int = 1 << 16, probe: int = 16):
+        if slots & (slots - 1):
+            raise ValueError("slots deve ser potência de 2")
+        self.ttl = ttl_seconds
+        self.slots = slots
+        self.probe = probe
+        self._lock = _FileLock(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        with self._lock:  # anexar/criar serializado entre workers
+            self._shm = self._attach(name, slots * self._SLOT.size)
+        self._buf = self._shm.buf
+
+    @staticmethod
+    def _attach(name: str, size: int) -> shared_memory.SharedMemory:
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        # o resource_tracker removeria o bloco quando este processo saísse (criador
+        # ou não), e os workers seguintes criariam outra tabela
+        _resource_tracker_call("unregister", shm)
+        if shm.size < size:
+            # criado com menos slots: unpack_from sairia do bloco
+            shm.close()
+            raise RuntimeError(
+                f"bloco {name} tem {shm.size} bytes, precisa de {size}; "
+                "com os workers parados, remova-o (unlink) antes de subir"
+            )
+        return shm
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Remove o bloco compartilhado (com os workers parados, ex.: no deploy)."""
+        _resource_tracker_call("register", self._shm)  # unlink() desregistra
+        self._shm.unlink()
+
+    async def check_and_set(self, key: str) -> Optional[float]:
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        start = h & (self.slots - 1)
+        now = time.time()
+        slot_size = self._SLOT.size
+        with self._lock:
+            victim, victim_exp = None, float("inf")
+            for i in range(self.probe):
+                off = ((start + i) & (self.slots - 1)) * slot_size
+                kh, exp = self._SLOT.unpack_from(self._buf, off)
+                if kh == h and exp > now:
+                    return now - (exp - self.ttl)
+                if kh == 0 or exp <= now:
+                    if victim_exp > 0:
+                        victim, victim_exp = off, 0  # slot livre/expirado: preferido
+                elif exp < victim_exp:
+                    victim, victim_exp = off, exp
+            self._SLOT.pack_into(self._buf, victim, h, now + self.ttl)
+        return None
+
+
+def build_replay_store(backend: str, ttl_seconds: float, max_keys: int = 50_000):
+    """Cria o store do ReplayGuard: "local" | "mongo" | "shm"."""
+    if backend == "local":
+        return LocalReplayStore(ttl_seconds, max_keys=max_keys)
+    if backend == "mongo":
+        from core.database import db
+        return MongoReplayStore(db["replay_guard"], ttl_seconds)
+    if backend == "shm":
+        slots = 1 << max(10, (max_keys - 1).bit_length())
+        return SharedMemoryReplayStore(ttl_seconds, slots=slots)
+    raise ValueError(f"backend de replay guard desconhecido: {backend}")
@@ -1,35 +1,85 @@
 import uuid
+import json
+import hashlib
 import structlog
 import asyncio
-import time
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from datetime import datetime, timezone
 
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 from starlette.templating import Jinja2Templates
 from pathlib import Path
 from pymongo import ReturnDocument
 
 from utils.shotener_client import create_short_link
 from utils.udp_sender import UDPSender
-from utils.serial_comm import SerialComm
+from utils.dispenser_registry import DispenserRegistry, parse_ports
 from utils.log_sender import LogSender
+from utils.inventory_store import InventoryStore
+from utils.session_pool import SessionPool
+from utils.session_cache import SessionCache
+from utils.page_cache import PageCache, etag_matches
+from utils.session_events import SessionEventHub, SessionEvent, TERMINAL_STATUSES
+from utils.dispense_scheduler import DispenseScheduler, DispenseJob, PRIORITY_ADMIN, PRIORITY_SESSION
+from utils.metrics import MONGO_OP_SECONDS
 from core.config import settings
-from schemas.lego import SessionGetResponse, QRCodeInitResponse, SessionCompleteRequest, SessionCompleteResponse
+from core.database import db
+from core.indexes import check_plan
+from schemas.lego import (
+    SessionGetResponse,
+    QRCodeInitResponse,
+    SessionCompleteRequest,
+    SessionCompleteResponse,
+    DispenseJobResponse,
+)
 
 
 log = structlog.get_logger()
 router = APIRouter(prefix="/api/lego")
-udp_sender = UDPSender(port=settings.UDP_PORT)
-serial_comm = SerialComm(port=settings.SERIAL_PORT, baudrate=settings.SERIAL_BAUDRATE)
-serial_lock = asyncio.Lock()  # Lock para controlar acesso à serial
+# nada abre no import: socket e porta serial sobem no lifespan (core.resources) ou no primeiro uso
+udp_sender = UDPSender(
+    port=settings.UDP_PORT,
+    ack=settings.UDP_ACK_ENABLED,
+    ack_timeout=settings.UDP_ACK_TIMEOUT_SECONDS,
+    max_attempts=settings.UDP_MAX_ATTEMPTS,
+)
+# dispensers do stand (SERIAL_PORTS, ou só SERIAL_PORT): serial, lock e saúde por dispositivo
+dispensers = DispenserRegistry(
+    parse_ports(settings.SERIAL_PORTS or settings.SERIAL_PORT),
+    baudrate=settings.SERIAL_BAUDRATE,
+    max_failures=settings.DISPENSER_MAX_FAILURES,
+    cooldown=settings.DISPENSER_COOLDOWN_SECONDS,
+)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-template_dir = BASE_DIR / "frontend" / "static" / "templates" / "lego" / "html"
+TEMPLATE_ROOT = BASE_DIR / "frontend" / "static" / "templates" / settings.TEMPLATE_SET
+# tools/build_assets.py gera dist/html com os assets reescritos (woff2, webp/avif, nomes com hash)
+template_dir = TEMPLATE_ROOT / "dist" / "html"
+if not settings.ASSET_BUILD_ENABLED or not template_dir.is_dir():
+    template_dir = TEMPLATE_ROOT / "html"
 templates = Jinja2Templates(directory=str(template_dir))
+# páginas que não dependem do request: renderizadas 1x, servidas pré-comprimidas
+page_cache = PageCache(
+    templates,
+    pages=("claim.html", "cta.html", "terms.html", "admin.html", "form.html", "used.html", "error.html"),
+    check_mtime=settings.PAGE_CACHE_CHECK_MTIME,
+)
 
 SESSIONS_COLL = db["lego_sessions"]  # coleção Mongo para sessões
+POOL_COLL = db["lego_session_pool"]  # sessões/links pré-gerados ainda não usados
+POOL_LEASE_COLL = db["lego_session_pool_lease"]  # lease do refill do pool entre workers
+
+# GET /session/{sid} já serializado (etag, body); invalidado pelos helpers que mudam o status
+session_cache = SessionCache(
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+)
+# transições de status publicadas para GET /session/{sid}/events (SSE)
+session_events = SessionEventHub(max_pending=settings.SESSION_EVENTS_MAX_PENDING)
+
+INVENTORY_FILE = TEMPLATE_ROOT / "assets" / "inventory.json"
+inventory_store = InventoryStore(export_path=INVENTORY_FILE)  # inventory.json é só a visão exportada
 
 
 def _now_utc():
@@ -40,6 +90,7 @@ def _now_utc():
 # Helpers de Sessão
 # ----------------------------
 
+@MONGO_OP_SECONDS.timed("save_session")
 async def save_session(session_id: str, slug: str, short_url: str):
     doc = {
         "_id": session_id,
@@ -54,21 +105,40 @@ async def save_session(session_id: str, slug: str, short_url: str):
         "completed_at": None,
     }
     await SESSIONS_COLL.insert_one(doc)
+    session_events.publish(session_id, "pending")
     return doc
 
 
-async def get_session(session_id: str):
-    return await SESSIONS_COLL.find_one({"_id": session_id})
+SESSION_INFO_FIELDS = {
+    "slug": 1, "status": 1, "short_url": 1, "created_at": 1,
+    "form_opened_at": 1, "processing_started_at": 1, "completed_at": 1, "dispenser": 1,
+}
+
+
+@MONGO_OP_SECONDS.timed("get_session")
+async def get_session(session_id: str, projection: dict | None = None):
+    """Lê a sessão; `projection` limita os campos trazidos do Mongo."""
+    await check_plan(SESSIONS_COLL, f"get_session:{sorted(projection or {})}", {"_id": session_id}, projection)
+    return await SESSIONS_COLL.find_one({"_id": session_id}, projection)
 
 
+def _session_changed(session_id: str, status: str):
+    """Chamado depois de cada escrita de status: invalida o cache e publica a transição."""
+    session_cache.invalidate(session_id)
+    session_events.publish(session_id, status)
+
+
+@MONGO_OP_SECONDS.timed("try_mark_form_opened")
 async def try_mark_form_opened(session_id: str):
     """Marca que /form foi aberto e envia 'retire' apenas 1x (CAS)."""
-    return await SESSIONS_COLL.find_one_and_update(
-        {
-            "_id": session_id,
-            "status": "pending",
-            "retire_sent": {"$ne": True},
-        },
+    query = {
+        "_id": session_id,
+        "status": "pending",
+        "retire_sent": {"$ne": True},
+    }
+    await check_plan(SESSIONS_COLL, "try_mark_form_opened", query)
+    doc = await SESSIONS_COLL.find_one_and_update(
+        query,
         {
             "$set": {
                 "retire_sent": True,
@@ -78,17 +148,23 @@ async def try_mark_form_opened(session_id: str):
         },
         return_document=ReturnDocument.AFTER,
     )
+    if doc:
+        _session_changed(session_id, "form_shown")
+    return doc
 
 
+@MONGO_OP_SECONDS.timed("try_start_processing")
 async def try_start_processing(session_id: str, slug: str):
     """Marca início do processamento do /session/complete apenas 1x (CAS)."""
-    return await SESSIONS_COLL.find_one_and_update(
-        {
-            "_id": session_id,
-            "slug": slug,
-            "status": {"$in": ["pending", "form_shown"]},
-            "processing": {"$ne": True},
-        },
+    query = {
+        "_id": session_id,
+        "slug": slug,
+        "status": {"$in": ["pending", "form_shown"]},
+        "processing": {"$ne": True},
+    }
+    await check_plan(SESSIONS_COLL, "try_start_processing", query)
+    doc = await SESSIONS_COLL.find_one_and_update(
+        query,
         {
             "$set": {
                 "processing": True,
@@ -98,8 +174,19 @@ async def try_start_processing(session_id: str, slug: str):
         },
         return_document=ReturnDocument.AFTER,
     )
+    if doc:
+        _session_changed(session_id, "processing")
+    return doc
+
 
+@MONGO_OP_SECONDS.timed("assign_dispenser")
+async def assign_dispenser(session_id: str, dispenser: str):
+    """Registra na sessão qual dispenser vai entregar (o visitante vê em GET /session/{sid})."""
+    await SESSIONS_COLL.update_one({"_id": session_id}, {"$set": {"dispenser": dispenser}})
+    session_cache.invalidate(session_id)
 
+
+@MONGO_OP_SECONDS.timed("finalize_session")
 async def finalize_session(session_id: str, status: str):
     """Finaliza sessão com completed|failed (idempotente)."""
     await SESSIONS_COLL.update_one(
@@ -112,6 +199,35 @@ async def finalize_session(session_id: str, status: str):
             }
         },
     )
+    _session_changed(session_id, status)
+
+
+# ----------------------------
+# Pool de sessões pré-geradas
+# ----------------------------
+
+async def _mint_session_entry() -> dict:
+    """Gera session_id + link curto/QR no encurtador."""
+    session_id = str(uuid.uuid4())
+    long_url: str = f"{settings.CADASTRO_BASE_URL}?sid={session_id}"
+    (shortener_data, short_url) = await create_short_link(long_url, session_id=session_id)
+    return {
+        "_id": session_id,
+        "slug": shortener_data.slug,
+        "short_url": short_url,
+        "qr_png": str(shortener_data.qr_png),
+        "qr_svg": str(shortener_data.qr_svg),
+    }
+
+
+session_pool = SessionPool(
+    POOL_COLL,
+    mint=_mint_session_entry,
+    low=settings.SESSION_POOL_LOW,
+    high=settings.SESSION_POOL_HIGH,
+    ttl_seconds=settings.SESSION_POOL_TTL_SECONDS,
+    lease_coll=POOL_LEASE_COLL,
+)
 
 
 # ----------------------------
@@ -126,75 +242,132 @@ async def update_inventory_on_drop(log_sender, context="session"):
         log_sender: Instância do LogSender para gerar logs
         context: Contexto da operação ("session" ou "admin")
     """
-    import json
-    from pathlib import Path
-    
     try:
-        # Caminho para o arquivo de inventário
-        inventory_file = Path(__file__).resolve().parent.parent / "frontend" / "static" / "templates" / "lego" / "assets" / "inventory.json"
-        
-        # Carrega dados atuais do inventário
-        with open(inventory_file, 'r', encoding='utf-8') as f:
-            inventory_data = json.load(f)
-        
-        # Atualiza quantidade e contadores
-        old_quantity = inventory_data.get('current_quantity', 0)
-        inventory_data['current_quantity'] = max(0, old_quantity - 1)
-        inventory_data['total_dispensed'] = inventory_data.get('total_dispensed', 0) + 1
-        inventory_data['last_updated'] = _now_utc().isoformat()
-        
-        # Salva dados atualizados
-        with open(inventory_file, 'w', encoding='utf-8') as f:
-            json.dump(inventory_data, f, indent=4, ensure_ascii=False)
-        
+        before, after = await inventory_store.decrement()
+
         # Log da liberação bem-sucedida
-        if context == "admin":
-            log_sender.log("admin_condom_dispensed")
-            log.info("admin-condom-dispensed-successfully", 
-                     old_quantity=old_quantity,
-                     new_quantity=inventory_data['current_quantity'],
-                     total_dispensed=inventory_data['total_dispensed'],
-                     timestamp=_now_utc().isoformat())
-        else:
-            log_sender.log("session_condom_dispensed")
-            log.info("session-condom-dispensed-successfully", 
-                     old_quantity=old_quantity,
-                     new_quantity=inventory_data['current_quantity'],
-                     total_dispensed=inventory_data['total_dispensed'],
-                     timestamp=_now_utc().isoformat())
-        
+        await log_sender.log_durable(f"{context}_condom_dispensed")
+        log.info(f"{context}-condom-dispensed-successfully",
+                 old_quantity=before.get('current_quantity', 0),
+                 new_quantity=after['current_quantity'],
+                 total_dispensed=after['total_dispensed'],
+                 timestamp=after['last_updated'])
         return True
-        
+
     except Exception as e:
         log.error(f"{context}-inventory-update-error", error=str(e))
         return False
 
 
+# ----------------------------
+# Fila do dispenser
+# ----------------------------
+
+async def _run_session_drop(job: DispenseJob) -> str:
+    """Ciclo de hardware de uma sessão: drop + resposta serial + finalização."""
+    status_final = "failed"
+    log_sender = LogSender()
+    try:
+        # dispenser saudável menos carregado; só o lock dele é segurado durante o drop
+        async with dispensers.use() as device:
+            job.device = device.name
+            await assign_dispenser(job.session_id, device.name)
+            resp = await dispensers.request(
+                device, "drop", ("dropped", "hand_timeout", "out_of_stock"), timeout=20
+            )
+        job.result = resp
+
+        if resp == "dropped":
+            await log_sender.log_durable("product_dropped", additional=device.name)
+            log.info("product-dropped-successfully", session_id=job.session_id, dispenser=device.name)
+
+            # Atualiza inventário e gera logs
+            await update_inventory_on_drop(log_sender, "session")
+
+            status_final = "completed"
+        elif resp in ["hand_timeout", "out_of_stock"]:
+            log.error("serial-error", error=resp, session_id=job.session_id, slug=job.slug,
+                      dispenser=job.device)
+            await log_sender.log_durable("serial_error", additional=f"{resp}:{job.device}")
+        else:
+            job.result = "timeout"
+            log.error("serial-timeout", session_id=job.session_id, slug=job.slug, dispenser=job.device)
+    except Exception as e:
+        log.error("session-complete-error", error=str(e),
+                  session_id=job.session_id, slug=job.slug, dispenser=job.device)
+    finally:
+        # Finaliza sessão (sempre) com completed|failed
+        await finalize_session(job.session_id, status_final)
+        log.info("lego-session-finalized", session_id=job.session_id, status=status_final)
+        # display avisado em background: o ACK (até ~2 s com o display fora) não segura o próximo drop
+        udp_sender.notify("cta")
+    return status_final
+
+
+async def _run_admin_dispense(job: DispenseJob) -> str:
+    log_sender = LogSender()
+    # Atualiza o inventário diretamente (simula um drop pelo admin)
+    await update_inventory_on_drop(log_sender, "admin")
+    async with dispensers.use(job.device) as device:
+        job.device = device.name
+        await device.comm.send("hand")
+    await log_sender.log_durable("admin_dispense_triggered", additional=device.name)
+    job.result = "hand"
+    return "completed"
+
+
+async def _run_dispense_job(job: DispenseJob) -> str:
+    if job.kind == "admin":
+        return await _run_admin_dispense(job)
+    return await _run_session_drop(job)
+
+
+async def _on_dispense_cancelled(job: DispenseJob):
+    """Job de sessão expirou na fila: encerra a sessão como 'aborted'."""
+    if job.kind != "session":
+        return
+    await finalize_session(job.session_id, "aborted")
+    udp_sender.notify("cta")
+    await LogSender().log_durable("session_aborted", additional="queue_timeout")
+
+
+# um worker por dispenser: drops em dispensers diferentes correm em paralelo
+dispense_scheduler = DispenseScheduler(
+    runner=_run_dispense_job, on_cancel=_on_dispense_cancelled, concurrency=len(dispensers)
+)
+
+
 # ----------------------------
 # Endpoints
 # ----------------------------
 
 @router.post("/qrcode/init", response_model=QRCodeInitResponse)
 async def init_qrcode():
-    session_id = str(uuid.uuid4())
-    long_url: str = f"{settings.CADASTRO_BASE_URL}?sid={session_id}"
+    """
+    Entrega uma sessão pré-gerada do pool (sem ida ao encurtador); só gera
+    sob demanda quando o pool está vazio.
+    """
+    entry = await session_pool.pop() if settings.SESSION_POOL_ENABLED else None
+    if entry is None:
+        try:
+            entry = await _mint_session_entry()
+        except Exception as e:
+            log.error("qrcode-init-failed", error=str(e))
+            raise HTTPException(500, "Falha ao gerar QR/link no encurtador")
 
-    try:
-        (shortener_data, short_url) = await create_short_link(long_url, session_id=session_id)
-    except Exception as e:
-        log.error("qrcode-init-failed", error=str(e))
-        raise HTTPException(500, "Falha ao gerar QR/link no encurtador")
+    session_id = entry["_id"]
 
     # Salvar sessão no Mongo
-    await save_session(session_id, shortener_data.slug, short_url)
+    await save_session(session_id, entry["slug"], entry["short_url"])
 
-    log.info("lego-session-created", session_id=session_id, short_url=short_url)
+    log.info("lego-session-created", session_id=session_id, short_url=entry["short_url"],
+             pooled="minted_at" in entry)
     return QRCodeInitResponse(
         session_id=session_id,
-        short_url=short_url,
-        slug=shortener_data.slug,
-        qr_png=shortener_data.qr_png,
-        qr_svg=shortener_data.qr_svg,
+        short_url=entry["short_url"],
+        slug=entry["slug"],
+        qr_png=entry["qr_png"],
+        qr_svg=entry["qr_svg"],
     )
 
 
@@ -203,79 +376,71 @@ async def complete_session(req: SessionCompleteRequest):
     """
     - Chamado pelo backend do cadastro ao finalizar (antes do redirect).
     - Só permite 1 processamento por sessão (CAS).
+    - Não segura a requisição durante o ciclo de hardware: enfileira o drop e
+      retorna o job_id/posição; o resultado sai em GET /dispense/{job_id}.
     """
     # 1) "Reserva" a sessão para processamento (CAS)
     doc = await try_start_processing(req.session_id, req.slug)
     if not doc:
         # já processada, em processamento, slug inválido ou sessão encerrada
-        session = await get_session(req.session_id)
+        session = await get_session(req.session_id, {"slug": 1})
         if not session:
             raise HTTPException(404, "Sessão inválida ou expirada")
         if session.get("slug") != req.slug:
             raise HTTPException(400, "Slug não corresponde à sessão")
         raise HTTPException(409, "Sessão já encerrada ou em processamento")
 
-    status_final = "failed"
-    log_sender = LogSender()
+    # 2) Enfileira o drop; o worker do scheduler dirige a serial e finaliza a sessão
     try:
-        log_sender.log("session_complete")
-
-        # 2) Serial "drop" + aguarda resposta
-        async with serial_lock:
-            serial_comm.send("drop")
-
-            timeout_seconds = 20
-            start = time.time()
-            while time.time() - start < timeout_seconds:
-                resp = serial_comm.receive()
-                if resp:
-                    if resp == "dropped":
-                        udp_sender.send_with_confirmation("cta")
-                        log_sender.log("product_dropped")
-                        log.info("product-dropped-successfully", session_id=req.session_id)
-                        
-                        # Atualiza inventário e gera logs
-                        await update_inventory_on_drop(log_sender, "session")
-                        
-                        status_final = "completed"
-                        break
-                    elif resp in ["hand_timeout", "out_of_stock"]:
-                        log.error("serial-error", error=resp, session_id=req.session_id, slug=req.slug)
-                        log_sender.log("serial_error", additional=resp)
-                        udp_sender.send_with_confirmation("cta")
-                        status_final = "failed"
-                        break
-                else:
-                    await asyncio.sleep(0.1)
-            else:
-                log.error("serial-timeout", session_id=req.session_id, slug=req.slug)
-                udp_sender.send_with_confirmation("cta")
-
-        return SessionCompleteResponse(status="ok", session_id=req.session_id)
-
-    except HTTPException:
-        raise
+        await LogSender().log_durable("session_complete")
+        job = dispense_scheduler.submit(
+            "session",
+            priority=PRIORITY_SESSION,
+            session_id=req.session_id,
+            slug=req.slug,
+            ttl=settings.DISPENSE_JOB_TTL_SECONDS,
+        )
     except Exception as e:
         log.error("session-complete-error", error=str(e),
                   session_id=req.session_id, slug=req.slug)
-        udp_sender.send_with_confirmation("cta")
+        await finalize_session(req.session_id, "failed")
+        await udp_sender.send_with_confirmation("cta")
         raise HTTPException(500, "Erro interno do servidor")
-    finally:
-        # 3) Finaliza sessão (sempre) com completed|failed
-        await finalize_session(req.session_id, status_final)
-        log.info("lego-session-finalized", session_id=req.session_id, status=status_final)
+
+    return SessionCompleteResponse(
+        status="queued",
+        session_id=req.session_id,
+        job_id=job.id,
+        queue_position=dispense_scheduler.position(job.id),
+        estimated_wait_s=dispense_scheduler.estimated_wait(job.id),
+    )
 
 
-@router.get("/session/{sid}", response_model=SessionGetResponse)
-async def get_session_info(sid: str):
+@router.get("/dispense/stats")
+async def dispense_stats():
+    """Profundidade da fila, tempos de espera e estado de cada dispenser."""
+    return {**dispense_scheduler.stats(), "dispensers": dispensers.snapshot()}
+
+
+@router.get("/dispense/{job_id}", response_model=DispenseJobResponse)
+async def dispense_job_status(job_id: str, wait: float = Query(0, ge=0, le=25)):
     """
-    Retorna informações da sessão a partir do SID (usado pelo front para obter o slug).
+    Status de um job de drop. Com `wait` > 0 faz long-poll até o job terminar
+    (ou até `wait` segundos), evitando polling apertado do cliente.
     """
-    s = await get_session(sid)
-    if not s:
-        raise HTTPException(status_code=404, detail="Sessão inválida ou expirada")
+    job = dispense_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job inexistente ou expirado")
+    if wait and not job.finished:
+        await dispense_scheduler.wait(job_id, timeout=wait)
+    return DispenseJobResponse(**job.to_dict(), queue_position=dispense_scheduler.position(job_id))
+
 
-    return SessionGetResponse(
+async def _load_session_info(sid: str) -> tuple[str, bytes] | None:
+    s = await get_session(sid, SESSION_INFO_FIELDS)
+    if not s:
+        return None
+    body = SessionGetResponse(
         session_id=s["_id"],
         slug=s["slug"],
         status=s["status"],
@@ -284,6 +449,95 @@ async def get_session_info(sid: str):
         form_opened_at=s.get("form_opened_at"),
         processing_started_at=s.get("processing_started_at"),
         completed_at=s.get("completed_at"),
+        dispenser=s.get("dispenser"),
+    ).model_dump_json().encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return etag, body
+
+
+@router.get("/session/{sid}", response_model=SessionGetResponse)
+async def get_session_info(sid: str, request: Request):
+    """
+    Retorna informações da sessão a partir do SID (usado pelo front para obter o slug).
+    Resposta cacheada por SID e com ETag: `If-None-Match` igual devolve 304.
+    """
+    cached = await session_cache.get_or_load(sid, _load_session_info)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Sessão inválida ou expirada")
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _sse(event: str, data: bytes | str, event_id: int | None = None) -> str:
+    if isinstance(data, bytes):
+        data = data.decode()
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+def _sse_status(e: SessionEvent) -> str:
+    return _sse("status", json.dumps(e.to_dict()), e.id)
+
+
+@router.get("/session/{sid}/events")
+async def session_event_stream(sid: str, request: Request, last_event_id: int | None = Query(None)):
+    """
+    Stream SSE das transições da sessão (pending -> form_shown -> processing -> completed|failed|aborted).
+    - Na conexão (ou quando o Last-Event-ID não está no histórico) envia `snapshot` com o estado atual;
+      senão reenvia só os eventos perdidos.
+    - Comentário de heartbeat a cada SESSION_EVENTS_HEARTBEAT_SECONDS; no heartbeat o status é
+      conferido no banco, cobrindo transições feitas por outro worker.
+    - Encerra após o status final (evento `end`); o cliente deve fechar o EventSource nesse ponto.
+    """
+    header_id = request.headers.get("last-event-id", "")
+    if header_id.isdigit():
+        last_event_id = int(header_id)
+
+    if not await session_cache.get_or_load(sid, _load_session_info):
+        raise HTTPException(status_code=404, detail="Sessão inválida ou expirada")
+
+    async def stream():
+        # assina antes de ler o snapshot: nenhuma transição fica entre os dois
+        sub, missed, gap = session_events.subscribe(sid, last_event_id)
+        with sub:
+            yield "retry: 2000\n\n"
+            status = None
+            if gap:
+                cached = await session_cache.get_or_load(sid, _load_session_info)
+                if cached:
+                    _, body = cached
+                    status = json.loads(body)["status"]
+                    yield _sse("snapshot", body)
+            else:
+                for e in missed:
+                    status = e.status
+                    yield _sse_status(e)
+
+            while status not in TERMINAL_STATUSES and not sub.overflowed:
+                e = await sub.next(timeout=settings.SESSION_EVENTS_HEARTBEAT_SECONDS)
+                if e is None:
+                    current = await get_session(sid, {"status": 1})
+                    if current and current["status"] != status:
+                        status = current["status"]
+                        yield _sse("status", json.dumps({"session_id": sid, "status": status}))
+                    else:
+                        yield ": ping\n\n"
+                    continue
+                if e.status != status:
+                    status = e.status
+                    yield _sse_status(e)
+
+            if status in TERMINAL_STATUSES:
+                yield _sse("end", json.dumps({"session_id": sid, "status": status}))
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -292,10 +546,10 @@ async def html_claim(request: Request):
     try:
         log_sender = LogSender()
         log_sender.log("claim_page_accessed")
-        return templates.TemplateResponse("claim.html", {"request": request})
+        return page_cache.response("claim.html", request)
     except Exception as e:
         log.error("html-render-failed", error=str(e), page="claim")
-        return templates.TemplateResponse("error.html", {"request": request})
+        return page_cache.response("error.html", request)
 
 
 @router.get("/cta", response_class=HTMLResponse)
@@ -303,10 +557,10 @@ async def html_thanks(request: Request):
     try:
         log_sender = LogSender()
         log_sender.log("cta_page_accessed")
-        return templates.TemplateResponse("cta.html", {"request": request})
+        return page_cache.response("cta.html", request)
     except Exception as e:
         log.error("html-render-failed", error=str(e), page="cta")
-        return templates.TemplateResponse("error.html", {"request": request})
+        return page_cache.response("error.html", request)
 
 
 @router.get("/form", response_class=HTMLResponse)
@@ -316,10 +570,10 @@ async def html_form(request: Request):
         raise HTTPException(400, "sid ausente")
     
     try: 
-        session = await get_session(sid)
+        session = await get_session(sid, {"status": 1})
         if not session:
             log.error("html-session-expired", page="form")
-            return templates.TemplateResponse("error.html", {"request": request})
+            return page_cache.response("error.html", request)
         if session["status"] != "pending":
             log.error("html-session-used", page="form")
             raise HTTPException(404, "Sessão Inválida.")
@@ -328,17 +582,17 @@ async def html_form(request: Request):
             log.info("form-opened-first-time", session_id=sid)
             log_sender = LogSender()
             log_sender.log("form_page_accessed")
-            udp_sender.send("retire")
-            return templates.TemplateResponse("form.html", {"request": request})
+            await udp_sender.send("retire")
+            return page_cache.response("form.html", request)
         
-        session = await get_session(sid)  # recarrega para checar status atual
+        session = await get_session(sid, {"status": 1})  # recarrega para checar status atual
         status = session.get("status") if session else None
         LogSender().log("form_used_or_invalid", status=status)
         # para sessão encerrada/ja usada, renderize "used", não 404
-        return templates.TemplateResponse("used.html", {"request": request})
+        return page_cache.response("used.html", request)
     except Exception as e:
         log.error("html-render-failed", error=str(e), page="form")
-        return templates.TemplateResponse("error.html", {"request": request})
+        return page_cache.response("error.html", request)
 
 
 @router.get("/terms", response_class=HTMLResponse)
@@ -346,40 +600,36 @@ async def html_terms(request: Request):
     try:
         log_sender = LogSender()
         log_sender.log("terms_page_accessed")
-        return templates.TemplateResponse("terms.html", {"request": request})
+        return page_cache.response("terms.html", request)
     except Exception as e:
         log.error("html-render-failed", error=str(e), page="terms")
-        return templates.TemplateResponse("error.html", {"request": request})
+        return page_cache.response("error.html", request)
+
+
+async def _start_dispenser(device) -> bool:
+    async with dispensers.use(device.name):
+        # Aguarda resposta "start" na serial (timeout de 10 s)
+        return await dispensers.request(device, "on", ("start",), timeout=10) == "start"
 
 
 @router.get("/on")
 async def html_on(request: Request):
     try:
         log_sender = LogSender()
-        async with serial_lock:
-            serial_comm.send("on")
-            # Aguarda resposta "start" na serial e, ao receber, envia UDP "calor"
-            timeout_seconds = 10  # Timeout de 10 segundos para aguardar "start"
-            start_time = time.time()
-            serial_received = False
-            while time.time() - start_time < timeout_seconds:
-                response = serial_comm.receive()
-                if response:
-                    if response == "start":
-                        udp_sender.send_with_confirmation("calor")
-                        log_sender.log("start_received")
-                        log_sender.log("machine_started")
-                        log.info("start-recebido-e-calor-enviado",
-                                 timestamp=_now_utc().isoformat())
-                        serial_received = True
-                        break
-                else:
-                    await asyncio.sleep(0.1)
-        if serial_received:
-            return {"status": "start_received"}
-        else:
-            log.error("timeout-aguardando-start", timestamp=_now_utc().isoformat())
-            return {"status": "start_dont_respond"}
+        # liga todos os dispensers em paralelo; com algum "start", envia UDP "calor"
+        results = await asyncio.gather(*(_start_dispenser(d) for d in dispensers), return_exceptions=True)
+        started = {d.name: r is True for d, r in zip(dispensers, results)}
+        if any(started.values()):
+            await udp_sender.send_with_confirmation("calor")
+            log_sender.log("start_received")
+            log_sender.log("machine_started")
+            log.info("start-recebido-e-calor-enviado", dispensers=started,
+                     timestamp=_now_utc().isoformat())
+        if all(started.values()):
+            return {"status": "start_received", "dispensers": started}
+        log.error("timeout-aguardando-start", dispensers=started, timestamp=_now_utc().isoformat())
+        status = "start_partial" if any(started.values()) else "start_dont_respond"
+        return {"status": status, "dispensers": started}
     except Exception as e:
         raise HTTPException(500, "Erro interno do servidor")
     
@@ -388,8 +638,7 @@ async def html_on(request: Request):
 async def html_off(request: Request):
     try:
         log_sender = LogSender()
-        async with serial_lock:
-            serial_comm.send("off")
+        await dispensers.broadcast("off")
         log_sender.log("machine_turned_off")
         log.info("machine-turned-off", timestamp=_now_utc().isoformat())
         return {"status": "machine_turned_off"}
@@ -402,22 +651,21 @@ async def html_admin(request: Request):
     try:
         log_sender = LogSender()
         log_sender.log("admin_page_accessed")
-        return templates.TemplateResponse("admin.html", {"request": request})
+        return page_cache.response("admin.html", request)
     except Exception as e:
         log.error("html-render-failed", error=str(e), page="admin")
-        return templates.TemplateResponse("error.html", {"request": request})
+        return page_cache.response("error.html", request)
 
 
 @router.post("/admin/dispense")
-async def admin_dispense(request: Request):
+async def admin_dispense(request: Request, device: str | None = Query(None)):
+    """Libera um brinde pelo admin; `device` escolhe o dispenser (padrão: o menos carregado)."""
+    if device is not None and dispensers.get(device) is None:
+        raise HTTPException(404, "Dispenser inexistente")
     try:
-        log_sender = LogSender()
-        # Atualiza o inventário diretamente (simula um drop pelo admin)
-        await update_inventory_on_drop(log_sender, "admin")
-        async with serial_lock:
-            serial_comm.send("hand")
-            log_sender.log("admin_dispense_triggered")
-        return {"status": "completed"}
+        job = dispense_scheduler.submit("admin", priority=PRIORITY_ADMIN, device=device)
+        await dispense_scheduler.wait(job.id, timeout=30)
+        return {"status": job.status, "job_id": job.id, "device": job.device}
     except Exception as e:
         raise HTTPException(500, "Erro interno do servidor")
 
@@ -425,43 +673,16 @@ async def admin_dispense(request: Request):
 @router.post("/admin/inventory")
 async def update_inventory(request: Request):
     try:
-        import json
-        from pathlib import Path
-        
         data = await request.json()
         log_sender = LogSender()
-        
-        # Caminho para o arquivo de inventário
-        inventory_file = Path(__file__).resolve().parent.parent / "frontend" / "static" / "templates" / "lego" / "assets" / "inventory.json"
-        
-        # Carrega dados atuais para preservar campos existentes
-        current_data = {}
-        try:
-            with open(inventory_file, 'r', encoding='utf-8') as f:
-                current_data = json.load(f)
-        except FileNotFoundError:
-            pass  # Arquivo não existe ainda
-        
-        old_quantity = current_data.get('current_quantity', 0)
-        
-        # Preserva campos existentes e atualiza com novos dados
-        updated_data = {
-            **current_data,  # Preserva todos os campos existentes
-            **data,  # Sobrescreve com novos dados
-            'previous_quantity': old_quantity,
-            'quantity_change': data.get('current_quantity', 0) - old_quantity,
-            'last_updated': _now_utc().isoformat()
-        }
-        
-        # Salvar dados no arquivo JSON
-        with open(inventory_file, 'w', encoding='utf-8') as f:
-            json.dump(updated_data, f, indent=4, ensure_ascii=False)
-        
+
+        before, updated_data = await inventory_store.set(data)
+        old_quantity = before.get('current_quantity', 0)
+
         # Log das mudanças de estoque com quantidade anterior e nova
         if 'current_quantity' in data:
-            log_sender.log("inventory_updated", additional=f"old:{old_quantity},new:{data['current_quantity']}")
-            async with serial_lock:
-                serial_comm.send("reset")
+            await log_sender.log_durable("inventory_updated", additional=f"old:{old_quantity},new:{data['current_quantity']}")
+            await dispensers.broadcast("reset")  # reposição: dispensers vazios voltam à escala
             log.info("inventory-updated", 
                      old_quantity=old_quantity,
                      new_quantity=data['current_quantity'],
@@ -470,6 +691,8 @@ async def update_inventory(request: Request):
                      timestamp=_now_utc().isoformat())
         
         return {"status": "inventory_updated"}
+    except ValueError as e:
+        raise HTTPException(422, str(e))
     except Exception as e:
         log.error("admin-inventory-error", error=str(e))
         raise HTTPException(500, "Erro interno do servidor")
@@ -9,6 +9,11 @@ from pydantic import EmailStr
 from pymongo.errors import DuplicateKeyError
 from pymongo import ReturnDocument, ReadPreference
 
+from core.config import settings
+from core.database import db
+from core.indexes import check_plan
+from utils.registration_writer import CoalescingWriter
+from utils.metrics import MONGO_OP_SECONDS
 from schemas.user import (
     UserInitRequest,
     UserInitResponse,
@@ -21,6 +26,10 @@ from schemas.user import (
 log = structlog.get_logger()
 router = APIRouter(prefix="/api/users")
 
+REGISTRATIONS_COLL = db["registrations"]
+# inserts agrupados em insert_many (picos de cadastro no lançamento de campanha)
+registration_writer = CoalescingWriter(REGISTRATIONS_COLL)
+
 def today_utc_date() -> date:
     return datetime.now(timezone.utc)
 
@@ -46,11 +55,12 @@ async def create_user(payload: UserInitRequest):
         "updatedAt": today,                      # date
     }
 
-    # try:
-    #     await 
-    # except DuplicateKeyError:
-    #     log.warning("email-already-exists", email=payload.email, collection=collection)
-    #     raise HTTPException(status_code=409, detail="E-mail já cadastrado")
+    try:
+        with MONGO_OP_SECONDS.time("create_user"):
+            await registration_writer.insert(doc)
+    except DuplicateKeyError:
+        log.warning("email-already-exists", email=doc["email"], collection=REGISTRATIONS_COLL.name)
+        raise HTTPException(status_code=409, detail="E-mail já cadastrado")
 
     log.info("user-created", id=reg_id)
 
@@ -63,3 +73,84 @@ async def create_user(payload: UserInitRequest):
         canPickFrom=doc["canPickFrom"],
     )
 
+
+
+def _day_start(day: datetime) -> datetime:
+    """Normaliza para 00:00 UTC do dia (o form manda só YYYY-MM-DD)."""
+    if day.tzinfo is not None:
+        day = day.astimezone(timezone.utc)
+    return datetime.combine(day.date(), time.min, tzinfo=timezone.utc)
+
+
+@router.post("/pickup/", response_model=UserPickupResponse)
+async def register_pickup(payload: UserPickupRequest):
+    """
+    Registra a retirada num único find_one_and_update condicional (sem ler antes):
+    - elegível se `canPickFrom` cai até o fim do dia da retirada;
+    - primeira retirada (status "registered"), primeira de um dia posterior ao
+      último `pickedDay`, ou nova retirada no mesmo dia enquanto o total do dia
+      não passar de PICKUP_MAX_PER_DAY;
+    - `condomsPicked` é a quantidade do dia: o update (pipeline) soma ao valor
+      atual no mesmo dia e recomeça de `qty` num dia novo.
+    Busca por `id` (_id) ou `email` (índice único email_1). A leitura extra só
+    acontece quando a retirada é recusada, para escolher o código de erro.
+    """
+    if payload.id:
+        key = {"_id": payload.id}
+    elif payload.email:
+        key = {"email": str(payload.email).lower()}
+    else:
+        raise HTTPException(status_code=422, detail="Informe id ou email")
+
+    day = _day_start(payload.day)
+    qty = payload.condomsPicked
+    max_per_day = settings.PICKUP_MAX_PER_DAY
+    if qty > max_per_day:
+        raise HTTPException(status_code=422, detail="Quantidade acima do limite diário")
+
+    query = {
+        **key,
+        "canPickFrom": {"$lt": day + timedelta(days=1)},
+        "$or": [
+            {"status": "registered"},
+            {"status": "picked", "pickedDay": {"$lt": day}},
+            {"status": "picked", "pickedDay": day, "condomsPicked": {"$lte": max_per_day - qty}},
+        ],
+    }
+    await check_plan(REGISTRATIONS_COLL, f"register_pickup:{next(iter(key))}", query)
+    with MONGO_OP_SECONDS.time("register_pickup"):
+        doc = await REGISTRATIONS_COLL.find_one_and_update(
+            query,
+            [{
+                "$set": {
+                    # referências ($pickedDay, $condomsPicked) leem o documento antes deste $set
+                    "condomsPicked": {
+                        "$cond": [{"$eq": ["$pickedDay", day]}, {"$add": ["$condomsPicked", qty]}, qty]
+                    },
+                    "status": "picked",
+                    "pickedDay": day,
+                    "updatedAt": today_utc_date(),
+                },
+            }],
+            projection={"email": 1, "status": 1, "pickedDay": 1, "condomsPicked": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    if doc is None:
+        current = await REGISTRATIONS_COLL.find_one(key, {"canPickFrom": 1, "status": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Cadastro não encontrado")
+        if current["canPickFrom"].replace(tzinfo=timezone.utc) >= day + timedelta(days=1):
+            raise HTTPException(status_code=403, detail="Retirada ainda não liberada para este cadastro")
+        log.warning("pickup-refused", key=key, status=current.get("status"))
+        raise HTTPException(status_code=409, detail="Retirada já registrada")
+
+    log.info("user-pickup", id=doc["_id"], condomsPicked=doc["condomsPicked"])
+
+    return UserPickupResponse(
+        id=doc["_id"],
+        email=doc["email"],
+        pickedDay=doc["pickedDay"],
+        condomsPicked=doc["condomsPicked"],
+        status=doc["status"],
+    )
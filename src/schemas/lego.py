@@ -16,6 +16,21 @@ class SessionCompleteRequest(BaseModel):
 class SessionCompleteResponse(BaseModel):
     status: str
     session_id: str
+    job_id: Optional[str] = None
+    queue_position: Optional[int] = None
+    estimated_wait_s: Optional[float] = None
+
+class DispenseJobResponse(BaseModel):
+    job_id: str
+    kind: Literal["session", "admin"]
+    session_id: Optional[str] = None
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    result: Optional[str] = None
+    device: Optional[str] = None
+    queue_position: Optional[int] = None
+    enqueued_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 class SessionGetResponse(BaseModel):
     session_id: str
@@ -25,4 +40,5 @@ class SessionGetResponse(BaseModel):
     created_at: datetime
     form_opened_at: Optional[datetime] = None
     processing_started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
\ No newline at end of file
+    completed_at: Optional[datetime] = None
+    dispenser: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import time
+import uuid
+import structlog
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from utils.singleton import Singleton
+
+
+log = structlog.get_logger()
+
+PRIORITY_ADMIN = 0
+PRIORITY_SESSION = 10
+
+
+@dataclass
+class DispenseJob:
+    kind: str                                  # "session" | "admin"
+    priority: int
+    session_id: Optional[str] = None
+    slug: Optional[str] = None
+    deadline: Optional[float] = None           # epoch; jobs vencidos são cancelados
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"                     # queued -> running -> completed|failed|cancelled
+    result: Optional[str] = None               # resposta da serial (dropped, hand_timeout, ...)
+    device: Optional[str] = None               # dispenser pedido (admin) ou atribuído ao iniciar
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    seq: int = 0
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "session_id": self.session_id,
+            "status": self.status,
+            "result": self.result,
+            "device": self.device,
+            "enqueued_at": self.enqueued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _mean(values) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+JobRunner = Callable[[DispenseJob], Awaitable[str]]
+JobCancelled = Callable[[DispenseJob], Awaitable[None]]
+
+
+class DispenseScheduler(metaclass=Singleton):
+    """
+    Fila de jobs dos dispensers com `concurrency` workers (um por dispenser).
+    - `submit` retorna imediatamente com o job (id + posição na fila).
+    - Jobs admin têm prioridade sobre jobs de sessão.
+    - Jobs cujo `deadline` venceu enquanto aguardavam são cancelados.
+    O `runner` escolhe o dispenser, executa o ciclo de hardware e retorna o status final do job.
+    """
+    def __init__(self, runner: JobRunner, on_cancel: Optional[JobCancelled] = None,
+                 max_finished: int = 500, stats_window: int = 200, concurrency: int = 1):
+        self._runner = runner
+        self._on_cancel = on_cancel
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs: "OrderedDict[str, DispenseJob]" = OrderedDict()
+        self._max_finished = max_finished
+        self._waits: deque[float] = deque(maxlen=stats_window)
+        self._runs: deque[float] = deque(maxlen=stats_window)
+        self.concurrency = max(1, concurrency)
+        self._running: dict[str, DispenseJob] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        alive = [w for w in self._workers if not w.done()]
+        if len(alive) < self.concurrency:
+            alive += [
+                asyncio.create_task(self._work(), name=f"dispense-worker-{i}")
+                for i in range(len(alive), self.concurrency)
+            ]
+            log.info("dispense-scheduler-started", workers=self.concurrency)
+        self._workers = alive
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    def submit(self, kind: str, *, priority: int = PRIORITY_SESSION, session_id: str | None = None,
+               slug: str | None = None, ttl: float | None = None, device: str | None = None) -> DispenseJob:
+        self.start()
+        job = DispenseJob(
+            kind=kind,
+            priority=priority,
+            session_id=session_id,
+            slug=slug,
+            deadline=(time.time() + ttl) if ttl else None,
+            device=device,
+            seq=next(self._seq),
+        )
+        self._jobs[job.id] = job
+        self._queue.put_nowait((job.priority, job.seq, job))
+        log.info("dispense-job-queued", job_id=job.id, kind=kind, session_id=session_id,
+                 position=self.position(job.id))
+        return job
+
+    def get(self, job_id: str) -> Optional[DispenseJob]:
+        return self._jobs.get(job_id)
+
+    def _ahead(self, job: DispenseJob) -> int:
+        return sum(
+            1 for j in self._jobs.values()
+            if j.status == "queued" and (j.priority, j.seq) < (job.priority, job.seq)
+        )
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Posição do job na fila (0 = executando agora, 1 = o próximo); None se já finalizado."""
+        job = self._jobs.get(job_id)
+        if not job or job.finished:
+            return None
+        if job.status == "running":
+            return 0
+        return self._ahead(job) + 1
+
+    def _wait_estimate(self, ahead: int) -> float:
+        # precisam começar antes: os `ahead` da frente; com todos os workers
+        # ocupados, o job ainda espera um dos que estão executando terminar
+        blocking = max(0, ahead + len(self._running) - self.concurrency + 1)
+        return round(_mean(self._runs) * blocking / self.concurrency, 3)
+
+    def estimated_wait(self, job_id: str) -> Optional[float]:
+        """Espera estimada (s) até o job começar; 0 se já executando, None se finalizado."""
+        job = self._jobs.get(job_id)
+        if not job or job.finished:
+            return None
+        if job.status == "running":
+            return 0.0
+        return self._wait_estimate(self._ahead(job))
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancela um job ainda na fila (o worker descarta a entrada ao retirá-la)."""
+        job = self._jobs.get(job_id)
+        if not job or job.status != "queued":
+            return False
+        await self._cancel(job)
+        return True
+
+    async def _cancel(self, job: DispenseJob):
+        self._finish(job, "cancelled")
+        log.warning("dispense-job-cancelled", job_id=job.id, session_id=job.session_id)
+        if self._on_cancel:
+            await self._on_cancel(job)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[DispenseJob]:
+        """Aguarda (long-poll) o job terminar; retorna o job no estado atual."""
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> dict:
+        depth = sum(1 for j in self._jobs.values() if j.status == "queued")
+        run_avg = _mean(self._runs)
+        return {
+            "queue_depth": depth,
+            "running": [j.id for j in self._running.values()],
+            "workers": self.concurrency,
+            "wait_avg_s": round(_mean(self._waits), 3),
+            "wait_p95_s": round(_percentile(self._waits, 0.95), 3),
+            "run_avg_s": round(run_avg, 3),
+            # estimativa para um job que entrar agora na fila
+            "estimated_wait_s": self._wait_estimate(depth),
+        }
+
+    def _finish(self, job: DispenseJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        job.done.set()
+        self._evict()
+
+    def _evict(self):
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        for jid in finished[: max(0, len(finished) - self._max_finished)]:
+            self._jobs.pop(jid, None)
+
+    async def _work(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.status != "queued":
+                    continue  # cancelado enquanto aguardava
+                if job.deadline and time.time() > job.deadline:
+                    await self._cancel(job)
+                    continue
+
+                job.status = "running"
+                job.started_at = time.time()
+                self._waits.append(job.started_at - job.enqueued_at)
+                self._running[job.id] = job
+                try:
+                    status = await self._runner(job)
+                except Exception as e:
+                    log.error("dispense-job-error", job_id=job.id, error=str(e))
+                    status = "failed"
+                self._runs.append(time.time() - job.started_at)
+                self._finish(job, status)
+                log.info("dispense-job-finished", job_id=job.id, kind=job.kind,
+                         status=status, result=job.result, device=job.device,
+                         wait_s=round(job.started_at - job.enqueued_at, 3))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("dispense-worker-error", error=str(e))
+            finally:
+                self._running.pop(job.id, None)
+                self._queue.task_done()
@@ -0,0 +1,202 @@
+import asyncio
+import time
+import structlog
+
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from utils.metrics import SERIAL_LOCK_WAIT_SECONDS, TimedLock
+from utils.serial_comm import SerialComm
+
+
+log = structlog.get_logger()
+
+# respostas que mostram o firmware vivo (mesmo quando o drop não aconteceu)
+_ALIVE_REPLIES = ("start", "dropped", "hand_timeout", "out_of_stock")
+
+
+def parse_ports(spec: str) -> list[tuple[str, str]]:
+    """
+    "left=/dev/ttyUSB0,right=/dev/ttyUSB1" -> [("left", ...), ("right", ...)];
+    sem nome, o dispenser vira "d1", "d2"... pela posição.
+    """
+    devices = []
+    for i, item in enumerate(filter(None, (part.strip() for part in spec.split(","))), start=1):
+        name, sep, port = item.partition("=")
+        devices.append((name.strip(), port.strip()) if sep else (f"d{i}", item))
+    return devices
+
+
+class Dispenser:
+    """
+    Um dispenser físico: sua serial, seu lock e seu estado de saúde.
+    - `active`: operações atribuídas ainda não terminadas (inclui as que aguardam o lock).
+    - Após `max_failures` timeouts/erros seguidos fica fora da escala por `cooldown`
+      segundos; depois volta a receber sessões (a próxima resposta o reabilita).
+    - "out_of_stock" o marca como vazio até o próximo "reset" (reposição no admin).
+    """
+    def __init__(self, name: str, port: str, baudrate: int = 9600,
+                 max_failures: int = 3, cooldown: float = 30.0):
+        self.name = name
+        self.comm = SerialComm(port=port, baudrate=baudrate)
+        self.lock = TimedLock(SERIAL_LOCK_WAIT_SECONDS.labels(name))
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.active = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.empty = False
+        self.served = 0
+        self.last_used = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return not self.empty and time.monotonic() >= self.down_until
+
+    def record(self, reply: Optional[str], error: Optional[str] = None):
+        """Atualiza a saúde a partir da resposta de um comando (None = timeout)."""
+        if reply in _ALIVE_REPLIES:
+            self.failures = 0
+            self.down_until = 0.0
+            self.last_error = None
+            if reply == "dropped":
+                self.served += 1
+            if reply == "out_of_stock":
+                self.empty = True
+                log.warning("dispenser-empty", dispenser=self.name)
+            return
+        self.failures += 1
+        self.last_error = error or "timeout"
+        if self.failures >= self.max_failures:
+            self.down_until = time.monotonic() + self.cooldown
+            log.error("dispenser-unhealthy", dispenser=self.name, failures=self.failures,
+                      error=self.last_error, cooldown_s=self.cooldown)
+
+    def mark_down(self, error: str):
+        self.failures = max(self.failures, self.max_failures)
+        self.record(None, error)
+
+    def state(self) -> dict:
+        return {
+            "port": self.comm.port,
+            "open": self.comm.is_open,
+            "healthy": self.healthy,
+            "empty": self.empty,
+            "active": self.active,
+            "served": self.served,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class DispenserRegistry:
+    """
+    Dispensers configurados (SERIAL_PORTS). `use()` escolhe o dispenser saudável
+    menos carregado (empate: o usado há mais tempo), segura o lock só dele e
+    devolve o dispenser; operações em dispensers diferentes correm em paralelo.
+    Sem nenhum saudável, tenta o menos carregado mesmo assim (a serial reabre sob demanda).
+    """
+    def __init__(self, ports: list[tuple[str, str]], baudrate: int = 9600,
+                 max_failures: int = 3, cooldown: float = 30.0):
+        if not ports:
+            raise ValueError("nenhuma porta serial configurada")
+        self.devices: dict[str, Dispenser] = {
+            name: Dispenser(name, port, baudrate, max_failures, cooldown) for name, port in ports
+        }
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.devices.values())
+
+    def get(self, name: str) -> Optional[Dispenser]:
+        return self.devices.get(name)
+
+    @property
+    def ready_count(self) -> int:
+        """Saudáveis com a porta aberta: leitor morto (porta caída) não conta como pronto."""
+        return sum(1 for d in self if d.healthy and d.comm.is_open)
+
+    async def open(self):
+        """Abre todas as portas em paralelo; falha só se nenhuma abrir."""
+        results = await asyncio.gather(*(d.comm.open() for d in self), return_exceptions=True)
+        opened = 0
+        for device, result in zip(self, results):
+            if isinstance(result, BaseException):
+                device.mark_down(str(result) or type(result).__name__)
+                log.error("dispenser-open-failed", dispenser=device.name, port=device.comm.port, error=str(result))
+            else:
+                opened += 1
+        if not opened:
+            raise ConnectionError("nenhum dispenser abriu")
+        log.info("dispensers-opened", opened=opened, total=len(self))
+
+    async def close(self):
+        await asyncio.gather(*(d.comm.close() for d in self), return_exceptions=True)
+
+    def pick(self) -> Dispenser:
+        candidates = [d for d in self if d.healthy] or list(self)
+        return min(candidates, key=lambda d: (d.active, d.last_used))
+
+    async def _assign(self) -> Dispenser:
+        """
+        pick() + reserva (`active`). Porta fechada é reaberta antes de receber o job;
+        se não abrir, o dispenser sai da escala e a escolha é refeita.
+        """
+        while True:
+            device = self.pick()
+            device.active += 1
+            if device.comm.is_open or not device.healthy:
+                return device
+            try:
+                await device.comm.open()
+                return device
+            except Exception as e:
+                device.active -= 1
+                device.mark_down(str(e) or type(e).__name__)
+                log.error("dispenser-open-failed", dispenser=device.name, port=device.comm.port, error=str(e))
+
+    @asynccontextmanager
+    async def use(self, name: Optional[str] = None):
+        """`async with registry.use() as device:` — atribui (ou usa `name`) e segura o lock do dispenser."""
+        if name:
+            device = self.devices[name]
+            device.active += 1
+        else:
+            device = await self._assign()
+        device.last_used = time.monotonic()
+        try:
+            async with device.lock:
+                yield device
+        finally:
+            device.active -= 1
+
+    async def request(self, device: Dispenser, msg: str, expected: tuple[str, ...], timeout: float) -> Optional[str]:
+        """`comm.request` registrando a resposta na saúde do dispenser."""
+        try:
+            reply = await device.comm.request(msg, expected, timeout=timeout)
+        except Exception as e:
+            device.record(None, str(e) or type(e).__name__)
+            raise
+        device.record(reply)
+        return reply
+
+    async def broadcast(self, msg: str) -> dict[str, Optional[str]]:
+        """Envia um comando sem resposta (off, reset) a todos os dispensers em paralelo."""
+        async def send(device: Dispenser) -> Optional[str]:
+            async with self.use(device.name):
+                try:
+                    await device.comm.send(msg)
+                except Exception as e:
+                    device.record(None, str(e) or type(e).__name__)
+                    return str(e)
+                if msg == "reset":
+                    device.empty = False
+                return None
+        results = await asyncio.gather(*(send(d) for d in self))
+        return dict(zip(self.devices, results))
+
+    def snapshot(self) -> dict:
+        return {name: d.state() for name, d in self.devices.items()}
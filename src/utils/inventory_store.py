@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import structlog
+from datetime import datetime, timezone
+from pathlib import Path
+from utils.singleton import Singleton
+
+
+log = structlog.get_logger()
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# campos que o admin pode sobrescrever (`set`); todos contadores inteiros >= 0
+SETTABLE_FIELDS = ("current_quantity", "total_dispensed")
+
+
+def validate_fields(fields) -> dict:
+    """Valida/converte os campos de um `set`; ValueError se não forem contadores válidos."""
+    if not isinstance(fields, dict):
+        raise ValueError("esperado um objeto JSON")
+    unknown = set(fields) - set(SETTABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"campos desconhecidos: {sorted(unknown)}")
+    clean = {}
+    for key, value in fields.items():
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(f"{key} deve ser um inteiro >= 0")
+        clean[key] = value
+    return clean
+
+
+def _apply(state: dict, rec: dict) -> dict:
+    """Aplica uma operação do log ao estado. Determinística (usada também no replay)."""
+    if rec["op"] == "decrement":
+        state["current_quantity"] = max(0, state.get("current_quantity", 0) - rec["n"])
+        state["total_dispensed"] = state.get("total_dispensed", 0) + rec["n"]
+    elif rec["op"] == "set":
+        fields = rec["fields"]
+        old_quantity = state.get("current_quantity", 0)
+        change = fields.get("current_quantity", 0) - old_quantity  # antes de mexer no estado
+        state.update(fields)
+        state["previous_quantity"] = old_quantity
+        state["quantity_change"] = change
+    state["last_updated"] = rec["ts"]
+    return state
+
+
+def _write_atomic(path: Path, data: dict, indent=None):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class InventoryStore(metaclass=Singleton):
+    """
+    Contadores de inventário em memória, persistidos por um log append-only
+    (uma operação JSON por linha) com snapshots periódicos.
+    - As mutações são serializadas por um asyncio.Lock (sem lost update).
+    - Um flusher agrupa as operações pendentes num único write + fsync
+      (group commit); `decrement`/`set` só retornam depois do fsync.
+    - `_state` inclui as operações ainda no lote; `_durable` só o que já está no
+      log. Se a gravação falhar, o lote sai do log (truncate) e `_state` volta a
+      `_durable` + as operações que chegaram depois.
+    - `inventory.json` é apenas uma visão exportada para o admin.html.
+    """
+    def __init__(self, export_path, data_dir=DATA_DIR, snapshot_every=500):
+        self.export_path = Path(export_path)
+        self.data_dir = Path(data_dir)
+        self.log_path = self.data_dir / "inventory.oplog"
+        self.snapshot_path = self.data_dir / "inventory.snapshot.json"
+        self.snapshot_every = snapshot_every
+        self._state: dict = {}
+        self._durable: dict = {}
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._lock = asyncio.Lock()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._closing = False
+
+    # ---------- ciclo de vida ----------
+
+    async def load(self):
+        """Carrega snapshot + replay do log (idempotente) e inicia o flusher."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._state, self._seq = await asyncio.to_thread(self._recover)
+            self._durable = dict(self._state)
+            self._snapshot_seq = self._seq
+            self._loaded = True
+            self._flusher = asyncio.create_task(self._flush_loop(), name="inventory-flusher")
+            log.info("inventory-store-loaded", seq=self._seq, **self._state)
+
+    async def close(self):
+        """Grava o que estiver pendente e encerra o flusher (sem cancelar um _persist em andamento)."""
+        if self._flusher:
+            self._closing = True
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+
+    def _recover(self) -> tuple[dict, int]:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        state, seq = {}, 0
+        if self.snapshot_path.exists():
+            snap = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            state, seq = snap["state"], snap["seq"]
+        elif self.export_path.exists():
+            # migração: primeira execução parte do inventory.json existente
+            state = json.loads(self.export_path.read_text(encoding="utf-8"))
+        if self.log_path.exists():
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # última linha truncada por crash: não foi confirmada
+                    if rec["seq"] > seq:
+                        _apply(state, rec)
+                        seq = rec["seq"]
+        return state, seq
+
+    # ---------- API ----------
+
+    async def read(self) -> dict:
+        await self.load()
+        return dict(self._state)
+
+    async def decrement(self, n: int = 1) -> tuple[dict, dict]:
+        """Retira `n` unidades. Retorna (estado_anterior, estado_novo)."""
+        return await self._mutate({"op": "decrement", "n": n})
+
+    async def set(self, fields: dict) -> tuple[dict, dict]:
+        """
+        Sobrescreve campos (ex.: reabastecimento). Retorna (estado_anterior, estado_novo).
+        ValueError (sem mexer no estado) se `fields` não passar em `validate_fields`.
+        """
+        return await self._mutate({"op": "set", "fields": validate_fields(fields)})
+
+    async def _mutate(self, rec: dict) -> tuple[dict, dict]:
+        await self.load()
+        async with self._lock:
+            before = dict(self._state)
+            rec = {"seq": self._seq + 1, "ts": _now_iso(), **rec}
+            # aplica numa cópia: uma exceção aqui não deixa o estado meio alterado
+            after = _apply(dict(self._state), rec)
+            self._seq = rec["seq"]
+            self._state = dict(after)
+            fut = asyncio.get_running_loop().create_future()
+            self._pending.append((rec, fut))
+            self._wakeup.set()
+        await fut  # durável após o fsync do lote
+        return before, after
+
+    # ---------- persistência ----------
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                if self._closing:
+                    return
+                continue
+            pending, self._pending = self._pending, []
+            state = dict(self._state)
+            snapshot = self._seq - self._snapshot_seq >= self.snapshot_every
+            try:
+                snapshotted = await asyncio.to_thread(self._persist, [rec for rec, _ in pending], state, snapshot)
+            except Exception as e:
+                log.error("inventory-flush-failed", error=str(e))
+                # o lote não está no log: a memória volta ao confirmado + o que chegou depois
+                self._state = dict(self._durable)
+                for rec, _ in self._pending:
+                    _apply(self._state, rec)
+                for _, fut in pending:
+                    fut.set_exception(e)
+            else:
+                self._durable = state
+                if snapshotted:
+                    self._snapshot_seq = pending[-1][0]["seq"]
+                for _, fut in pending:
+                    fut.set_result(None)
+
+    def _persist(self, batch: list[dict], state: dict, snapshot: bool = False) -> bool:
+        """Grava o lote no log (fsync) e, já durável, snapshot/export. Retorna se o snapshot foi gravado."""
+        start = None
+        try:
+            with open(self.log_path, "ab") as f:
+                start = f.tell()
+                f.write("".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in batch).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            if start is not None:
+                # sem isso, o replay aplicaria operações que falharam para quem chamou
+                os.truncate(self.log_path, start)
+            raise
+        snapshotted = False
+        if snapshot:
+            try:
+                # snapshot cobre tudo até o último seq do lote; o log pode ser zerado
+                _write_atomic(self.snapshot_path, {"seq": batch[-1]["seq"], "state": state})
+                open(self.log_path, "w").close()
+                snapshotted = True
+            except OSError as e:
+                log.warning("inventory-snapshot-failed", error=str(e))
+        try:
+            _write_atomic(self.export_path, state, indent=4)
+        except OSError as e:
+            log.warning("inventory-export-failed", error=str(e), path=str(self.export_path))
+        return snapshotted
@@ -0,0 +1,226 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+import structlog
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, Optional
+
+
+logger = structlog.get_logger()
+
+# frame: [len:u32][crc32:u32][payload]
+_HEADER = struct.Struct(">II")
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".log"
+
+
+class JournalOverflow(Exception):
+    """Buffer cheio: o registro foi descartado pela política de overflow."""
+
+
+def segment_name(index: int) -> str:
+    return f"{SEGMENT_PREFIX}{index:08d}{SEGMENT_SUFFIX}"
+
+
+def segment_index(name: str) -> int:
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def list_segments(directory: str) -> list[str]:
+    names = [n for n in os.listdir(directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+    return sorted(names, key=segment_index)
+
+
+def read_segment(path: str, offset: int = 0) -> Iterator[tuple[int, dict]]:
+    """
+    Lê registros a partir de `offset`. Gera (offset_apos_registro, registro).
+    Para no primeiro frame incompleto/corrompido (cauda de um crash, nunca confirmada).
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            offset += _HEADER.size + length
+            yield offset, json.loads(payload)
+
+
+def valid_length(path: str) -> int:
+    """Tamanho do prefixo íntegro do segmento (fim do último frame completo)."""
+    end = 0
+    for end, _ in read_segment(path):
+        pass
+    return end
+
+
+class LogJournal:
+    """
+    Journal em memória + segmentos em disco para o LogSender.
+    - `append` só enfileira num buffer limitado (sem I/O no caminho da request)
+      e devolve uma Future que resolve após o fsync do lote (group commit).
+    - Uma thread escritora drena o buffer, grava frames com tamanho+CRC no
+      segmento ativo e faz um único fsync por lote.
+    - Overflow: "drop_newest" rejeita o registro novo; "drop_oldest" descarta
+      o mais antigo ainda não gravado. Em ambos a Future do descartado falha
+      com JournalOverflow (nada confirmado é perdido).
+    """
+    def __init__(self, directory: str, max_buffered: int = 10_000, overflow: str = "drop_newest",
+                 commit_interval: float = 0.005, segment_max_bytes: int = 1 << 20):
+        if overflow not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"overflow inválido: {overflow}")
+        self.directory = directory
+        self.max_buffered = max_buffered
+        self.overflow = overflow
+        self.commit_interval = commit_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._buf: deque[tuple[bytes, Future]] = deque()
+        self._cond = threading.Condition()
+        self._rotate_requested = False
+        self._closed = False
+
+        segments = list_segments(directory)
+        self._active_index = segment_index(segments[-1]) if segments else 1
+        path = self._active_path()
+        if os.path.exists(path):
+            # cauda de um crash (frame parcial) é cortada: escrever depois dela deixaria
+            # tudo o que vier em seguida ilegível para read_segment
+            size, valid = os.path.getsize(path), valid_length(path)
+            if valid < size:
+                os.truncate(path, valid)
+                logger.warning("log_journal_tail_truncated", segment=self.active_segment, dropped_bytes=size - valid)
+        self._active = open(path, "ab")
+        self._writer = threading.Thread(target=self._write_loop, name="log-journal-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def active_segment(self) -> str:
+        return segment_name(self._active_index)
+
+    def _active_path(self) -> str:
+        return os.path.join(self.directory, segment_name(self._active_index))
+
+    def sealed_segments(self) -> list[str]:
+        """Segmentos fechados (não recebem mais escrita), em ordem."""
+        return [n for n in list_segments(self.directory) if segment_index(n) < self._active_index]
+
+    def depth(self) -> int:
+        return len(self._buf)
+
+    def append(self, record: dict) -> Future:
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+        frame = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                fut.set_exception(RuntimeError("journal fechado"))
+                return fut
+            if len(self._buf) >= self.max_buffered:
+                self.dropped += 1
+                if self.overflow == "drop_newest":
+                    fut.set_exception(JournalOverflow("log buffer cheio"))
+                    return fut
+                _, old = self._buf.popleft()
+                old.set_exception(JournalOverflow("log buffer cheio"))
+            self._buf.append((frame, fut))
+            self._cond.notify()
+        return fut
+
+    def rotate(self):
+        """Pede para selar o segmento ativo (se tiver dados) no próximo ciclo."""
+        with self._cond:
+            self._rotate_requested = True
+            self._cond.notify()
+
+    def close(self, timeout: float = 5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join(timeout)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._buf and not self._rotate_requested and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buf:
+                    break
+            # janela curta para agrupar mais registros no mesmo fsync
+            if self.commit_interval and len(self._buf) < self.max_buffered // 2:
+                time.sleep(self.commit_interval)
+            with self._cond:
+                batch = list(self._buf)
+                self._buf.clear()
+                rotate, self._rotate_requested = self._rotate_requested, False
+            start, committed = None, False
+            try:
+                if batch:
+                    start = self._active.tell()
+                    self._active.write(b"".join(frame for frame, _ in batch))
+                    self._active.flush()
+                    os.fsync(self._active.fileno())
+                committed = True
+                for _, fut in batch:
+                    fut.set_result(None)
+                if rotate or self._active.tell() >= self.segment_max_bytes:
+                    self._seal()
+            except Exception as e:
+                logger.error("log_journal_write_failed", error=str(e))
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                try:
+                    self._recover(None if committed else start)
+                except Exception as err:
+                    logger.error("log_journal_recover_failed", error=str(err))
+                time.sleep(0.5)
+        self._active.close()
+
+    def _recover(self, size: Optional[int]):
+        """
+        Após uma falha de escrita: corta o segmento ativo de volta a `size` (o lote que
+        falhou sai do arquivo) e o reabre. Se o corte falhar, passa para um segmento novo;
+        o lixo fica no fim de um segmento selado, onde a leitura já para.
+        """
+        try:
+            self._active.close()
+        except (OSError, ValueError):
+            pass
+        if size is not None:
+            try:
+                os.truncate(self._active_path(), size)
+            except OSError:
+                self._active_index += 1
+        self._active = open(self._active_path(), "ab")
+
+    def _seal(self):
+        if self._active.tell() == 0:
+            return
+        self._active.close()
+        self._active_index += 1
+        self._active = open(self._active_path(), "ab")
+        logger.debug("log_segment_sealed", segment=segment_name(self._active_index - 1))
+
+
+def iter_sealed(journal: LogJournal, start: Optional[tuple[str, int]] = None) -> Iterator[tuple[str, int, dict]]:
+    """Percorre os segmentos selados a partir de (segmento, offset). Gera (segmento, offset_apos, registro)."""
+    for name in journal.sealed_segments():
+        offset = 0
+        if start:
+            if segment_index(name) < segment_index(start[0]):
+                continue
+            if name == start[0]:
+                offset = start[1]
+        for off, rec in read_segment(os.path.join(journal.directory, name), offset):
+            yield name, off, rec
@@ -1,11 +1,14 @@
+import asyncio
 import csv
-import time
-import requests
-import threading
 import os
 import structlog
 from datetime import datetime, timezone
+from concurrent.futures import Future
+from core.config import settings
 from utils.singleton import Singleton
+from utils.log_journal import LogJournal
+from utils.log_uploader import LogUploader
+from utils.metrics import LOG_QUEUE_DEPTH, LOG_UPLOAD_LAG_SECONDS
 
 
 logger = structlog.get_logger()
@@ -16,14 +19,30 @@ LOG_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs')
 class LogSender(metaclass=Singleton):
     csv_filename = os.path.join(LOG_DIR, 'datalogs.csv')
     backup_filename = os.path.join(LOG_DIR, 'datalogs_backup.csv')
+    journal_dir = os.path.join(LOG_DIR, 'journal')
 
-    def __init__(self, log_api, project_id, upload_delay=120):
-        self.project_id = project_id
-        self.log_api = log_api
+    def __init__(self, log_api=None, project_id=None, upload_delay=120):
+        self.project_id = project_id or settings.LOGCENTER_PROJECT_ID
+        self.log_api = log_api or settings.LOGCENTER_BASE_URL
         self.upload_delay = upload_delay
-        self._init_csv(self.csv_filename)
+        os.makedirs(LOG_DIR, exist_ok=True)
         self._init_csv(self.backup_filename)
-        threading.Thread(target=self._process_csv_and_send_logs, daemon=True).start()
+        # log() só enfileira; a thread do journal grava segmentos com fsync em lote
+        self.journal = LogJournal(self.journal_dir)
+        self._import_legacy_csv()
+        # envio em lotes para o LogCenter; iniciado/parado pelo lifespan da app
+        self.uploader = LogUploader(
+            self.journal,
+            self.log_api,
+            self.backup_filename,
+            bulk_path=settings.LOGCENTER_BULK_PATH,
+            batch_size=settings.LOGCENTER_UPLOAD_BATCH,
+            max_in_flight=settings.LOGCENTER_UPLOAD_CONCURRENCY,
+            use_gzip=settings.LOGCENTER_UPLOAD_GZIP,
+            idle_delay=upload_delay,
+        )
+        LOG_QUEUE_DEPTH.set_function(self.journal.depth)
+        LOG_UPLOAD_LAG_SECONDS.set_function(self.uploader.lag_seconds)
 
     @staticmethod
     def _init_csv(filename):
@@ -35,53 +54,48 @@ class LogSender(metaclass=Singleton):
         except FileExistsError:
             logger.debug("csv_already_exists", file=filename)
 
-    def log(self, status, additional=''):
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        with open(self.csv_filename, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([status, self.project_id, additional, now])
-        logger.info("log_appended", status=status, project=self.project_id, timePlayed=now)
+    def _import_legacy_csv(self):
+        """Move linhas pendentes do antigo datalogs.csv para o journal."""
+        if not os.path.exists(self.csv_filename):
+            return
+        with open(self.csv_filename, mode="r", newline="") as f:
+            pending = [self.journal.append(row) for row in csv.DictReader(f)]
+        for fut in pending:
+            fut.result()
+        os.remove(self.csv_filename)
+        logger.info("legacy_csv_imported", rows=len(pending))
+
+    def close(self):
+        """Fecha o journal: a thread escritora grava o que estiver no buffer e termina."""
+        self.journal.close()
 
-    def _send_log(self, status, project, additional, timePlayed):
-        url = f"{self.log_api}/datalog/upload"
-        payload = {
+    def log(self, status, additional='') -> Future:
+        """
+        Registra um evento sem I/O no caminho da request (fire-and-forget: a resposta
+        pode sair antes do fsync). Retorna a Future do group commit; se o registro
+        for descartado (JournalOverflow) ou a gravação falhar, isso é logado.
+        Eventos que precisam estar duráveis antes de responder usam `log_durable`.
+        """
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        fut = self.journal.append({
             'status': status,
-            'project': project,
+            'project': self.project_id,
             'additional': additional,
-            'timePlayed': timePlayed
-        }
-        try:
-            r = requests.post(url, data=payload)
-            if r.status_code == 200:
-                logger.info("log_sent", **payload)
-                return True
-            else:
-                logger.warning("log_send_failed", status_code=r.status_code, **payload)
-                return False
-        except Exception as e:
-            logger.error("log_send_error", error=str(e), **payload)
-            return False
-
-    def _process_csv_and_send_logs(self):
-        while True:
-            keep, backup = [], []
-            with open(self.csv_filename, mode="r", newline="") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if self._send_log(**row):
-                        backup.append(row)
-                    else:
-                        keep.append(row)
-
-            with open(self.csv_filename, mode="w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=["status","project","additional","timePlayed"])
-                writer.writeheader()
-                writer.writerows(keep)
+            'timePlayed': now,
+        })
+        fut.add_done_callback(lambda f, status=status: _report_failure(f, status))
+        logger.info("log_appended", status=status, project=self.project_id, timePlayed=now)
+        return fut
 
-            with open(self.backup_filename, mode="a", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=["status","project","additional","timePlayed"])
-                writer.writerows(backup)
+    async def log_durable(self, status, additional='') -> bool:
+        """`log()` aguardando o fsync do lote; False se o registro não ficou gravado."""
+        try:
+            await asyncio.wrap_future(self.log(status, additional))
+            return True
+        except Exception:
+            return False  # já logado por _report_failure
 
-            logger.info("batch_processed", sent=len(backup), kept=len(keep))
 
-            time.sleep(self.upload_delay)
\ No newline at end of file
+def _report_failure(fut: Future, status: str):
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.error("log_record_lost", status=status, error=str(fut.exception()))
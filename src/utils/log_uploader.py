@@ -0,0 +1,269 @@
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import time
+import httpx
+import structlog
+from datetime import datetime, timezone
+from typing import Optional
+
+from utils.log_journal import LogJournal, iter_sealed, segment_index
+
+
+logger = structlog.get_logger()
+
+FIELDS = ["status", "project", "additional", "timePlayed"]
+
+
+class CircuitBreaker:
+    """closed -> open (após `threshold` falhas seguidas) -> half_open (após `cooldown`) -> closed."""
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+
+
+class LogUploader:
+    """
+    Drena o journal do LogSender para o LogCenter em lotes.
+    - Lê os segmentos selados a partir de um checkpoint (segmento, offset)
+      persistido em disco; nada é reescrito.
+    - Até `max_in_flight` lotes em paralelo; com `bulk_path` cada lote é um
+      único POST JSON (gzip opcional), senão as linhas do lote vão em POSTs
+      concorrentes para /datalog/upload (linhas que falham são repetidas
+      dentro do lote antes de desistir).
+    - Falhas: backoff exponencial com jitter + circuit breaker. O checkpoint
+      só avança até o último lote contíguo enviado (entrega at-least-once).
+    """
+    def __init__(self, journal: LogJournal, log_api: str, backup_filename: str,
+                 bulk_path: Optional[str] = None, batch_size: int = 200, max_in_flight: int = 4,
+                 use_gzip: bool = True, idle_delay: float = 5.0, backoff_base: float = 1.0,
+                 backoff_cap: float = 120.0, row_retries: int = 2,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.journal = journal
+        self.log_api = log_api.rstrip("/")
+        self.backup_filename = backup_filename
+        self.bulk_path = bulk_path
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.use_gzip = use_gzip
+        self.idle_delay = idle_delay
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.row_retries = row_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.checkpoint_path = os.path.join(journal.directory, "checkpoint.json")
+        self.checkpoint: Optional[tuple[str, int]] = self._load_checkpoint()
+        self.sent = 0
+        self.failed_batches = 0
+        self.last_sent_at: Optional[float] = None
+        self.oldest_pending: Optional[str] = None  # timePlayed do registro mais antigo não enviado
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- ciclo de vida ----------
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(15.0, connect=5.0),
+                limits=httpx.Limits(max_connections=self.max_in_flight * 4),
+            )
+            self._task = asyncio.create_task(self._run(), name="log-uploader")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def lag_seconds(self) -> float:
+        """Idade do registro mais antigo pendente de envio (0 quando não há pendência)."""
+        if not self.oldest_pending:
+            return 0.0
+        try:
+            oldest = datetime.strptime(self.oldest_pending, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return 0.0
+        return max(0.0, (datetime.now(timezone.utc) - oldest).total_seconds())
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed_batches": self.failed_batches,
+            "breaker": self.breaker.state,
+            "checkpoint": self.checkpoint,
+            "oldest_pending": self.oldest_pending,
+            "last_sent_at": self.last_sent_at,
+        }
+
+    # ---------- checkpoint ----------
+
+    def _load_checkpoint(self) -> Optional[tuple[str, int]]:
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["segment"], data["offset"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _save_checkpoint(self, checkpoint: tuple[str, int]):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segment": checkpoint[0], "offset": checkpoint[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        # segmentos totalmente enviados podem sair do disco
+        name, offset = checkpoint
+        for seg in self.journal.sealed_segments():
+            path = os.path.join(self.journal.directory, seg)
+            if segment_index(seg) < segment_index(name) or (seg == name and offset >= os.path.getsize(path)):
+                os.remove(path)
+
+    def _append_backup(self, rows: list[dict]):
+        with open(self.backup_filename, mode="a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+            writer.writerows(rows)
+
+    def _read_batches(self) -> list[list[tuple[str, int, dict]]]:
+        batches, current = [], []
+        for item in iter_sealed(self.journal, self.checkpoint):
+            current.append(item)
+            if len(current) >= self.batch_size:
+                batches.append(current)
+                current = []
+                if len(batches) >= self.max_in_flight:
+                    break
+        if current and len(batches) < self.max_in_flight:
+            batches.append(current)
+        return batches
+
+    # ---------- envio ----------
+
+    async def _send_batch(self, rows: list[dict]) -> int:
+        """Envia um lote; retorna quantas linhas iniciais (prefixo contíguo) foram aceitas."""
+        try:
+            if self.bulk_path:
+                body = json.dumps(rows, ensure_ascii=False).encode()
+                headers = {"Content-Type": "application/json"}
+                if self.use_gzip:
+                    body = gzip.compress(body, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+                r = await self._client.post(f"{self.log_api}{self.bulk_path}", content=body, headers=headers)
+                return len(rows) if r.status_code == 200 else 0
+            ok = [False] * len(rows)
+            for attempt in range(self.row_retries + 1):
+                pending = [i for i, sent in enumerate(ok) if not sent]
+                if not pending:
+                    break
+                if attempt:
+                    await asyncio.sleep(self.backoff_base * attempt)
+                results = await asyncio.gather(*(
+                    self._client.post(f"{self.log_api}/datalog/upload",
+                                      data={k: rows[i].get(k, "") for k in FIELDS})
+                    for i in pending
+                ), return_exceptions=True)
+                for i, r in zip(pending, results):
+                    ok[i] = not isinstance(r, Exception) and r.status_code == 200
+            accepted = 0
+            while accepted < len(rows) and ok[accepted]:
+                accepted += 1
+            return accepted
+        except Exception as e:
+            logger.warning("log_batch_send_error", error=str(e), rows=len(rows))
+            return 0
+
+    async def drain_once(self) -> int:
+        """Envia até `max_in_flight` lotes. Retorna quantos registros foram confirmados."""
+        if not self.breaker.allow():
+            return 0
+        batches = await asyncio.to_thread(self._read_batches)
+        if not batches:
+            self.oldest_pending = None
+            return 0
+        self.oldest_pending = batches[0][0][2].get("timePlayed")
+        if self.breaker.state == "half_open":
+            batches = batches[:1]  # sonda com um lote só
+
+        results = await asyncio.gather(*(self._send_batch([rec for _, _, rec in b]) for b in batches))
+
+        committed: list[dict] = []
+        checkpoint = None
+        for batch, accepted in zip(batches, results):
+            if accepted:
+                committed.extend(rec for _, _, rec in batch[:accepted])
+                checkpoint = (batch[accepted - 1][0], batch[accepted - 1][1])
+            if accepted < len(batch):
+                break
+        failed = sum(1 for batch, accepted in zip(batches, results) if accepted < len(batch))
+
+        if checkpoint:
+            await asyncio.to_thread(self._append_backup, committed)
+            await asyncio.to_thread(self._save_checkpoint, checkpoint)
+            self.checkpoint = checkpoint
+            self.sent += len(committed)
+            self.last_sent_at = time.time()
+
+        self.failed_batches += failed
+        # progresso parcial conta como serviço no ar; só abre o breaker sem nenhum envio
+        if committed:
+            self.breaker.success()
+        else:
+            self.breaker.failure()
+        logger.info("batch_processed", sent=len(committed), batches=len(batches),
+                    failed=failed, breaker=self.breaker.state)
+        return len(committed)
+
+    async def _run(self):
+        attempt, sent = 0, 0
+        while True:
+            try:
+                if not sent:
+                    # em dia com o backlog: sela o segmento ativo para subir o que já foi gravado
+                    self.journal.rotate()
+                    await asyncio.sleep(0.05)
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("log_uploader_error", error=str(e))
+                sent = 0
+            if self.breaker.failures:
+                attempt += 1
+                delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+            else:
+                attempt = 0
+                # backlog: continua drenando sem pausa; ocioso: espera novos registros
+                await asyncio.sleep(0 if sent else self.idle_delay)
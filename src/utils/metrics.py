@@ -0,0 +1,293 @@
+"""
+Métricas em memória no formato texto do Prometheus (exposition 0.0.4), servidas em GET /metrics.
+
+Feito para o caminho quente: cada série (combinação de labels) é resolvida uma
+vez e guardada; `observe()` é um bisect nos limites pré-alocados + três
+incrementos, sem lock (tudo roda no event loop; o GIL cobre as raras
+atualizações vindas de threads, ao custo de, no pior caso, um incremento perdido).
+Os buckets são guardados sem acumular; a soma cumulativa só é feita no scrape.
+"""
+import asyncio
+import functools
+import math
+import time
+
+from bisect import bisect_left
+from typing import Callable, Optional
+
+
+# limites em segundos; "+Inf" é implícito
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SERIAL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 12, 20, 30)
+LOCK_WAIT_BUCKETS = (0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._default = self._series[()] = self._new_series()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Série para esses valores de label (criada na primeira chamada, depois só um dict lookup)."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: esperado {self.labelnames}, recebido {values}")
+            series = self._series[values] = self._new_series()
+        return series
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in list(self._series.items()):
+            lines.extend(self._samples(values, series))
+        return lines
+
+    def _samples(self, values: tuple, series) -> list[str]:
+        raise NotImplementedError
+
+
+class _CounterSeries:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1.0):
+        self._default.value += amount
+
+    def _samples(self, values, series):
+        return [f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(series.value)}"]
+
+
+class _GaugeSeries:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Valor lido só no scrape (ex.: profundidade de fila)."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is None:
+            return self.value
+        try:
+            return float(self.function())
+        except Exception:
+            return math.nan
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def set(self, value: float):
+        self._default.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.function = function
+
+    def _samples(self, values, series):
+        value = series.get()
+        text = "NaN" if math.isnan(value) else _format_value(value)
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {text}"]
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # bisect_left: valor igual ao limite cai no bucket "le" daquele limite
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("series", "start")
+
+    def __init__(self, series: _HistogramSeries):
+        self.series = series
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self):
+        return _HistogramSeries(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self, *labelvalues) -> _Timer:
+        """`with HIST.time("op"):` mede o bloco."""
+        return _Timer(self.labels(*labelvalues))
+
+    def timed(self, *labelvalues):
+        """Decorator para corrotinas: mede cada chamada (inclusive as que levantam exceção)."""
+        series = self.labels(*labelvalues)
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    series.observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def _samples(self, values, series):
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.bounds, math.inf), series.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+        lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class TimedLock:
+    """asyncio.Lock que registra o tempo de espera para adquiri-lo (`async with lock:`)."""
+    def __init__(self, wait_series: _HistogramSeries):
+        self._lock = asyncio.Lock()
+        self._wait = wait_series
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    async def acquire(self) -> bool:
+        start = time.perf_counter()
+        await self._lock.acquire()
+        self._wait.observe(time.perf_counter() - start)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+# ----------------------------
+# Métricas da app
+# ----------------------------
+
+SERIAL_REQUEST_SECONDS = Histogram(
+    "serial_request_seconds", "Ida e volta de um comando ao dispenser até a resposta (ou timeout).",
+    ("port", "command", "reply"), buckets=SERIAL_BUCKETS,
+)
+SERIAL_LOCK_WAIT_SECONDS = Histogram(
+    "serial_lock_wait_seconds", "Espera para adquirir o lock da serial de cada dispenser.",
+    ("dispenser",), buckets=LOCK_WAIT_BUCKETS,
+)
+SHORTENER_REQUEST_SECONDS = Histogram(
+    "shortener_request_seconds", "Latência das chamadas ao encurtador (com retries).",
+    ("operation", "outcome"),
+)
+MONGO_OP_SECONDS = Histogram(
+    "mongo_op_seconds", "Latência dos helpers de acesso ao Mongo.", ("operation",),
+)
+UDP_SEND_FAILURES = Counter(
+    "udp_send_failures", "Mensagens ao display que falharam (socket, envio ou sem ACK).", ("reason",),
+)
+REPLAY_GUARD_HITS = Counter(
+    "replay_guard_hits", "Requests recusados como repetição pelo ReplayGuard.", ("method",),
+)
+LOG_QUEUE_DEPTH = Gauge(
+    "log_sender_queue_depth", "Registros do LogSender ainda no buffer do journal (antes do fsync).",
+)
+LOG_UPLOAD_LAG_SECONDS = Gauge(
+    "log_sender_upload_lag_seconds", "Idade do registro mais antigo ainda não enviado ao LogCenter.",
+)
+
+REGISTRY: tuple[_Metric, ...] = (
+    SERIAL_REQUEST_SECONDS,
+    SERIAL_LOCK_WAIT_SECONDS,
+    SHORTENER_REQUEST_SECONDS,
+    MONGO_OP_SECONDS,
+    UDP_SEND_FAILURES,
+    REPLAY_GUARD_HITS,
+    LOG_QUEUE_DEPTH,
+    LOG_UPLOAD_LAG_SECONDS,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render(metrics=REGISTRY) -> str:
+    lines: list[str] = []
+    for metric in metrics:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import structlog
+
+from dataclasses import dataclass
+from typing import Optional
+
+from jinja2 import Template
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.templating import Jinja2Templates
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só gzip/identity
+    brotli = None
+
+
+log = structlog.get_logger()
+
+
+@dataclass
+class CachedPage:
+    template: Template
+    etag: str                       # da representação sem compressão
+    variants: dict[str, bytes]      # content-encoding ("identity", "gzip", "br") -> body
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class PageCache:
+    """
+    Páginas HTML que não dependem do request, renderizadas uma vez e guardadas já
+    comprimidas (gzip e, se o pacote `brotli` existir, br), cada variante com ETag forte.
+    - `response()` escolhe a variante pelo Accept-Encoding e responde 304 a If-None-Match.
+    - Com `check_mtime` (dev), re-renderiza quando o arquivo do template muda.
+    - Página que não renderiza (template ausente/erro) não entra no cache e segue
+      pelo `TemplateResponse` normal, com o mesmo comportamento de antes.
+    """
+    def __init__(self, templates: Jinja2Templates, pages: tuple[str, ...], check_mtime: bool = False,
+                 gzip_level: int = 9, brotli_quality: int = 11):
+        self.templates = templates
+        self.pages = pages
+        self.check_mtime = check_mtime
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._pages: dict[str, CachedPage] = {}
+
+    def _render(self, name: str) -> CachedPage:
+        template = self.templates.get_template(name)
+        body = template.render().encode("utf-8")
+        variants = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=self.gzip_level, mtime=0),
+        }
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=self.brotli_quality)
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        return CachedPage(template=template, etag=etag, variants=variants)
+
+    def warm(self) -> dict[str, dict[str, int]]:
+        """Renderiza todas as páginas; retorna os tamanhos por variante das que renderizaram."""
+        sizes = {}
+        for name in self.pages:
+            try:
+                page = self._pages[name] = self._render(name)
+                sizes[name] = {enc: len(body) for enc, body in page.variants.items()}
+            except Exception as e:
+                log.warning("page-cache-render-failed", page=name, error=str(e))
+        log.info("page-cache-warmed", pages=sizes)
+        return sizes
+
+    def get(self, name: str) -> Optional[CachedPage]:
+        page = self._pages.get(name)
+        if page is not None and self.check_mtime and not page.template.is_up_to_date:
+            page = None
+        if page is None and name in self.pages:
+            try:
+                page = self._pages[name] = self._render(name)
+            except Exception as e:
+                log.warning("page-cache-render-failed", page=name, error=str(e))
+                return None
+        return page
+
+    def response(self, name: str, request: Request, status_code: int = 200) -> Response:
+        page = self.get(name)
+        if page is None:
+            return self.templates.TemplateResponse(name, {"request": request}, status_code=status_code)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in page.variants and accepted.get(candidate, 0) > 0:
+                encoding = candidate
+                break
+
+        # ETag forte precisa diferir por representação (cada encoding é um body diferente)
+        etag = f'"{page.etag}"' if encoding == "identity" else f'"{page.etag}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(page.variants[encoding], status_code=status_code,
+                        media_type="text/html; charset=utf-8", headers=headers)
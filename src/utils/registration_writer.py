@@ -0,0 +1,124 @@
+import asyncio
+import structlog
+
+from typing import Optional
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+log = structlog.get_logger()
+
+DUPLICATE_KEY = 11000
+
+
+class CoalescingWriter:
+    """
+    Agrupa inserts concorrentes numa coleção: cada `insert()` entra num buffer
+    que é descarregado com um `insert_many(ordered=False)` quando chega a
+    `max_batch` documentos ou após `max_delay` segundos do primeiro pendente.
+    Cada chamador recebe o resultado do seu documento: retorna o `_id` ou
+    levanta DuplicateKeyError (o resto do lote segue gravado, pois é unordered).
+    Outros erros do lote são repassados a todos os chamadores afetados.
+    """
+    def __init__(self, coll, max_batch: int = 500, max_delay: float = 0.005):
+        self.coll = coll
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._full = asyncio.Event()
+        self._has_pending = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.inserted = 0
+        self.duplicates = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="registration-writer")
+
+    async def stop(self):
+        """Descarrega o que estiver pendente e encerra o flusher."""
+        self._closing = True
+        self._has_pending.set()
+        self._full.set()
+        if self._task:
+            await self._task
+            self._task = None
+        if self._pending:
+            await self._flush(self._take())
+
+    async def insert(self, doc: dict):
+        if self._closing:
+            raise RuntimeError("registration writer encerrado")
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, fut))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await fut
+
+    def _take(self) -> list[tuple[dict, asyncio.Future]]:
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        if not self._pending:
+            self._has_pending.clear()
+        return batch
+
+    async def _run(self):
+        while not self._closing or self._pending:
+            await self._has_pending.wait()
+            if not self._pending:
+                if self._closing:
+                    return
+                self._has_pending.clear()
+                continue
+            if len(self._pending) < self.max_batch and not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush(self._take())
+
+    async def _flush(self, batch: list[tuple[dict, asyncio.Future]]):
+        # chamadores cancelados não vão a banco
+        batch = [(doc, fut) for doc, fut in batch if not fut.cancelled()]
+        if not batch:
+            return
+        failed: dict[int, dict] = {}
+        try:
+            await self.coll.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        except Exception as e:
+            log.error("registration-writer-flush-error", error=str(e), size=len(batch))
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        self.batches += 1
+        for i, (doc, fut) in enumerate(batch):
+            err = failed.get(i)
+            if fut.done():
+                continue
+            if err is None:
+                self.inserted += 1
+                fut.set_result(doc["_id"])
+            elif err.get("code") == DUPLICATE_KEY:
+                self.duplicates += 1
+                fut.set_exception(DuplicateKeyError(err.get("errmsg", "duplicate key"), DUPLICATE_KEY, err))
+            else:
+                fut.set_exception(BulkWriteError({"writeErrors": [err]}))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "avg_batch": round(self.inserted / self.batches, 1) if self.batches else 0.0,
+        }
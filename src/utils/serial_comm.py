@@ -1,25 +1,134 @@
-import serial
-import threading
-from utils.singleton import Singleton
+import asyncio
+import time
+import structlog
+import serial_asyncio
+from utils.metrics import SERIAL_REQUEST_SECONDS
 
-class SerialComm(metaclass=Singleton):
+
+log = structlog.get_logger()
+
+
+class SerialComm:
+    """
+    Transporte serial assíncrono de um dispenser (uma instância por porta,
+    criadas pelo DispenserRegistry).
+    Uma task de leitura consome as linhas da porta e resolve as futures
+    de quem está aguardando ("start", "dropped", "hand_timeout", "out_of_stock").
+    """
     def __init__(self, port="COM3", baudrate=9600, timeout=1):
-        self.semaphore = threading.Semaphore()
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
-        self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=self.timeout)
-
-    def send(self, msg):
-        self.semaphore.acquire()
-        self.ser.write(msg.encode())
-        self.semaphore.release()
-
-    def receive(self):
-        self.semaphore.acquire()
-        if self.ser.in_waiting > 0:
-            data = self.ser.readline().decode().strip()
-        else:
-            data = None
-        self.semaphore.release()
-        return data
\ No newline at end of file
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._open_lock = asyncio.Lock()
+        self._waiters: list[tuple[frozenset[str], asyncio.Future]] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def open(self):
+        """Abre a porta (idempotente) e inicia a task de leitura."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._reader, self._writer = await asyncio.wait_for(
+                serial_asyncio.open_serial_connection(url=self.port, baudrate=self.baudrate),
+                timeout=self.timeout * 5,
+            )
+            self._reader_task = asyncio.create_task(self._read_loop(), name="serial-reader")
+            log.info("serial-opened", port=self.port, baudrate=self.baudrate)
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        self._fail_waiters(ConnectionError("porta serial fechada"))
+        log.info("serial-closed", port=self.port)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                raw = await self._reader.readline()
+                if not raw:
+                    raise ConnectionError("porta serial encerrada (EOF)")
+                line = raw.decode(errors="replace").strip()
+                if line:
+                    self._dispatch(line)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("serial-reader-stopped", error=str(e), port=self.port)
+            if self._writer is not None:
+                self._writer.close()  # libera o fd/transport antes de open() criar outro
+            self._writer = None
+            self._fail_waiters(e)
+
+    def _dispatch(self, line: str):
+        """Entrega a linha ao primeiro waiter (FIFO) que aceita essa resposta."""
+        for i, (expected, fut) in enumerate(self._waiters):
+            if fut.done():
+                continue
+            if line in expected:
+                del self._waiters[i]
+                fut.set_result(line)
+                return
+        log.debug("serial-unsolicited", line=line, port=self.port)
+
+    def _fail_waiters(self, exc: Exception):
+        for _, fut in self._waiters:
+            if not fut.done():
+                fut.set_exception(exc)
+        self._waiters.clear()
+
+    async def send(self, msg: str):
+        await self.open()
+        self._writer.write(msg.encode())
+        await self._writer.drain()
+
+    async def wait_for(self, *expected: str, timeout: float) -> str | None:
+        """Aguarda uma das respostas esperadas; retorna None em timeout."""
+        fut = self._register(expected)
+        return await self._await(fut, timeout)
+
+    async def request(self, msg: str, expected: tuple[str, ...], timeout: float) -> str | None:
+        """
+        Envia `msg` e aguarda uma das respostas em `expected`.
+        O waiter é registrado antes do envio para não perder respostas rápidas.
+        Retorna a resposta recebida ou None em timeout.
+        """
+        await self.open()
+        fut = self._register(expected)
+        start = time.perf_counter()
+        try:
+            await self.send(msg)
+        except Exception:
+            self._discard(fut)
+            SERIAL_REQUEST_SECONDS.labels(self.port, msg, "error").observe(time.perf_counter() - start)
+            raise
+        reply = await self._await(fut, timeout)
+        SERIAL_REQUEST_SECONDS.labels(self.port, msg, reply or "timeout").observe(time.perf_counter() - start)
+        return reply
+
+    def _register(self, expected) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((frozenset(expected), fut))
+        return fut
+
+    def _discard(self, fut: asyncio.Future):
+        self._waiters = [(e, f) for e, f in self._waiters if f is not fut]
+        if not fut.done():
+            fut.cancel()
+
+    async def _await(self, fut: asyncio.Future, timeout: float) -> str | None:
+        try:
+            return await asyncio.wait_for(fut, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._discard(fut)
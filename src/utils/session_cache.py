@@ -0,0 +1,101 @@
+import asyncio
+import time
+import structlog
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+
+log = structlog.get_logger()
+
+Loader = Callable[[str], Awaitable[Any]]
+
+
+def _consume_exception(task: asyncio.Task):
+    """Evita "exception was never retrieved" quando todos os que aguardavam foram cancelados."""
+    if not task.cancelled():
+        task.exception()
+
+
+class SessionCache:
+    """
+    Cache em processo das leituras de sessão, por SID, com TTL e teto de entradas (LRU).
+    - Misses concorrentes do mesmo SID são coalescidos: uma única leitura no banco,
+      numa task própria que todos aguardam via shield; request cancelado (cliente
+      desconectou) não derruba a leitura dos demais.
+    - `invalidate()` é chamado pelos helpers que mudam o estado da sessão; uma leitura
+      que estava em voo durante a invalidação não repopula o cache com o valor antigo.
+    - Resultados None (sessão inexistente) não são cacheados.
+    Com vários workers, cada processo tem o seu cache: o TTL limita a defasagem
+    de mudanças feitas por outro worker.
+    """
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 10_000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._generation: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+        # leituras em voo iniciadas antes desta invalidação não gravam no cache
+        if key in self._inflight:
+            self._generation[key] = self._generation.get(key, 0) + 1
+
+    async def get_or_load(self, key: str, loader: Loader) -> Optional[Any]:
+        value = self.peek(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._inflight[key] = asyncio.create_task(self._load(key, loader), name="session-cache-load")
+            task.add_done_callback(_consume_exception)
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Loader) -> Optional[Any]:
+        generation = self._generation.get(key, 0)
+        try:
+            value = await loader(key)
+            if value is not None and self._generation.get(key, 0) == generation:
+                self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._generation.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import itertools
+import time
+import structlog
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+log = structlog.get_logger()
+
+TERMINAL_STATUSES = frozenset({"completed", "failed", "aborted"})
+
+
+@dataclass
+class SessionEvent:
+    id: int
+    session_id: str
+    status: str
+    at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {"session_id": self.session_id, "status": self.status, "at": self.at}
+
+
+class Subscription:
+    """
+    Fila de uma conexão. Limitada a `max_pending` eventos: se o cliente não
+    consome, a assinatura é marcada como `overflowed` e deve ser encerrada —
+    o cliente reconecta com Last-Event-ID e retoma pelo histórico.
+    """
+    def __init__(self, hub: "SessionEventHub", session_id: str, max_pending: int):
+        self.hub = hub
+        self.session_id = session_id
+        self.queue: asyncio.Queue[SessionEvent] = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def _offer(self, event: SessionEvent):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next(self, timeout: float) -> Optional[SessionEvent]:
+        """Próximo evento, ou None se nada chegou em `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionEventHub:
+    """
+    Pub/sub em processo das transições de sessão.
+    - `publish()` é chamado pelos helpers que mudam o status da sessão.
+    - Cada SID guarda os últimos `history` eventos, para retomar a partir do Last-Event-ID.
+    - Teto de memória: no máximo `max_sessions` SIDs com histórico (LRU) e
+      `max_pending` eventos enfileirados por conexão.
+    Os ids são globais e crescentes no processo; um id desconhecido (outro worker,
+    restart) ou anterior ao histórico retido resulta em `gap=True` e o cliente
+    deve receber um snapshot do estado atual.
+    """
+    def __init__(self, history: int = 16, max_sessions: int = 5_000, max_pending: int = 32):
+        self.history = history
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self._ids = itertools.count(1)
+        self._history: OrderedDict[str, deque[SessionEvent]] = OrderedDict()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self.published = 0
+        self.overflows = 0
+
+    def publish(self, session_id: str, status: str) -> SessionEvent:
+        event = SessionEvent(id=next(self._ids), session_id=session_id, status=status)
+        events = self._history.get(session_id)
+        if events is None:
+            events = self._history[session_id] = deque(maxlen=self.history)
+        events.append(event)
+        self._history.move_to_end(session_id)
+        while len(self._history) > self.max_sessions:
+            self._history.popitem(last=False)
+
+        for sub in self._subscribers.get(session_id, ()):
+            was_overflowed = sub.overflowed
+            sub._offer(event)
+            if sub.overflowed and not was_overflowed:
+                self.overflows += 1
+                log.warning("session-events-overflow", session_id=session_id)
+        self.published += 1
+        return event
+
+    def subscribe(self, session_id: str, last_event_id: Optional[int] = None) -> tuple[Subscription, list[SessionEvent], bool]:
+        """
+        Registra uma conexão e devolve (assinatura, eventos a reenviar, gap).
+        Sem `last_event_id`, nada é reenviado e `gap` é True (o cliente precisa do snapshot).
+        """
+        sub = Subscription(self, session_id, self.max_pending)
+        self._subscribers.setdefault(session_id, set()).add(sub)
+
+        events = list(self._history.get(session_id, ()))
+        if last_event_id is None:
+            return sub, [], True
+        missed = [e for e in events if e.id > last_event_id]
+        # o id pedido precisa estar no histórico retido para a retomada ser contínua
+        gap = not any(e.id == last_event_id for e in events)
+        return sub, missed[-self.max_pending:], gap
+
+    def _unsubscribe(self, sub: Subscription):
+        subs = self._subscribers.get(sub.session_id)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[sub.session_id]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._history),
+            "connections": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
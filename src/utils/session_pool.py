@@ -0,0 +1,149 @@
+import asyncio
+import os
+import structlog
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from core.indexes import check_plan
+
+
+log = structlog.get_logger()
+
+Minter = Callable[[], Awaitable[dict]]
+
+
+def _now_utc():
+    return datetime.now(timezone.utc)
+
+
+class SessionPool:
+    """
+    Pool de sessões/links curtos pré-gerados, persistido no Mongo.
+    - `pop()` retira atomicamente uma entrada pronta (find_one_and_delete),
+      seguro com vários workers.
+    - Uma task de refill mantém o estoque entre as marcas low/high. Com vários
+      workers, só quem detém o lease em `lease_coll` conta e completa o pool
+      (sem lease, cada worker completaria até `high` e o pool iria a N x high).
+    - Entradas nunca usadas expiram pelo índice TTL em `expires_at`
+      (declarado em core.indexes).
+    O `mint` gera uma entrada: {"_id": session_id, "slug", "short_url", "qr_png", "qr_svg"}.
+    """
+    def __init__(self, coll, mint: Minter, low: int = 5, high: int = 20,
+                 ttl_seconds: int = 6 * 3600, mint_concurrency: int = 4, refill_interval: float = 30.0,
+                 lease_coll=None, lease_seconds: float = 60.0):
+        self.coll = coll
+        self.lease_coll = lease_coll
+        self.lease = timedelta(seconds=lease_seconds)
+        self._owner = f"{os.getpid()}-{id(self)}"
+        self._mint = mint
+        self.low = low
+        self.high = high
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.mint_concurrency = mint_concurrency
+        self.refill_interval = refill_interval
+        self._available: Optional[int] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refill_loop(), name="session-pool-refill")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def pop(self) -> Optional[dict]:
+        """Retira a entrada mais antiga ainda válida; None se o pool estiver vazio."""
+        query, sort = {"expires_at": {"$gt": _now_utc()}}, [("minted_at", ASCENDING)]
+        await check_plan(self.coll, "session_pool_pop", query, sort=sort)
+        doc = await self.coll.find_one_and_delete(query, sort=sort)
+        if self._available is not None:
+            self._available = max(0, self._available - 1) if doc else 0
+        if doc is None or (self._available is not None and self._available < self.low):
+            self._wakeup.set()
+        return doc
+
+    async def available(self) -> int:
+        self._available = await self.coll.count_documents({"expires_at": {"$gt": _now_utc()}})
+        return self._available
+
+    async def _acquire_lease(self) -> bool:
+        """Reserva o refill (upsert condicional: lease livre ou vencido); False se outro worker o detém."""
+        if self.lease_coll is None:
+            return True
+        now = _now_utc()
+        try:
+            await self.lease_coll.find_one_and_update(
+                {"_id": "refill", "until": {"$lte": now}},
+                {"$set": {"until": now + self.lease, "owner": self._owner}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _release_lease(self):
+        if self.lease_coll is not None:
+            await self.lease_coll.update_one(
+                {"_id": "refill", "owner": self._owner}, {"$set": {"until": _now_utc()}}
+            )
+
+    async def refill(self) -> int:
+        """Completa o pool até `high` se estiver abaixo de `low`. Retorna quantas entradas gerou."""
+        if not await self._acquire_lease():
+            return 0
+        try:
+            return await self._refill()
+        finally:
+            await self._release_lease()
+
+    async def _refill(self) -> int:
+        missing = self.high - await self.available()
+        if missing <= self.high - self.low:
+            return 0
+
+        sem = asyncio.Semaphore(self.mint_concurrency)
+
+        async def _one():
+            async with sem:
+                try:
+                    return await self._mint()
+                except Exception as e:
+                    log.warning("session-pool-mint-failed", error=str(e))
+                    return None
+
+        minted = [d for d in await asyncio.gather(*(_one() for _ in range(missing))) if d]
+        if not minted:
+            return 0
+        now = _now_utc()
+        for d in minted:
+            d["minted_at"] = now
+            d["expires_at"] = now + self.ttl
+        await self.coll.insert_many(minted, ordered=False)
+        self._available = (self._available or 0) + len(minted)
+        log.info("session-pool-refilled", minted=len(minted), available=self._available)
+        return len(minted)
+
+    async def _refill_loop(self):
+        while True:
+            # limpa antes do refill: um pop() que sinalizar durante o refill não se perde
+            self._wakeup.clear()
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("session-pool-refill-error", error=str(e))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
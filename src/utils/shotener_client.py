@@ -1,6 +1,7 @@
 # utils/shortener_client.py (ou core/shortener_client.py)
 
 import time
+import random
 import asyncio
 import httpx
 import structlog
@@ -8,6 +9,7 @@ from typing import Tuple
 from pydantic import HttpUrl
 from schemas.shortener import ShortenerLoginResponse, ShortenerCreateResponse
 from core.config import settings
+from utils.metrics import SHORTENER_REQUEST_SECONDS
 
 log = structlog.get_logger()
 
@@ -15,27 +17,121 @@ _token_lock = asyncio.Lock()
 _token_value: str | None = None
 _token_expiry_epoch: float = 0.0
 
-async def _login(client: httpx.AsyncClient) -> Tuple[str, float]:
-    """Efetua login no encurtador e retorna (token, expiry_epoch)."""
-    url = f"{settings.SHORTENER_BASE_URL.rstrip('/')}/auth/login"
+# Cliente HTTP compartilhado (pool + keep-alive), aberto/fechado pelo lifespan da app
+_client: httpx.AsyncClient | None = None
+_stats = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0, "retries": 0}
+
+
+async def _trace(event_name: str, info: dict):
+    """Hook de trace do httpcore: conta conexões novas (handshakes) para confirmar reuso."""
+    if event_name == "connection.connect_tcp.complete":
+        _stats["tcp_connects"] += 1
+    elif event_name == "connection.start_tls.complete":
+        _stats["tls_handshakes"] += 1
+
+
+def _http2_enabled() -> bool:
+    if not settings.SHORTENER_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (extra opcional: httpx[http2])
+        return True
+    except ImportError:
+        log.warning("shortener-http2-unavailable", hint="pip install httpx[http2]")
+        return False
+
+
+async def start_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Cria o cliente compartilhado (idempotente); `transport` substitui a rede (benchmarks)."""
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=settings.SHORTENER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SHORTENER_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SHORTENER_KEEPALIVE_EXPIRY,
+        )
+        http2 = _http2_enabled()
+        _client = httpx.AsyncClient(
+            base_url=settings.SHORTENER_BASE_URL.rstrip('/'),
+            limits=limits,
+            http2=http2,
+            transport=transport,
+            timeout=httpx.Timeout(settings.SHORTENER_TIMEOUT, connect=settings.SHORTENER_CONNECT_TIMEOUT),
+        )
+        log.info("shortener-client-started", http2=http2,
+                 max_connections=settings.SHORTENER_MAX_CONNECTIONS)
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        log.info("shortener-client-closed", **pool_stats())
+
 
+def pool_stats() -> dict:
+    """Conexões ativas/ociosas do pool e contadores de handshakes/retries."""
+    active = idle = 0
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    for conn in getattr(pool, "connections", []):
+        if conn.is_idle():
+            idle += 1
+        else:
+            active += 1
+    return {"active_connections": active, "idle_connections": idle, **_stats}
+
+
+async def _request(method: str, path: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """
+    Requisição pelo cliente compartilhado com retries limitados e backoff com jitter
+    para erros de conexão (o request nem saiu) e, se `idempotent`, respostas 5xx.
+    Timeouts de leitura nunca são repetidos. O /shorten não é idempotente: um
+    502/504 pode vir depois de a origem gravar o link, e repetir criaria outro.
+    """
+    client = await start_client()
+    extensions = {"trace": _trace}
+    attempts = settings.SHORTENER_RETRIES + 1
+    for attempt in range(attempts):
+        _stats["requests"] += 1
+        try:
+            r = await client.request(method, path, extensions=extensions, **kwargs)
+            if r.status_code < 500 or not idempotent or attempt == attempts - 1:
+                return r
+            log.warning("shortener-5xx-retrying", path=path, status=r.status_code, attempt=attempt + 1)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            if attempt == attempts - 1:
+                raise
+            log.warning("shortener-connect-retrying", path=path, error=str(e), attempt=attempt + 1)
+        _stats["retries"] += 1
+        # full jitter: uniforme em [0, base * 2^tentativa]
+        await asyncio.sleep(random.uniform(0, settings.SHORTENER_BACKOFF_BASE * (2 ** attempt)))
+    raise RuntimeError("unreachable")
+
+
+async def _login() -> Tuple[str, float]:
+    """Efetua login no encurtador e retorna (token, expiry_epoch)."""
     form = {
         "username": settings.SHORTENER_USER,
         "password": settings.SHORTENER_PASSWORD,
         "grant_type": "password",
     }
 
+    start, outcome = time.perf_counter(), "error"
     try:
-        r = await client.post(
-            url, data=form,
+        r = await _request(
+            "POST", "/auth/login", data=form,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=15.0,
         )
         r.raise_for_status()
+        outcome = "ok"
     except httpx.HTTPStatusError as e:
         err_text = e.response.text if e.response is not None else str(e)
         log.error("shortener-login-failed", status=e.response.status_code if e.response else None, body=err_text)
         raise
+    finally:
+        SHORTENER_REQUEST_SECONDS.labels("login", outcome).observe(time.perf_counter() - start)
 
     data = ShortenerLoginResponse(**r.json())
     now = time.time()
@@ -43,7 +139,7 @@ async def _login(client: httpx.AsyncClient) -> Tuple[str, float]:
     log.info("shortener-login-ok", expiresIn=data.expiresIn)
     return data.accessToken, expiry
 
-async def _ensure_token(client: httpx.AsyncClient) -> str:
+async def _ensure_token() -> str:
     global _token_value, _token_expiry_epoch
     now = time.time()
     if _token_value and now < _token_expiry_epoch:
@@ -53,7 +149,7 @@ async def _ensure_token(client: httpx.AsyncClient) -> str:
         now = time.time()
         if _token_value and now < _token_expiry_epoch:
             return _token_value
-        token, expiry = await _login(client)
+        token, expiry = await _login()
         _token_value = token
         _token_expiry_epoch = expiry
         return _token_value
@@ -70,39 +166,42 @@ async def create_short_link(
     Cria link curto + QR no encurtador autenticado.
     Retorna: (ShortenerCreateResponse, short_url)
     """
-    async with httpx.AsyncClient() as client:
-        token = await _ensure_token(client)
-        url = f"{settings.SHORTENER_BASE_URL.rstrip('/')}/admin/shorten"
-        headers = {"Authorization": f"Bearer {token}"}
-
-        # Monta FORM conforme seu /shorten (name e url obrigatórios; callback_url/slug opcionais)
-        form = {
-            "name": (name or f"SKYN session {session_id or ''}").strip(),
-            "url": long_url,
-        }
-        if callback_url:
-            form["callback_url"] = callback_url
-        if slug:
-            form["slug"] = slug
-
-        r = await client.post(url, data=form, headers=headers, timeout=15.0)
+    token = await _ensure_token()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Monta FORM conforme seu /shorten (name e url obrigatórios; callback_url/slug opcionais)
+    form = {
+        "name": (name or f"SKYN session {session_id or ''}").strip(),
+        "url": long_url,
+    }
+    if callback_url:
+        form["callback_url"] = callback_url
+    if slug:
+        form["slug"] = slug
+
+    start, outcome = time.perf_counter(), "error"
+    try:
+        r = await _request("POST", "/admin/shorten", idempotent=False, data=form, headers=headers)
         if r.status_code == 401:
             log.warning("shortener-unauthorized-retrying")
             # invalida cache e reloga
             global _token_value, _token_expiry_epoch
             _token_value, _token_expiry_epoch = None, 0
-            token = await _ensure_token(client)
+            token = await _ensure_token()
             headers["Authorization"] = f"Bearer {token}"
-            r = await client.post(url, data=form, headers=headers, timeout=15.0)
+            r = await _request("POST", "/admin/shorten", idempotent=False, data=form, headers=headers)
 
         r.raise_for_status()
-        data = ShortenerCreateResponse(**r.json())
-        short_url = f"{settings.SHORTENER_BASE_URL.rstrip('/')}/{data.slug}"
-        HttpUrl(short_url)  # validação leve
-
-        log.info("shortener-create-ok", slug=data.slug)
-        return ShortenerCreateResponse(
-            slug=data.slug,
-            qr_png=data.qr_png,
-            qr_svg=data.qr_svg,
-        ), short_url
+        outcome = "ok"
+    finally:
+        SHORTENER_REQUEST_SECONDS.labels("create", outcome).observe(time.perf_counter() - start)
+    data = ShortenerCreateResponse(**r.json())
+    short_url = f"{settings.SHORTENER_BASE_URL.rstrip('/')}/{data.slug}"
+    HttpUrl(short_url)  # validação leve
+
+    log.info("shortener-create-ok", slug=data.slug)
+    return ShortenerCreateResponse(
+        slug=data.slug,
+        qr_png=data.qr_png,
+        qr_svg=data.qr_svg,
+    ), short_url
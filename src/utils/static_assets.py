@@ -0,0 +1,245 @@
+import mimetypes
+import mmap
+import os
+import re
+import structlog
+
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from utils.page_cache import accepted_encodings, etag_matches
+
+
+log = structlog.get_logger()
+
+for _type, _ext in (("font/woff2", ".woff2"), ("font/otf", ".otf"), ("image/avif", ".avif"), ("image/webp", ".webp")):
+    mimetypes.add_type(_type, _ext)
+
+# nomes gerados por tools/build_assets.py: <stem>.<hash hex>.<ext>
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+CHUNK = 256 * 1024
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class Asset:
+    path: Path
+    size: int
+    mtime: float
+    media_type: str
+    etag: str
+    cache_control: str
+    body: Optional[bytes] = None                       # em memória (arquivos pequenos)
+    mapped: Optional[mmap.mmap] = None                 # mmap (arquivos grandes, sem zerocopy)
+    encoded: dict[str, bytes] = field(default_factory=dict)  # irmãos .br/.gz pré-comprimidos
+
+    def view(self, start: int, end: int):
+        if self.body is not None:
+            return memoryview(self.body)[start:end]
+        if self.mapped is None:
+            with open(self.path, "rb") as f:
+                self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self.mapped)[start:end]
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Um único intervalo `bytes=a-b` -> (início, fim exclusivo); None se inválido/múltiplo."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:  # sufixo: últimos N bytes
+            n = int(last)
+            return (max(0, size - n), size) if n > 0 else None
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    return (start, end) if start < end else None
+
+
+class StaticAssets:
+    """
+    Substituto do StaticFiles para os mounts de assets:
+    - índice em memória (stat uma vez): arquivos até `max_memory_file` ficam em RAM,
+      dentro de um orçamento total; os maiores vão por zero-copy (extensão ASGI
+      `http.response.zerocopysend`/`pathsend`, quando o servidor oferece) ou por mmap;
+    - `Cache-Control: immutable` para nomes com hash (tools/build_assets.py), senão revalidação por ETag;
+    - ETag/If-None-Match (304), Range de um intervalo (206/416), e irmãos `.br`/`.gz`
+      servidos conforme Accept-Encoding.
+    Arquivos sem hash no nome (REVALIDATE) levam um stat por request e são
+    re-indexados se mudarem no disco (ex.: assets/inventory.json, regravado pelo
+    InventoryStore): senão o ETag do startup valeria para sempre. Nomes com hash
+    são imutáveis e só são re-verificados com `check_mtime` (dev).
+    """
+    def __init__(self, directory: str | os.PathLike, max_memory_file: int = 512 * 1024,
+                 memory_budget: int = 64 * 1024 * 1024, check_mtime: bool = False):
+        self.directory = Path(directory).resolve()
+        if not self.directory.is_dir():
+            raise RuntimeError(f"Directory '{directory}' does not exist")
+        self.max_memory_file = max_memory_file
+        self.memory_budget = memory_budget
+        self.check_mtime = check_mtime
+        self._assets: dict[str, Asset] = {}
+        self._memory = 0
+
+    # ---------- índice ----------
+
+    def _load(self, rel: str) -> Optional[Asset]:
+        path = (self.directory / rel).resolve()
+        if self.directory not in path.parents or not path.is_file():
+            return None
+        st = path.stat()
+        asset = Asset(
+            path=path,
+            size=st.st_size,
+            mtime=st.st_mtime,
+            media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            etag=f"{int(st.st_mtime_ns):x}-{st.st_size:x}",
+            cache_control=IMMUTABLE if HASHED_NAME.search(path.name) else REVALIDATE,
+        )
+        if st.st_size <= self.max_memory_file and self._memory + st.st_size <= self.memory_budget:
+            asset.body = path.read_bytes()
+            self._memory += st.st_size
+            for encoding, suffix in PRECOMPRESSED:
+                sibling = path.with_name(path.name + suffix)
+                if sibling.is_file():
+                    asset.encoded[encoding] = sibling.read_bytes()
+                    self._memory += len(asset.encoded[encoding])
+        return asset
+
+    def _release(self, asset: Asset):
+        if asset.body is not None:
+            self._memory -= asset.size + sum(len(b) for b in asset.encoded.values())
+        if asset.mapped is not None:
+            asset.mapped.close()
+
+    def get(self, rel: str) -> Optional[Asset]:
+        asset = self._assets.get(rel)
+        if asset is not None:
+            if not self.check_mtime and asset.cache_control == IMMUTABLE:
+                return asset
+            try:
+                st = asset.path.stat()
+                if st.st_mtime == asset.mtime and st.st_size == asset.size:
+                    return asset
+            except FileNotFoundError:
+                pass
+            self._release(asset)
+            del self._assets[rel]
+        # 404 não é cacheado: paths arbitrários não crescem o índice
+        asset = self._load(rel)
+        if asset is not None:
+            self._assets[rel] = asset
+        return asset
+
+    def preload(self) -> dict:
+        """Indexa a árvore inteira (startup); retorna contagem e bytes em memória."""
+        count = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".br", ".gz")):
+                    continue
+                rel = Path(root, name).relative_to(self.directory).as_posix()
+                if self.get(rel) is not None:
+                    count += 1
+        stats = {"files": count, "memory_bytes": self._memory}
+        log.info("static-assets-preloaded", directory=str(self.directory), **stats)
+        return stats
+
+    # ---------- ASGI ----------
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        assert scope["type"] == "http"
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            return await self._plain(send, 405, b"Method Not Allowed", {"allow": "GET, HEAD"})
+
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path + "/"):
+            path = path[len(root_path):]
+        asset = self.get(path.lstrip("/"))
+        if asset is None:
+            return await self._plain(send, 404, b"Not Found")
+
+        request_headers = Headers(scope=scope)
+        range_header = request_headers.get("range")
+        encoding = None
+        if asset.encoded and not range_header:
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            encoding = next((enc for enc, _ in PRECOMPRESSED if enc in asset.encoded and accepted.get(enc, 0) > 0), None)
+
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {
+            "etag": etag,
+            "cache-control": asset.cache_control,
+            "last-modified": formatdate(asset.mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+        if asset.encoded:
+            headers["vary"] = "Accept-Encoding"
+        if etag_matches(request_headers.get("if-none-match", ""), etag):
+            return await self._start(send, 304, headers, end=True)
+
+        headers["content-type"] = asset.media_type
+        if encoding:
+            body = asset.encoded[encoding]
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            await self._start(send, 200, headers)
+            return await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
+
+        start, end, status = 0, asset.size, 200
+        if range_header and request_headers.get("if-range", etag) == etag:
+            byte_range = _parse_range(range_header, asset.size)
+            if byte_range is None or byte_range[0] >= asset.size:
+                headers["content-range"] = f"bytes */{asset.size}"
+                return await self._start(send, 416, headers, end=True)
+            start, end, status = *byte_range, 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{asset.size}"
+        headers["content-length"] = str(end - start)
+        await self._start(send, status, headers)
+        if method == "HEAD":
+            return await send({"type": "http.response.body", "body": b""})
+        await self._send_body(scope, send, asset, start, end)
+
+    async def _send_body(self, scope: Scope, send: Send, asset: Asset, start: int, end: int):
+        extensions = scope.get("extensions") or {}
+        if asset.body is None and "http.response.zerocopysend" in extensions:
+            with open(asset.path, "rb") as f:
+                return await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                                   "offset": start, "count": end - start})
+        if asset.body is None and start == 0 and end == asset.size and "http.response.pathsend" in extensions:
+            return await send({"type": "http.response.pathsend", "path": str(asset.path)})
+        if asset.body is not None and start == 0 and end == asset.size:
+            return await send({"type": "http.response.body", "body": asset.body})
+        view = asset.view(start, end)
+        if len(view) <= CHUNK:
+            return await send({"type": "http.response.body", "body": bytes(view)})
+        for offset in range(0, len(view), CHUNK):
+            chunk = view[offset:offset + CHUNK]
+            await send({"type": "http.response.body", "body": bytes(chunk),
+                        "more_body": offset + CHUNK < len(view)})
+
+    @staticmethod
+    async def _start(send: Send, status: int, headers: dict, end: bool = False):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+        if end:
+            await send({"type": "http.response.body", "body": b""})
+
+    async def _plain(self, send: Send, status: int, body: bytes, headers: Optional[dict] = None):
+        await self._start(send, status, {"content-type": "text/plain; charset=utf-8",
+                                         "content-length": str(len(body)), **(headers or {})})
+        await send({"type": "http.response.body", "body": body})
@@ -1,138 +1,266 @@
-import socket
-import threading
+import asyncio
+import random
+import structlog
+
+from collections import OrderedDict
+from typing import Optional
+
+from utils.metrics import UDP_SEND_FAILURES
 from utils.singleton import Singleton
-import logging as log
-import time
+
+
+log = structlog.get_logger()
+
+# Protocolo com ACK (UDP_ACK_ENABLED): "<seq>:<msg>" -> display responde "ack:<seq>".
+# Sem ACK, o datagrama é só "<msg>", como o app do display sempre recebeu.
+ACK_PREFIX = "ack:"
+
+
+def encode_message(seq: int, msg: str) -> bytes:
+    return f"{seq}:{msg}".encode()
+
+
+def decode_message(data: bytes) -> tuple[Optional[int], str]:
+    """"<seq>:<msg>" -> (seq, msg); datagrama sem sequência -> (None, msg)."""
+    text = data.decode(errors="replace").strip()
+    head, sep, msg = text.partition(":")
+    if sep and head.isdigit():
+        return int(head), msg
+    return None, text
+
+
+class _SenderProtocol(asyncio.DatagramProtocol):
+    def __init__(self, sender: "UDPSender"):
+        self.sender = sender
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.sender._on_datagram(data)
+
+    def error_received(self, exc: Exception):
+        # socket "conectado": ICMP port unreachable chega aqui (display fora do ar)
+        self.sender.stats["errors"] += 1
+        UDP_SEND_FAILURES.labels("icmp").inc()
+        log.warning("udp-error-received", error=str(exc), ip=self.sender.ip, port=self.sender.port)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.sender._on_lost(self.transport)
 
 
 class UDPSender(metaclass=Singleton):
-    def __init__(self, ip="127.0.0.1", port=5053):
-        self.semaphore = threading.Semaphore()
+    """
+    Mensagens para o app do display ("cta", "calor", "retire") sobre um
+    DatagramProtocol do asyncio: nada aqui bloqueia o event loop.
+    - `send()` dispara um datagrama e retorna.
+    - `send_with_confirmation()` numera a mensagem e aguarda o ACK do display;
+      as retransmissões são timers do loop (`ack_timeout`, dobrando a cada
+      tentativa) até `max_attempts`. Sem `ack`, equivale ao `send()`.
+    - `notify()` roda o `send_with_confirmation()` numa task: para quem não deve
+      esperar o ACK (ex.: o worker do dispenser).
+    O socket é aberto em `open()` (lifespan) ou no primeiro envio.
+    """
+    def __init__(self, ip="127.0.0.1", port=5053, ack: bool = False,
+                 ack_timeout: float = 0.3, max_attempts: int = 3):
         self.ip = ip
         self.port = port
-        self.lock = threading.Lock()
-        self.max_retries = 3
-        self.retry_delay = 1
-        self._initialize_socket()
+        self.ack = ack
+        self.ack_timeout = ack_timeout
+        self.max_attempts = max_attempts
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._open_lock = asyncio.Lock()
+        # início aleatório: um sender reiniciado não colide com a janela de duplicados do display
+        self._seq = random.randrange(1 << 30)
+        self._pending: dict[int, tuple[asyncio.Future, Optional[asyncio.TimerHandle]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"sent": 0, "acked": 0, "retransmits": 0, "unconfirmed": 0, "errors": 0}
+
+    @property
+    def is_open(self) -> bool:
+        return self.transport is not None and not self.transport.is_closing()
+
+    async def open(self):
+        """Cria o endpoint UDP (idempotente)."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: _SenderProtocol(self), remote_addr=(self.ip, self.port)
+            )
+            log.info("udp-socket-initialized", ip=self.ip, port=self.port, ack=self.ack)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+        self._on_lost(self.transport)
+        log.info("udp-socket-closed", ip=self.ip, port=self.port)
+
+    def _on_lost(self, transport):
+        if transport is not self.transport:
+            return  # transport antigo, já substituído por um novo open()
+        self.transport = None
+        for seq in list(self._pending):
+            self._resolve(seq, False)
+
+    def _on_datagram(self, data: bytes):
+        text = data.decode(errors="replace").strip()
+        if text.startswith(ACK_PREFIX) and text[len(ACK_PREFIX):].isdigit():
+            if self._resolve(int(text[len(ACK_PREFIX):]), True):
+                self.stats["acked"] += 1
+
+    def _resolve(self, seq: int, ok: bool) -> bool:
+        fut, timer = self._pending.pop(seq, (None, None))
+        if timer is not None:
+            timer.cancel()
+        if fut is None or fut.done():
+            return False
+        fut.set_result(ok)
+        return True
 
-    def _initialize_socket(self):
-        """Inicializa o socket UDP."""
+    def _sendto(self, data: bytes) -> bool:
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            # Define um timeout para operações de socket
-            self.sock.settimeout(5)
-            log.info("udp-socket-initialized", ip=self.ip, port=self.port)
+            self.transport.sendto(data)
+            self.stats["sent"] += 1
+            return True
         except Exception as e:
-            log.error("udp-socket-init-failed",
-                     error=str(e), ip=self.ip, port=self.port)
-            self.sock = None
-    
-    def _is_socket_valid(self):
-        """Verifica se o socket está válido."""
-        return self.sock is not None
-    
-    def _reconnect_if_needed(self):
-        """Reconecta o socket se necessário."""
-        if not self._is_socket_valid():
-            log.warning("udp-socket-reconnecting",
-                       ip=self.ip, port=self.port)
-            self._initialize_socket()
-    
-    def send(self, msg, retry_count=0):
-        """
-        Envia mensagem UDP com retry automático e tratamento de erro.
-        
-        Args:
-            msg: Mensagem a ser enviada
-            retry_count: Contador interno de tentativas
-        """
-        if retry_count >= self.max_retries:
-            log.error("udp-max-retries-exceeded",
-                     message=msg, ip=self.ip, port=self.port)
+            self.stats["errors"] += 1
+            UDP_SEND_FAILURES.labels("send_error").inc()
+            log.warning("udp-send-failed", error=str(e), ip=self.ip, port=self.port)
             return False
-        
+
+    async def send(self, msg: str) -> bool:
+        """Envia um datagrama, sem aguardar confirmação."""
         try:
-            with self.lock:
-                self._reconnect_if_needed()
-                
-                if not self._is_socket_valid():
-                    log.error("udp-socket-invalid",
-                             message=msg, ip=self.ip, port=self.port)
-                    return False
-                
-                # Envia a mensagem
-                encoded_msg = str.encode(msg)
-                bytes_sent = self.sock.sendto(encoded_msg, (self.ip, self.port))
-                
-                if bytes_sent == len(encoded_msg):
-                    log.info("udp-message-sent",
-                            message=msg, bytes_sent=bytes_sent,
-                            ip=self.ip, port=self.port)
-                    return True
-                else:
-                    log.warning("udp-partial-send",
-                               message=msg, bytes_sent=bytes_sent,
-                               expected=len(encoded_msg))
-                    return False
-                    
-        except socket.timeout:
-            log.warning("udp-send-timeout",
-                       message=msg, retry_count=retry_count,
-                       ip=self.ip, port=self.port)
-            time.sleep(self.retry_delay)
-            return self.send(msg, retry_count + 1)
-            
-        except socket.error as e:
-            log.error("udp-socket-error",
-                     error=str(e), message=msg, retry_count=retry_count,
-                     ip=self.ip, port=self.port)
-            # Tenta reconectar
-            self._initialize_socket()
-            time.sleep(self.retry_delay)
-            return self.send(msg, retry_count + 1)
-            
-        except Exception as e:
-            log.error("udp-unexpected-error",
-                     error=str(e), message=msg, retry_count=retry_count,
-                     ip=self.ip, port=self.port)
+            await self.open()
+        except OSError as e:
+            UDP_SEND_FAILURES.labels("socket").inc()
+            log.error("udp-socket-invalid", error=str(e), message=msg, ip=self.ip, port=self.port)
             return False
-    
-    def send_with_confirmation(self, msg, max_attempts=3):
+        if self.ack:
+            self._seq += 1
+            data = encode_message(self._seq, msg)
+        else:
+            data = msg.encode()
+        ok = self._sendto(data)
+        if ok:
+            log.debug("udp-message-sent", message=msg, ip=self.ip, port=self.port)
+        return ok
+
+    async def send_with_confirmation(self, msg: str, max_attempts: Optional[int] = None) -> bool:
         """
-        Envia mensagem UDP com múltiplas tentativas para garantir entrega.
-        
-        Args:
-            msg: Mensagem a ser enviada
-            max_attempts: Número máximo de tentativas
-            
+        Envia e aguarda o ACK do display.
+
         Returns:
-            bool: True se enviado com sucesso, False caso contrário
+            bool: True se o display confirmou (ou, sem ACK, se o datagrama saiu)
         """
-        for attempt in range(max_attempts):
-            if self.send(msg):
-                return True
-            
-            if attempt < max_attempts - 1:
-                log.info("udp-retry-attempt",
-                    message=msg, attempt=attempt + 1,
-                    max_attempts=max_attempts)
-                time.sleep(self.retry_delay * (attempt + 1))
-        
-        log.error("udp-all-attempts-failed",
-                 message=msg, max_attempts=max_attempts,
-                 ip=self.ip, port=self.port)
+        if not self.ack:
+            return await self.send(msg)
+        try:
+            await self.open()
+        except OSError as e:
+            UDP_SEND_FAILURES.labels("socket").inc()
+            log.error("udp-socket-invalid", error=str(e), message=msg, ip=self.ip, port=self.port)
+            return False
+        self._seq += 1
+        seq = self._seq
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[seq] = (fut, None)
+        self._transmit(seq, encode_message(seq, msg), 0, max_attempts or self.max_attempts)
+        if await fut:
+            log.debug("udp-message-acked", message=msg, seq=seq)
+            return True
+        self.stats["unconfirmed"] += 1
+        UDP_SEND_FAILURES.labels("unconfirmed").inc()
+        log.error("udp-all-attempts-failed", message=msg, seq=seq,
+                  max_attempts=max_attempts or self.max_attempts, ip=self.ip, port=self.port)
         return False
-    
+
+    def notify(self, msg: str) -> asyncio.Task:
+        """`send_with_confirmation()` em background; a task fica referenciada até terminar."""
+        task = asyncio.get_running_loop().create_task(self.send_with_confirmation(msg), name=f"udp-notify-{msg}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _transmit(self, seq: int, data: bytes, attempt: int, max_attempts: int):
+        """Envia e agenda a próxima retransmissão (ou a desistência) como timer do loop."""
+        entry = self._pending.get(seq)
+        if entry is None:
+            return
+        if attempt >= max_attempts or not self.is_open:
+            self._resolve(seq, False)
+            return
+        if attempt:
+            self.stats["retransmits"] += 1
+        self._sendto(data)
+        timer = asyncio.get_running_loop().call_later(
+            self.ack_timeout * 2 ** attempt, self._transmit, seq, data, attempt + 1, max_attempts
+        )
+        self._pending[seq] = (entry[0], timer)
+
+
+class _EchoProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: "DisplayEchoListener"):
+        self.listener = listener
+
+    def connection_made(self, transport):
+        self.listener.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.listener._on_datagram(data, addr)
+
+
+class DisplayEchoListener:
+    """
+    Stand-in local do app do display: responde "ack:<seq>" a cada mensagem
+    numerada e entrega cada sequência uma única vez (retransmissão só re-confirma).
+    `drop_rate` descarta datagramas de propósito, para exercitar as retransmissões.
+
+        listener = DisplayEchoListener(port=5053)
+        await listener.start()
+        ...
+        listener.received  # [(seq, msg), ...]
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 5053, drop_rate: float = 0.0,
+                 window: int = 1024):
+        self.host = host
+        self.port = port
+        self.drop_rate = drop_rate
+        self.window = window
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.received: list[tuple[Optional[int], str]] = []
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.duplicates = 0
+        self.dropped = 0
+        self._seen: OrderedDict[tuple, None] = OrderedDict()
+
+    async def start(self) -> "DisplayEchoListener":
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: _EchoProtocol(self), local_addr=(self.host, self.port))
+        self.port = self.transport.get_extra_info("sockname")[1]  # port=0 -> porta efêmera
+        return self
+
     def close(self):
-        """Fecha o socket UDP."""
-        try:
-            if self.sock:
-                self.sock.close()
-                self.sock = None
-                log.info("udp-socket-closed", ip=self.ip, port=self.port)
-        except Exception as e:
-            log.error("udp-socket-close-error", error=str(e))
-    
-    def __del__(self):
-        """Destrutor para garantir que o socket seja fechado."""
-        self.close()
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def _on_datagram(self, data: bytes, addr):
+        if self.drop_rate and random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        seq, msg = decode_message(data)
+        if seq is not None:
+            self.transport.sendto(f"{ACK_PREFIX}{seq}".encode(), addr)
+            key = (addr, seq)
+            if key in self._seen:
+                self.duplicates += 1
+                return
+            self._seen[key] = None
+            if len(self._seen) > self.window:
+                self._seen.popitem(last=False)
+        self.received.append((seq, msg))
+        self.messages.put_nowait((seq, msg))
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# os módulos importam como na app (cwd = src/); settings exige estas variáveis
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# fake_mongo (stand-in do Motor) mora em benchmarks/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+for _name, _value in {
+    "SECRET_KEY": "test",
+    "SHORTENER_USER": "test",
+    "SHORTENER_PASSWORD": "test",
+    "LOGCENTER_BASE_URL": "http://logcenter.test",
+    "LOGCENTER_API_KEY": "test",
+    "LOGCENTER_PROJECT_ID": "test",
+    "CADASTRO_BASE_URL": "http://cadastro.test",
+}.items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,66 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from middlewares.rate_limit import RateLimitMiddleware, RateLimitRule
+from middlewares.rate_limit_store import MemoryRateLimitStore, gcra_step
+
+
+def test_gcra_step_allows_up_to_limit_then_denies():
+    tat = None
+    for _ in range(3):
+        allowed, tat = gcra_step(tat, now=100.0, interval=10.0, period=30.0)
+        assert allowed
+    allowed, denied_tat = gcra_step(tat, now=100.0, interval=10.0, period=30.0)
+    assert not allowed
+    assert denied_tat == tat  # negado não consome
+
+
+def test_gcra_step_negative_cost_refunds_one_unit():
+    _, tat = gcra_step(None, now=100.0, interval=10.0, period=30.0, cost=3)
+    allowed, refunded = gcra_step(tat, now=100.0, interval=10.0, period=30.0, cost=-1)
+    assert allowed
+    assert refunded == tat - 10.0
+    assert gcra_step(refunded, now=100.0, interval=10.0, period=30.0)[0]
+
+
+async def _ok(request):
+    return PlainTextResponse("ok")
+
+
+@pytest.fixture
+def client():
+    store = MemoryRateLimitStore()
+    app = Starlette(routes=[Route("/api/users/", _ok, methods=["POST"])])
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=store,
+        rules=(
+            RateLimitRule("ip", "/api/users/", limit=3, period=3600),
+            RateLimitRule("email", "/api/users/", limit=1, period=3600, key="email"),
+        ),
+    )
+    with TestClient(app) as c:
+        yield c
+
+
+def test_rejected_request_refunds_rules_already_consumed(client):
+    assert client.post("/api/users/", json={"email": "a@x.com"}).status_code == 200
+    for _ in range(4):
+        assert client.post("/api/users/", json={"email": "a@x.com"}).status_code == 429
+
+    # as 4 recusas pelo e-mail devolveram a unidade do IP: ainda cabem 2 cadastros
+    assert client.post("/api/users/", json={"email": "b@x.com"}).status_code == 200
+    response = client.post("/api/users/", json={"email": "c@x.com"})
+    assert response.status_code == 200
+    assert response.headers["ratelimit-remaining"] == "0"
+    assert client.post("/api/users/", json={"email": "d@x.com"}).status_code == 429
+
+
+def test_429_carries_retry_after(client):
+    client.post("/api/users/", json={"email": "a@x.com"})
+    response = client.post("/api/users/", json={"email": "a@x.com"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from core.config import settings
+from fake_mongo import FakeMotorClient
+from routes import registrations
+from schemas.user import UserPickupRequest
+
+DAY = datetime(2026, 3, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def coll(monkeypatch):
+    coll = FakeMotorClient()["lego_user_reg"]["registrations"]
+    monkeypatch.setattr(registrations, "REGISTRATIONS_COLL", coll)
+    monkeypatch.setattr(settings, "PICKUP_MAX_PER_DAY", 1)
+    return coll
+
+
+async def _register(coll, reg_id="r1", email="ana@example.com", can_pick_from=DAY):
+    await coll.insert_one({
+        "_id": reg_id,
+        "email": email,
+        "status": "registered",
+        "canPickFrom": can_pick_from,
+        "pickedDay": None,
+        "condomsPicked": 0,
+    })
+
+
+async def _pickup(day=DAY, qty=1, **key):
+    return await registrations.register_pickup(UserPickupRequest(day=day, condomsPicked=qty, **key))
+
+
+async def _status_code(**kwargs) -> int:
+    with pytest.raises(HTTPException) as exc:
+        await _pickup(**kwargs)
+    return exc.value.status_code
+
+
+@pytest.mark.asyncio
+async def test_first_pickup(coll):
+    await _register(coll)
+    response = await _pickup(id="r1", day=DAY + timedelta(hours=15))
+
+    assert response.status == "picked"
+    assert response.condomsPicked == 1
+    assert response.pickedDay.replace(tzinfo=timezone.utc) == DAY  # normalizado para 00:00 UTC
+
+
+@pytest.mark.asyncio
+async def test_by_email_is_case_insensitive(coll):
+    await _register(coll)
+    response = await _pickup(email="Ana@Example.com")
+    assert response.id == "r1"
+
+
+@pytest.mark.asyncio
+async def test_same_day_over_limit_is_refused(coll):
+    await _register(coll)
+    await _pickup(id="r1")
+    assert await _status_code(id="r1") == 409
+    assert (await coll.find_one({"_id": "r1"}))["condomsPicked"] == 1
+
+
+@pytest.mark.asyncio
+async def test_same_day_accumulates_up_to_limit(coll, monkeypatch):
+    monkeypatch.setattr(settings, "PICKUP_MAX_PER_DAY", 3)
+    await _register(coll)
+    await _pickup(id="r1", qty=1)
+    assert (await _pickup(id="r1", qty=2)).condomsPicked == 3
+    assert await _status_code(id="r1", qty=1) == 409
+
+
+@pytest.mark.asyncio
+async def test_next_day_resets_daily_count(coll, monkeypatch):
+    monkeypatch.setattr(settings, "PICKUP_MAX_PER_DAY", 2)
+    await _register(coll)
+    await _pickup(id="r1", qty=2)
+    response = await _pickup(id="r1", day=DAY + timedelta(days=1), qty=1)
+
+    assert response.condomsPicked == 1
+    assert response.pickedDay.replace(tzinfo=timezone.utc) == DAY + timedelta(days=1)
+
+
+@pytest.mark.asyncio
+async def test_earlier_day_than_last_pickup_is_refused(coll):
+    await _register(coll)
+    await _pickup(id="r1", day=DAY + timedelta(days=1))
+    assert await _status_code(id="r1", day=DAY) == 409
+
+
+@pytest.mark.asyncio
+async def test_qty_above_daily_limit(coll):
+    await _register(coll)
+    assert await _status_code(id="r1", qty=2) == 422
+
+
+@pytest.mark.asyncio
+async def test_not_yet_eligible(coll):
+    await _register(coll, can_pick_from=DAY + timedelta(days=2))
+    assert await _status_code(id="r1") == 403
+
+
+@pytest.mark.asyncio
+async def test_unknown_registration(coll):
+    assert await _status_code(id="missing") == 404
+
+
+@pytest.mark.asyncio
+async def test_missing_key(coll):
+    assert await _status_code() == 422
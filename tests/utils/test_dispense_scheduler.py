@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from utils.dispense_scheduler import PRIORITY_ADMIN, DispenseScheduler
+from utils.singleton import Singleton
+
+
+class Runner:
+    """Runner que segura cada job até `release()`; registra a ordem de execução."""
+    def __init__(self):
+        self.started: list[str] = []
+        self._gate = asyncio.Event()
+
+    async def __call__(self, job):
+        self.started.append(job.id)
+        await self._gate.wait()
+        return "completed"
+
+    def release(self):
+        self._gate.set()
+
+
+@pytest_asyncio.fixture
+async def scheduler(monkeypatch):
+    monkeypatch.delitem(Singleton._instances, DispenseScheduler, raising=False)
+    runner, cancelled = Runner(), []
+
+    async def on_cancel(job):
+        cancelled.append(job.id)
+
+    scheduler = DispenseScheduler(runner, on_cancel=on_cancel)
+    scheduler.runner, scheduler.cancelled = runner, cancelled
+    yield scheduler
+    runner.release()
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_position_counts_from_one_for_the_next_job(scheduler):
+    running = scheduler.submit("session")
+    await asyncio.sleep(0)
+    first, second = scheduler.submit("session"), scheduler.submit("session")
+
+    assert scheduler.position(running.id) == 0
+    assert scheduler.position(first.id) == 1
+    assert scheduler.position(second.id) == 2
+
+
+@pytest.mark.asyncio
+async def test_admin_job_goes_ahead_of_sessions(scheduler):
+    scheduler.submit("session")
+    await asyncio.sleep(0)
+    session = scheduler.submit("session")
+    admin = scheduler.submit("admin", priority=PRIORITY_ADMIN)
+
+    assert scheduler.position(admin.id) == 1
+    assert scheduler.position(session.id) == 2
+
+
+@pytest.mark.asyncio
+async def test_estimated_wait_includes_the_busy_worker(scheduler):
+    scheduler._runs.append(2.0)
+    running = scheduler.submit("session")
+    await asyncio.sleep(0)
+    first, second = scheduler.submit("session"), scheduler.submit("session")
+
+    assert scheduler.estimated_wait(running.id) == 0.0
+    assert scheduler.estimated_wait(first.id) == 2.0
+    assert scheduler.estimated_wait(second.id) == 4.0
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_job(scheduler):
+    running = scheduler.submit("session")
+    await asyncio.sleep(0)
+    queued, after = scheduler.submit("session"), scheduler.submit("session")
+
+    assert await scheduler.cancel(queued.id)
+    assert queued.status == "cancelled"
+    assert scheduler.position(queued.id) is None
+    assert scheduler.position(after.id) == 1
+    assert scheduler.cancelled == [queued.id]
+
+    scheduler.runner.release()
+    await asyncio.wait_for(after.done.wait(), timeout=1)
+    assert scheduler.runner.started == [running.id, after.id]  # o cancelado não roda
+
+
+@pytest.mark.asyncio
+async def test_cancel_only_applies_to_queued_jobs(scheduler):
+    running = scheduler.submit("session")
+    await asyncio.sleep(0)
+
+    assert not await scheduler.cancel(running.id)
+    assert not await scheduler.cancel("missing")
+    scheduler.runner.release()
+    await asyncio.wait_for(running.done.wait(), timeout=1)
+    assert not await scheduler.cancel(running.id)
+
+
+@pytest.mark.asyncio
+async def test_expired_job_is_cancelled_instead_of_run(scheduler):
+    running = scheduler.submit("session")
+    await asyncio.sleep(0)
+    stale = scheduler.submit("session", ttl=0.01)
+    await asyncio.sleep(0.02)
+
+    scheduler.runner.release()
+    await asyncio.wait_for(stale.done.wait(), timeout=1)
+    assert stale.status == "cancelled"
+    assert scheduler.cancelled == [stale.id]
+    assert scheduler.runner.started == [running.id]
@@ -0,0 +1,66 @@
+import json
+import os
+import struct
+import zlib
+
+from utils.log_journal import LogJournal, list_segments, read_segment, valid_length
+
+
+def _frame(record: dict) -> bytes:
+    payload = json.dumps(record).encode()
+    return struct.pack(">II", len(payload), zlib.crc32(payload)) + payload
+
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_read_segment_stops_at_partial_frame(tmp_path):
+    path = tmp_path / "seg-00000001.log"
+    good = _frame({"n": 1}) + _frame({"n": 2})
+    _write(path, good + _frame({"n": 3})[:-4])
+
+    assert [r["n"] for _, r in read_segment(path)] == [1, 2]
+    assert valid_length(path) == len(good)
+
+
+def test_read_segment_stops_at_bad_crc(tmp_path):
+    path = tmp_path / "seg-00000001.log"
+    first = _frame({"n": 1})
+    corrupt = bytearray(_frame({"n": 2}))
+    corrupt[-1] ^= 0xFF
+    _write(path, first + bytes(corrupt) + _frame({"n": 3}))
+
+    assert [r["n"] for _, r in read_segment(path)] == [1]
+    assert valid_length(path) == len(first)
+
+
+def test_read_segment_from_offset(tmp_path):
+    path = tmp_path / "seg-00000001.log"
+    first = _frame({"n": 1})
+    _write(path, first + _frame({"n": 2}))
+
+    assert [r["n"] for _, r in read_segment(path, len(first))] == [2]
+
+
+def test_valid_length_empty_segment(tmp_path):
+    path = tmp_path / "seg-00000001.log"
+    _write(path, b"")
+    assert valid_length(path) == 0
+
+
+def test_open_truncates_torn_tail_and_appends_after_it(tmp_path):
+    path = tmp_path / "seg-00000001.log"
+    good = _frame({"n": 1}) + _frame({"n": 2})
+    _write(path, good + _frame({"n": 99})[:7])
+
+    journal = LogJournal(str(tmp_path), commit_interval=0)
+    try:
+        assert os.path.getsize(path) == len(good)
+        journal.append({"n": 3}).result(timeout=5)
+    finally:
+        journal.close()
+
+    assert list_segments(str(tmp_path)) == ["seg-00000001.log"]
+    assert [r["n"] for _, r in read_segment(path)] == [1, 2, 3]
@@ -0,0 +1,29 @@
+import pytest
+
+from utils.static_assets import _parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 10)),
+    ("bytes=10-", (10, 100)),
+    ("bytes=90-500", (90, 100)),       # fim além do arquivo é cortado
+    ("bytes=-10", (90, 100)),          # sufixo: últimos 10 bytes
+    ("bytes=-500", (0, 100)),          # sufixo maior que o arquivo
+    (" bytes = 0-0", (0, 1)),
+])
+def test_parse_range_valid(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=100-",       # início == tamanho
+    "bytes=150-200",    # início além do fim
+    "bytes=9-5",        # invertido
+    "bytes=-0",         # sufixo vazio
+    "bytes=0-1,5-9",    # múltiplos intervalos
+    "items=0-9",
+    "bytes=a-b",
+    "bytes=",
+])
+def test_parse_range_invalid(header):
+    assert _parse_range(header, 100) is None
@@ -0,0 +1,266 @@
+"""
+Build dos assets de um conjunto de templates (ex.: templates/skyn):
+
+- fontes referenciadas em @font-face: subset para os glifos usados nos templates
+  (+ Latin-1, para o que o usuário digita nos campos) e conversão para WOFF2;
+- imagens referenciadas (<img> e url() no CSS): variantes WebP/AVIF, mantendo o
+  original como fallback (<picture> no HTML, image-set() no CSS);
+- nomes com hash do conteúdo + manifest.json (CSS também com irmãos .gz/.br); HTML e CSS reescritos pelo manifest
+  em <root>/dist (o app usa dist/html quando existe);
+- relatório de bytes por página (HTML + CSS + fontes + imagens), antes/depois.
+
+Dependências de build: fonttools, brotli, pillow (com suporte a AVIF para a variante avif).
+
+    python tools/build_assets.py src/frontend/static/templates/skyn --url-prefix /templates/skyn
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import re
+import shutil
+import sys
+from pathlib import Path
+
+import brotli
+from fontTools import subset
+from PIL import Image, features
+
+FONT_EXTS = {".otf", ".ttf"}
+IMAGE_EXTS = {".png", ".jpg", ".jpeg"}
+
+# Latin-1 e pontuação comum: cobre nomes/e-mails digitados nos inputs
+BASE_UNICODES = [*range(0x20, 0x7F), *range(0xA0, 0x100), *range(0x2010, 0x2027), 0x20AC, 0x2122]
+
+LINK_RE = re.compile(r'(<link\b[^>]*\bhref=")([^"]+\.css)(")')
+IMG_RE = re.compile(r'<img\b[^>]*\bsrc="([^"]+)"[^>]*>')
+CSS_URL_RE = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""")
+BG_DECL_RE = re.compile(r"(background-image\s*:\s*)url\(\s*['\"]?([^'\")]+)['\"]?\s*\)\s*;")
+FONT_SRC_RE = re.compile(r"(src\s*:\s*)url\(\s*['\"]?([^'\")]+)['\"]?\s*\)(\s*format\([^)]*\))?\s*;")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+class AssetBuild:
+    def __init__(self, root: Path, url_prefix: str, avif_quality: int = 50, webp_quality: int = 80):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.dist = root / "dist"
+        self.avif_quality = avif_quality
+        self.webp_quality = webp_quality
+        self.manifest: dict[str, dict] = {}
+        self.sizes: dict[str, int] = {}  # url publicada -> bytes
+        self._deps: set[str] = set()       # assets (chaves do manifest) da página em build
+        self._css_deps: dict[str, set[str]] = {}
+
+    # ---------- caminhos ----------
+
+    def resolve(self, url: str, base: Path) -> Path | None:
+        """URL do template/CSS -> arquivo em disco (None se externa ou fora do root)."""
+        if url.startswith(("http:", "https:", "data:", "//")):
+            return None
+        if url.startswith(self.url_prefix + "/"):
+            path = self.root / url[len(self.url_prefix) + 1:]
+        elif url.startswith("/"):
+            return None
+        else:
+            path = (base / url).resolve()
+        return path if path.is_file() and self.root.resolve() in path.resolve().parents else None
+
+    def logical(self, path: Path) -> str:
+        return path.resolve().relative_to(self.root.resolve()).as_posix()
+
+    def emit(self, kind: str, stem: str, ext: str, data: bytes) -> str:
+        name = f"{stem}.{content_hash(data)}{ext}"
+        out = self.dist / kind / name
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(data)
+        url = f"{self.url_prefix}/dist/{kind}/{name}"
+        self.sizes[url] = len(data)
+        return url
+
+    def precompress(self, url: str):
+        """Irmãos .gz/.br do arquivo publicado (servidos pelo StaticAssets conforme Accept-Encoding)."""
+        out = self.dist / url[len(self.url_prefix) + len("/dist/"):]
+        data = out.read_bytes()
+        out.with_name(out.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        out.with_name(out.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+    # ---------- fontes ----------
+
+    def build_font(self, path: Path, text: str) -> dict:
+        key = self.logical(path)
+        self._deps.add(key)
+        if key in self.manifest:
+            return self.manifest[key]
+        options = subset.Options()
+        options.flavor = "woff2"
+        options.layout_features = ["*"]
+        options.name_IDs = ["*"]
+        options.notdef_outline = True
+        font = subset.load_font(str(path), options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=text, unicodes=BASE_UNICODES)
+        subsetter.subset(font)
+        buf = io.BytesIO()
+        subset.save_font(font, buf, options)
+        entry = {
+            "url": self.emit("fonts", path.stem, ".woff2", buf.getvalue()),
+            "original": path.stat().st_size,
+        }
+        self.manifest[key] = entry
+        return entry
+
+    # ---------- imagens ----------
+
+    def build_image(self, path: Path) -> dict:
+        key = self.logical(path)
+        self._deps.add(key)
+        if key in self.manifest:
+            return self.manifest[key]
+        raw = path.read_bytes()
+        entry = {"url": self.emit("images", path.stem, path.suffix.lower(), raw), "original": len(raw)}
+        img = Image.open(io.BytesIO(raw))
+        img.load()
+        variants = {"webp": ("WEBP", {"quality": self.webp_quality, "method": 6})}
+        if features.check("avif"):
+            variants["avif"] = ("AVIF", {"quality": self.avif_quality})
+        for ext, (fmt, params) in variants.items():
+            buf = io.BytesIO()
+            img.save(buf, fmt, **params)
+            if buf.tell() < len(raw):  # só vale a pena se for menor que o original
+                entry[ext] = self.emit("images", path.stem, f".{ext}", buf.getvalue())
+        self.manifest[key] = entry
+        return entry
+
+    # ---------- CSS / HTML ----------
+
+    def build_css(self, path: Path, text: str) -> str:
+        key = self.logical(path)
+        self._deps.add(key)
+        if key in self.manifest:
+            self._deps |= self._css_deps[key]
+            return self.manifest[key]["url"]
+        outer, self._deps = self._deps, set()
+        css = path.read_text(encoding="utf-8")
+
+        def font_src(m):
+            target = self.resolve(m.group(2), path.parent)
+            if target is None or target.suffix.lower() not in FONT_EXTS:
+                return m.group(0)
+            woff2 = self.build_font(target, text)["url"]
+            original = self.emit("fonts", target.stem, target.suffix.lower(), target.read_bytes())
+            return f"{m.group(1)}url('{woff2}') format('woff2'), url('{original}') format('opentype');"
+
+        def background(m):
+            target = self.resolve(m.group(2), path.parent)
+            if target is None or target.suffix.lower() not in IMAGE_EXTS:
+                return m.group(0)
+            entry = self.build_image(target)
+            mime = "image/jpeg" if target.suffix.lower() in (".jpg", ".jpeg") else "image/png"
+            decl = f"{m.group(1)}url('{entry['url']}');"
+            options = [f"url('{entry[ext]}') type('image/{ext}')" for ext in ("avif", "webp") if ext in entry]
+            if options:
+                # quem não entende image-set() com type() fica com a declaração anterior
+                options.append(f"url('{entry['url']}') type('{mime}')")
+                decl += f" {m.group(1)}image-set({', '.join(options)});"
+            return decl
+
+        def other_url(m):
+            target = self.resolve(m.group(1), path.parent)
+            if target is None:
+                return m.group(0)
+            kind = "images" if target.suffix.lower() in IMAGE_EXTS else "misc"
+            return f"url('{self.emit(kind, target.stem, target.suffix.lower(), target.read_bytes())}')"
+
+        css = FONT_SRC_RE.sub(font_src, css)
+        css = BG_DECL_RE.sub(background, css)
+        css = CSS_URL_RE.sub(lambda m: m.group(0) if "/dist/" in m.group(1) else other_url(m), css)
+        url = self.emit("css", path.stem, ".css", css.encode("utf-8"))
+        self.precompress(url)
+        self.manifest[key] = {"url": url, "original": path.stat().st_size}
+        self._css_deps[key] = self._deps | {key}
+        self._deps = outer | self._css_deps[key]
+        return url
+
+    def build_html(self, path: Path, text: str) -> str:
+        html = path.read_text(encoding="utf-8")
+
+        def link(m):
+            target = self.resolve(m.group(2), path.parent)
+            if target is None:
+                return m.group(0)
+            return m.group(1) + self.build_css(target, text) + m.group(3)
+
+        def img(m):
+            tag, src = m.group(0), m.group(1)
+            target = self.resolve(src, path.parent)
+            if target is None or target.suffix.lower() not in IMAGE_EXTS:
+                return tag
+            entry = self.build_image(target)
+            tag = tag.replace(f'src="{src}"', f'src="{entry["url"]}"')
+            sources = "".join(
+                f'<source type="image/{ext}" srcset="{entry[ext]}">' for ext in ("avif", "webp") if ext in entry
+            )
+            return f"<picture>{sources}{tag}</picture>" if sources else tag
+
+        html = LINK_RE.sub(link, html)
+        html = IMG_RE.sub(img, html)
+        out = self.dist / "html" / path.name
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(html, encoding="utf-8")
+        return html
+
+    # ---------- relatório ----------
+
+    def built_size(self, entry: dict) -> int:
+        """Bytes que um navegador moderno baixa: a menor variante publicada do asset."""
+        return min(self.sizes[entry[k]] for k in ("url", "avif", "webp") if k in entry)
+
+    # ---------- entrada ----------
+
+    def run(self) -> list[dict]:
+        if self.dist.exists():
+            shutil.rmtree(self.dist)
+        html_files = sorted((self.root / "html").glob("*.html"))
+        # glifos usados em qualquer página (texto estático e strings de JS)
+        text = "".join(sorted({ch for f in html_files for ch in f.read_text(encoding="utf-8")}))
+
+        report = []
+        for f in html_files:
+            self._deps = set()
+            built = self.build_html(f, text)
+            entries = [self.manifest[k] for k in self._deps]
+            before = f.stat().st_size + sum(e["original"] for e in entries)
+            after = len(built.encode("utf-8")) + sum(self.built_size(e) for e in entries)
+            report.append({"page": f.name, "before": before, "after": after,
+                           "saved_pct": round(100 * (1 - after / before), 1) if before else 0.0})
+
+        (self.dist / "manifest.json").write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", type=Path, help="pasta do conjunto de templates (contém html/, css/, assets/)")
+    parser.add_argument("--url-prefix", required=True, help="onde a pasta é montada, ex.: /templates/skyn")
+    parser.add_argument("--avif-quality", type=int, default=50)
+    parser.add_argument("--webp-quality", type=int, default=80)
+    args = parser.parse_args(argv)
+    logging.getLogger("fontTools").setLevel(logging.ERROR)
+
+    build = AssetBuild(args.root, args.url_prefix, args.avif_quality, args.webp_quality)
+    report = build.run()
+    width = max(len(r["page"]) for r in report) if report else 10
+    print(f"{'página':<{width}}  {'antes':>10}  {'depois':>10}  economia")
+    for r in report:
+        print(f"{r['page']:<{width}}  {r['before']:>10,}  {r['after']:>10,}  {r['saved_pct']:>6}%")
+    print(f"manifest: {build.dist / 'manifest.json'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())